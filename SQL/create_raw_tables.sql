@@ -1139,6 +1139,31 @@ OPTIONS (
   description = "Source table raw_tax_rule from raw_common",
   require_partition_filter = true
 );
+
+-- Source: airflow
+-- Per-run ingestion latency written by the ingestion DAGs (seconds from source event to staging and to load).
+CREATE TABLE IF NOT EXISTS `raw.ingestion_latency` (
+  `measured_at` TIMESTAMP NOT NULL,
+  `dag_id` STRING NOT NULL,
+  `run_id` STRING NOT NULL,
+  `table_name` STRING NOT NULL,
+  `source_column` STRING,
+  `row_count` INT64,
+  `staged_at` TIMESTAMP,
+  `loaded_at` TIMESTAMP,
+  `stage_lag_p50_s` FLOAT64,
+  `stage_lag_p95_s` FLOAT64,
+  `stage_lag_max_s` FLOAT64,
+  `load_lag_p50_s` FLOAT64,
+  `load_lag_p95_s` FLOAT64,
+  `load_lag_max_s` FLOAT64,
+  `slo_seconds` FLOAT64,
+  `slo_met` BOOL
+)
+PARTITION BY DATE(`measured_at`)
+OPTIONS (
+  description = "Ingestion latency per DAG run and table"
+);
 ALTER TABLE
   `raw.raw_amazon_order`
 ADD PRIMARY KEY
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
 import csv
+import hashlib
 import uuid
-from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from functools import cached_property
 from datetime import datetime, time, timedelta, timezone
 from decimal import Decimal, ROUND_HALF_UP
 from pathlib import Path
-from random import Random
-from typing import Any, Dict, Iterable, List, Sequence
+from random import Random, SystemRandom
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
 
 
 MIN_ITEMS_PER_ORDER = 3
 MAX_ITEMS_PER_ORDER = 5
 MAX_ORDERS_PER_CUSTOMER = 4
+# Upper bound on the hours one historical window request may span.
+MAX_WINDOW_HOURS = 24 * 31
+HOUR = timedelta(hours=1)
 
 
 class PayloadError(RuntimeError):
@@ -65,21 +71,25 @@ def _default_accounts_path(reference_file: Path) -> Path:
     return _default_seeds_dir(reference_file) / "accounts.csv"
 
 
-def _load_products(path: Path) -> List[Product]:
-    if not path.exists():
-        raise OrdersPayloadError(f"products seed not found at {path}")
-
-    products: List[Product] = []
+def _read_csv(path: Path) -> Tuple[List[Dict[str, str]], List[str]]:
     with path.open(newline="", encoding="utf-8") as handle:
         reader = csv.DictReader(handle)
-        for row in reader:
-            if row.get("status") != "Available":
-                continue
-            try:
-                price = Decimal(row["price"]).quantize(Decimal("0.01"))
-            except Exception as exc:  # noqa: BLE001
-                raise OrdersPayloadError("invalid price encountered in products seed") from exc
-            products.append(Product(row["product_id"], row["seller_sku"], price))
+        records = list(reader)
+        columns = reader.fieldnames or []
+    return records, list(columns)
+
+
+def products_from_records(records: Iterable[Dict[str, str]]) -> List[Product]:
+    """Return the available products of a parsed products seed."""
+    products: List[Product] = []
+    for row in records:
+        if row.get("status") != "Available":
+            continue
+        try:
+            price = Decimal(row["price"]).quantize(Decimal("0.01"))
+        except Exception as exc:  # noqa: BLE001
+            raise OrdersPayloadError("invalid price encountered in products seed") from exc
+        products.append(Product(row["product_id"], row["seller_sku"], price))
 
     if len(products) < MIN_ITEMS_PER_ORDER:
         raise OrdersPayloadError("insufficient available products to build orders")
@@ -87,7 +97,15 @@ def _load_products(path: Path) -> List[Product]:
     return products
 
 
-def _load_buyers(customer_path: Path, accounts_path: Path) -> List[Buyer]:
+def _load_products(path: Path) -> List[Product]:
+    if not path.exists():
+        raise OrdersPayloadError(f"products seed not found at {path}")
+
+    records, _ = _read_csv(path)
+    return products_from_records(records)
+
+
+def load_buyers(customer_path: Path, accounts_path: Path) -> List[Buyer]:
     buyers: List[Buyer] = []
 
     if not customer_path.exists():
@@ -118,8 +136,7 @@ def _start_of_day(now: datetime) -> datetime:
     return datetime.combine(now.date(), time.min, tzinfo=now.tzinfo)
 
 
-def _random_datetime_today(rng: Random, now: datetime) -> datetime:
-    start = _start_of_day(now)
+def _random_datetime_between(rng: Random, start: datetime, now: datetime) -> datetime:
     span = (now - start).total_seconds()
     if span <= 0:
         return now
@@ -127,46 +144,94 @@ def _random_datetime_today(rng: Random, now: datetime) -> datetime:
     return start + timedelta(seconds=offset)
 
 
-def _iter_buyers(rng: Random, buyers: Sequence[Buyer], order_goal: int) -> Iterable[Buyer]:
-    counts = {buyer.identifier: 0 for buyer in buyers}
-    for _ in range(order_goal):
-        eligible = [b for b in buyers if counts[b.identifier] < MAX_ORDERS_PER_CUSTOMER]
-        if not eligible:
-            break
-        chosen = rng.choice(eligible)
-        counts[chosen.identifier] += 1
-        yield chosen
+def _buyer_slots(seed: int, buyers: Sequence[Buyer], order_goal: int) -> List[Buyer]:
+    """Assign a buyer to every order index, each buyer at most MAX_ORDERS_PER_CUSTOMER times.
+
+    The assignment is a seeded shuffle of all buyer slots, so the buyer of order ``i``
+    is known without generating orders ``0..i-1``.
+    """
+    slots = [buyer for buyer in buyers for _ in range(MAX_ORDERS_PER_CUSTOMER)]
+    Random(seed).shuffle(slots)
+    return slots[:order_goal]
+
+
+def _order_rng(seed: int, index: int) -> Random:
+    # String seeds are hashed with SHA-512, so this is stable across processes.
+    return Random(f"{seed}:{index}")
+
+
+def hour_seed(seed: int, hour_start: datetime) -> int:
+    """Seed of one hourly window, derived from the base seed and the hour alone."""
+    digest = hashlib.sha256(f"{seed}:{hour_start.isoformat()}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+def hour_window(start: datetime, end: datetime | None = None) -> Tuple[datetime, datetime]:
+    """Normalize ``start..end`` to whole UTC hours; ``end`` defaults to one hour after ``start``."""
+    start, end = (_as_utc(value) if value is not None else None for value in (start, end))
+    window_start = start.replace(minute=0, second=0, microsecond=0)
+    window_end = window_start + HOUR if end is None else end
+    if window_end.replace(minute=0, second=0, microsecond=0) != window_end:
+        window_end = window_end.replace(minute=0, second=0, microsecond=0) + HOUR
+    if window_end <= window_start:
+        raise ValueError("end must be after start")
+    if window_end - window_start > MAX_WINDOW_HOURS * HOUR:
+        raise ValueError(f"window spans more than {MAX_WINDOW_HOURS} hours")
+    return window_start, window_end
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _random_uuid(rng: Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
 
 
 def _format_decimal(value: Decimal) -> str:
     return str(value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
 
 
-def load_products_payload(products_path: Path | None = None) -> DataPayload:
-    base_path = Path(__file__)
-    path = products_path or _default_products_path(base_path)
+def default_seed_paths() -> Tuple[Path, Path, Path]:
+    """Return the default products, customer and accounts seed paths."""
+    reference = Path(__file__)
+    return (
+        _default_products_path(reference),
+        _default_customer_path(reference),
+        _default_accounts_path(reference),
+    )
+
 
+def read_products_seed(path: Path) -> Tuple[List[Dict[str, str]], List[str]]:
+    """Read the products seed into records and column names."""
     if not path.exists():
         raise ProductsPayloadError(f"products seed not found at {path}")
 
-    with path.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        records = list(reader)
-        columns = reader.fieldnames or []
-
+    records, columns = _read_csv(path)
     if not records:
         raise ProductsPayloadError("products seed is empty")
+    return records, columns
+
 
+def build_products_payload(
+    records: List[Dict[str, Any]], columns: Sequence[str], source: Path
+) -> DataPayload:
     metadata = {
-        "source": str(path),
+        "source": str(source),
         "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
         "record_count": len(records),
-        "columns": columns,
+        "columns": list(columns),
     }
 
     return DataPayload(metadata=metadata, data=records)
 
 
+def load_products_payload(products_path: Path | None = None) -> DataPayload:
+    path = products_path or _default_products_path(Path(__file__))
+    records, columns = read_products_seed(path)
+    return build_products_payload(records, columns, path)
+
+
 def load_orders_payload(
     *,
     products_path: Path | None = None,
@@ -180,82 +245,307 @@ def load_orders_payload(
     customer_file = customer_path or _default_customer_path(reference)
     accounts_file = accounts_path or _default_accounts_path(reference)
 
-    rng = Random(seed)
-    processed_at = datetime.now(timezone.utc)
+    return build_orders_payload(
+        products=_load_products(products_file),
+        buyers=load_buyers(customer_file, accounts_file),
+        sources={
+            "products": str(products_file),
+            "customers": str(customer_file),
+            "accounts": str(accounts_file),
+        },
+        order_goal=order_goal,
+        seed=seed,
+    )
+
+
+ORDER_COLUMNS = [
+    "order_id",
+    "created_at",
+    "processed_at",
+    "order_item_id",
+    "product_id",
+    "SKU",
+    "quantity",
+    "price",
+    "currency",
+    "total_price",
+    "customer_id",
+    "is_b2b",
+]
+
+
+class _LazyOrders(ABC):
+    """Payload helpers shared by plans that generate their orders lazily."""
+
+    @abstractmethod
+    def iter_orders(self, start: int = 0, stop: int | None = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the lines of each order in ``[start, stop)``."""
+
+    @abstractmethod
+    def metadata(self, record_count: int | None = None, unique_orders: int | None = None) -> Dict[str, Any]:
+        """Payload metadata; counts are filled in once the rows are known."""
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        for lines in self.iter_orders():
+            yield from lines
+
+    def to_payload(self) -> DataPayload:
+        rows: List[Dict[str, Any]] = []
+        unique_orders = 0
+        for lines in self.iter_orders():
+            rows.extend(lines)
+            unique_orders += 1
+        return DataPayload(metadata=self.metadata(len(rows), unique_orders), data=rows)
+
 
-    products = _load_products(products_file)
-    buyers = _load_buyers(customer_file, accounts_file)
+@dataclass(frozen=True)
+class OrdersPlan(_LazyOrders):
+    """Resolved inputs of one orders payload; rows are generated lazily from it."""
+
+    products: Sequence[Product]
+    buyers: Sequence[Buyer]
+    sources: Dict[str, str]
+    order_goal: int
+    max_items: int
+    seed: int
+    processed_at: datetime
+    # Earliest created_at; the start of the processing day when not set.
+    window_start: datetime | None = None
+
+    @cached_property
+    def buyer_slots(self) -> List[Buyer]:
+        return _buyer_slots(self.seed, self.buyers, self.order_goal)
+
+    def iter_orders(self, start: int = 0, stop: int | None = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the line rows of orders ``start..stop`` one order at a time.
+
+        Every order draws from its own RNG derived from ``seed`` and its index, so
+        any range can be regenerated on its own and matches the full payload.
+        """
+        stop = self.order_goal if stop is None else min(stop, self.order_goal)
+        processed_at = self.processed_at.replace(microsecond=0)
+        window_start = self.window_start or _start_of_day(self.processed_at)
+        for index in range(start, stop):
+            rng = _order_rng(self.seed, index)
+            buyer = self.buyer_slots[index]
+            order_id = _random_uuid(rng)
+            created_at = _random_datetime_between(rng, window_start, self.processed_at).replace(microsecond=0)
+            item_count = rng.randint(MIN_ITEMS_PER_ORDER, self.max_items)
+            lines: List[Dict[str, Any]] = []
+            for product in rng.sample(self.products, item_count):
+                quantity = rng.randint(1, 5)
+                total_price = (product.price * Decimal(quantity)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+                lines.append(
+                    {
+                        "order_id": order_id,
+                        "created_at": created_at,
+                        "processed_at": processed_at,
+                        "order_item_id": _random_uuid(rng),
+                        "product_id": product.product_id,
+                        "SKU": product.sku,
+                        "quantity": quantity,
+                        "price": _format_decimal(product.price),
+                        "currency": "EUR",
+                        "total_price": _format_decimal(total_price),
+                        "customer_id": buyer.identifier,
+                        "is_b2b": buyer.is_b2b,
+                    }
+                )
+            yield lines
+
+    def metadata(self, record_count: int | None = None, unique_orders: int | None = None) -> Dict[str, Any]:
+        """Payload metadata; the counts are omitted when they are not known yet."""
+        metadata: Dict[str, Any] = {
+            "sources": dict(self.sources),
+            "generated_at": self.processed_at.isoformat(timespec="seconds"),
+        }
+        if record_count is not None:
+            metadata["record_count"] = record_count
+        if unique_orders is not None:
+            metadata["unique_orders"] = unique_orders
+        metadata.update(
+            {
+                "columns": list(ORDER_COLUMNS),
+                "constraints": {
+                    "max_orders_per_customer": MAX_ORDERS_PER_CUSTOMER,
+                    "item_count_range": [MIN_ITEMS_PER_ORDER, self.max_items],
+                },
+                "parameters": {
+                    "order_goal": self.order_goal,
+                    "seed": self.seed,
+                },
+            }
+        )
+        return metadata
+
+    def regeneration_parameters(self) -> Dict[str, Any]:
+        """Parameters that rebuild this plan through ``plan_request``."""
+        return {
+            "seed": self.seed,
+            "order_goal": self.order_goal,
+            "processed_at": self.processed_at,
+            "window_start": None,
+            "window_end": None,
+        }
 
+
+@dataclass(frozen=True)
+class OrdersWindow(_LazyOrders):
+    """Orders of consecutive hours, each hour an ``OrdersPlan`` with its own derived seed.
+
+    Hour ``h`` only depends on the base seed, ``h`` and the seed files, so any hour
+    of a backfill can be regenerated on its own and matches the wider window.
+    """
+
+    hours: Tuple[OrdersPlan, ...]
+    seed: int
+    start: datetime
+    end: datetime
+
+    @property
+    def order_goal(self) -> int:
+        return sum(plan.order_goal for plan in self.hours)
+
+    @property
+    def processed_at(self) -> datetime:
+        return self.end
+
+    @property
+    def sources(self) -> Dict[str, str]:
+        return self.hours[0].sources
+
+    def iter_orders(self, start: int = 0, stop: int | None = None) -> Iterator[List[Dict[str, Any]]]:
+        stop = self.order_goal if stop is None else min(stop, self.order_goal)
+        offset = 0
+        for plan in self.hours:
+            if offset >= stop:
+                break
+            low, high = max(start - offset, 0), min(stop - offset, plan.order_goal)
+            if low < high:
+                yield from plan.iter_orders(low, high)
+            offset += plan.order_goal
+
+    def metadata(self, record_count: int | None = None, unique_orders: int | None = None) -> Dict[str, Any]:
+        metadata = self.hours[0].metadata(record_count, unique_orders)
+        metadata["generated_at"] = self.end.isoformat(timespec="seconds")
+        metadata["parameters"] = {"order_goal": self.hours[0].order_goal, "seed": self.seed}
+        metadata["window"] = {
+            "start": self.start.isoformat(timespec="seconds"),
+            "end": self.end.isoformat(timespec="seconds"),
+            "hours": len(self.hours),
+        }
+        return metadata
+
+    def regeneration_parameters(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "order_goal": self.hours[0].order_goal,
+            "processed_at": self.end,
+            "window_start": self.start,
+            "window_end": self.end,
+        }
+
+
+def plan_orders(
+    *,
+    products: Sequence[Product],
+    buyers: Sequence[Buyer],
+    sources: Dict[str, str],
+    order_goal: int | None = None,
+    seed: int | None = None,
+    processed_at: datetime | None = None,
+) -> OrdersPlan:
+    """Resolve the payload parameters; an omitted seed is drawn at random and reported."""
     capacity = len(buyers) * MAX_ORDERS_PER_CUSTOMER
     desired_orders = order_goal if order_goal is not None else len(buyers) * 5
     desired_orders = max(0, min(desired_orders, capacity))
     if desired_orders == 0:
         raise OrdersPayloadError("order_goal resolved to zero; increase input parameters")
 
-    max_items = min(MAX_ITEMS_PER_ORDER, len(products))
-
-    rows: List[Dict[str, Any]] = []
-    unique_orders = set()
-
-    for buyer in _iter_buyers(rng, buyers, desired_orders):
-        order_id = str(uuid.uuid4())
-        unique_orders.add(order_id)
-        created_at = _random_datetime_today(rng, processed_at)
-        item_count = rng.randint(MIN_ITEMS_PER_ORDER, max_items)
-        products_sample = rng.sample(products, item_count)
-        for product in products_sample:
-            quantity = rng.randint(1, 5)
-            total_price = (product.price * Decimal(quantity)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            rows.append(
-                {
-                    "order_id": order_id,
-                    "created_at": created_at.replace(microsecond=0),
-                    "processed_at": processed_at.replace(microsecond=0),
-                    "order_item_id": str(uuid.uuid4()),
-                    "product_id": product.product_id,
-                    "SKU": product.sku,
-                    "quantity": quantity,
-                    "price": _format_decimal(product.price),
-                    "currency": "EUR",
-                    "total_price": _format_decimal(total_price),
-                    "customer_id": buyer.identifier,
-                    "is_b2b": buyer.is_b2b,
-                }
-            )
-
-    columns = [
-        "order_id",
-        "created_at",
-        "processed_at",
-        "order_item_id",
-        "product_id",
-        "SKU",
-        "quantity",
-        "price",
-        "currency",
-        "total_price",
-        "customer_id",
-        "is_b2b",
-    ]
+    return OrdersPlan(
+        products=products,
+        buyers=buyers,
+        sources=dict(sources),
+        order_goal=desired_orders,
+        max_items=min(MAX_ITEMS_PER_ORDER, len(products)),
+        seed=seed if seed is not None else SystemRandom().getrandbits(63),
+        processed_at=processed_at or datetime.now(timezone.utc),
+    )
 
-    metadata = {
-        "sources": {
-            "products": str(products_file),
-            "customers": str(customer_file),
-            "accounts": str(accounts_file),
-        },
-        "generated_at": processed_at.isoformat(timespec="seconds"),
-        "record_count": len(rows),
-        "unique_orders": len(unique_orders),
-        "columns": columns,
-        "constraints": {
-            "max_orders_per_customer": MAX_ORDERS_PER_CUSTOMER,
-            "item_count_range": [MIN_ITEMS_PER_ORDER, max_items],
-        },
-        "parameters": {
-            "order_goal": desired_orders,
-            "seed": seed,
-        },
-    }
 
-    return DataPayload(metadata=metadata, data=rows)
+def plan_order_window(
+    *,
+    products: Sequence[Product],
+    buyers: Sequence[Buyer],
+    sources: Dict[str, str],
+    start: datetime,
+    end: datetime | None = None,
+    order_goal: int | None = None,
+    seed: int | None = None,
+) -> OrdersWindow:
+    """Plan the orders created in ``start..end``, hour by hour.
+
+    Every hour gets ``order_goal`` orders created inside it and processed at its end.
+    The base seed defaults to 0, so a window is reproducible without one.
+    """
+    window_start, window_end = hour_window(start, end)
+    base_seed = seed if seed is not None else 0
+    hours = []
+    hour_start = window_start
+    while hour_start < window_end:
+        hour = plan_orders(
+            products=products,
+            buyers=buyers,
+            sources=sources,
+            order_goal=order_goal,
+            seed=hour_seed(base_seed, hour_start),
+            processed_at=hour_start + HOUR,
+        )
+        hours.append(replace(hour, window_start=hour_start))
+        hour_start += HOUR
+    return OrdersWindow(hours=tuple(hours), seed=base_seed, start=window_start, end=window_end)
+
+
+def plan_request(
+    *,
+    products: Sequence[Product],
+    buyers: Sequence[Buyer],
+    sources: Dict[str, str],
+    order_goal: int | None = None,
+    seed: int | None = None,
+    processed_at: datetime | None = None,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
+) -> OrdersPlan | OrdersWindow:
+    """Plan an hourly window when ``window_start`` is given, otherwise a single payload."""
+    if window_start is not None:
+        return plan_order_window(
+            products=products,
+            buyers=buyers,
+            sources=sources,
+            start=window_start,
+            end=window_end,
+            order_goal=order_goal,
+            seed=seed,
+        )
+    return plan_orders(
+        products=products,
+        buyers=buyers,
+        sources=sources,
+        order_goal=order_goal,
+        seed=seed,
+        processed_at=processed_at,
+    )
+
+
+def build_orders_payload(
+    *,
+    products: Sequence[Product],
+    buyers: Sequence[Buyer],
+    sources: Dict[str, str],
+    order_goal: int | None = None,
+    seed: int | None = None,
+) -> DataPayload:
+    """Generate the mock order payload from already-loaded seeds."""
+    plan = plan_orders(products=products, buyers=buyers, sources=sources, order_goal=order_goal, seed=seed)
+    return plan.to_payload()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from fastapi import Request
+
+from amazon_order import ORDER_COLUMNS
+from streaming import json_default
+
+ARROW = "arrow"
+PARQUET = "parquet"
+COLUMNAR_FORMATS = {
+    ARROW: "application/vnd.apache.arrow.stream",
+    PARQUET: "application/vnd.apache.parquet",
+}
+# Accept values mapped to a format; application/x-parquet is common in older clients.
+_ACCEPT_TYPES = {
+    "application/vnd.apache.arrow.stream": ARROW,
+    "application/vnd.apache.parquet": PARQUET,
+    "application/x-parquet": PARQUET,
+}
+METADATA_KEY = b"dataset_metadata"
+
+_TIMESTAMP = pa.timestamp("s", tz="UTC")
+_MONEY = pa.decimal128(12, 2)
+# Wire types of the generated order rows; prices are formatted decimal strings in the rows.
+ORDER_ARROW_SCHEMA = pa.schema(
+    [
+        ("order_id", pa.string()),
+        ("created_at", _TIMESTAMP),
+        ("processed_at", _TIMESTAMP),
+        ("order_item_id", pa.string()),
+        ("product_id", pa.string()),
+        ("SKU", pa.string()),
+        ("quantity", pa.int64()),
+        ("price", _MONEY),
+        ("currency", pa.string()),
+        ("total_price", _MONEY),
+        ("customer_id", pa.string()),
+        ("is_b2b", pa.bool_()),
+    ]
+)
+
+
+def negotiate_columnar_format(request: Request, requested: str | None) -> str | None:
+    """Return the columnar format asked for via ``format=`` or ``Accept``, if any."""
+    if requested:
+        return requested if requested in COLUMNAR_FORMATS else None
+    for part in request.headers.get("accept", "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in _ACCEPT_TYPES:
+            return _ACCEPT_TYPES[media_type]
+    return None
+
+
+def _with_metadata(table: pa.Table, metadata: Dict[str, Any]) -> pa.Table:
+    encoded = json.dumps(metadata, default=json_default, separators=(",", ":")).encode("utf-8")
+    return table.replace_schema_metadata({METADATA_KEY: encoded})
+
+
+def orders_table(rows: Iterable[Mapping[str, Any]]) -> pa.Table:
+    """Collect generated rows column by column and build a typed Arrow table."""
+    columns: Dict[str, List[Any]] = {name: [] for name in ORDER_COLUMNS}
+    appenders = [(name, columns[name].append) for name in ORDER_COLUMNS]
+    for row in rows:
+        for name, append in appenders:
+            append(row[name])
+
+    arrays = []
+    for field in ORDER_ARROW_SCHEMA:
+        values = columns[field.name]
+        if pa.types.is_decimal(field.type):
+            arrays.append(pc.cast(pa.array(values, type=pa.string()), field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=ORDER_ARROW_SCHEMA)
+
+
+def products_table(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> pa.Table:
+    """Seed rows as string columns, matching the JSON payload."""
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    return pa.table({name: pa.array(column, type=pa.string()) for name, column in zip(columns, values)})
+
+
+def serialize_table(table: pa.Table, output_format: str, metadata: Dict[str, Any]) -> bytes:
+    table = _with_metadata(table, metadata)
+    sink = pa.BufferOutputStream()
+    if output_format == ARROW:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink, compression="zstd")
+    return sink.getvalue().to_pybytes()
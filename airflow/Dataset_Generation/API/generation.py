@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from starlette.concurrency import run_in_threadpool
+
+from amazon_order import OrdersPlan, OrdersWindow, plan_request
+from columnar import COLUMNAR_FORMATS, orders_table, serialize_table
+from seed_cache import SeedStore
+from streaming import encode
+
+# Worker processes for order generation; 0 keeps generation in the threadpool.
+GENERATION_WORKERS = int(os.environ.get("GENERATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Jobs allowed in flight per worker before further requests wait on the event loop.
+JOBS_PER_WORKER = 2
+
+_WORKER_STORE: SeedStore | None = None
+
+
+@dataclass(frozen=True)
+class OrdersJob:
+    """Picklable description of one /orders body; the worker rebuilds the plan from it."""
+
+    products_path: str | None
+    customer_path: str | None
+    accounts_path: str | None
+    order_goal: int
+    seed: int
+    processed_at: datetime
+    # Hourly window of a historical request; None for a single payload.
+    window_start: datetime | None
+    window_end: datetime | None
+    start: int
+    stop: int
+    pagination: Dict[str, Any] | None
+    # None for the default JSON body, otherwise a columnar format. Streamed formats
+    # are generated in the server process chunk by chunk and never become a job.
+    output_format: str | None
+    gzip: bool
+
+
+@dataclass(frozen=True)
+class RenderedBody:
+    body: bytes
+    media_type: str
+    metadata: Dict[str, Any]
+
+
+def count_orders(
+    plan: OrdersPlan | OrdersWindow, counts: Dict[str, int], start: int = 0, stop: int | None = None
+) -> Iterator[Dict[str, Any]]:
+    for lines in plan.iter_orders(start, stop):
+        counts["unique_orders"] += 1
+        counts["record_count"] += len(lines)
+        yield from lines
+
+
+def _init_worker() -> None:
+    global _WORKER_STORE
+    _WORKER_STORE = SeedStore.from_defaults()
+    _WORKER_STORE.preload()
+
+
+def render_orders(job: OrdersJob, store: SeedStore | None = None) -> RenderedBody:
+    """Generate and encode one /orders body; runs in a worker process or thread."""
+    store = store or _WORKER_STORE or SeedStore.from_defaults()
+    products = store.products(Path(job.products_path) if job.products_path else None)
+    buyers = store.buyers(
+        Path(job.customer_path) if job.customer_path else None,
+        Path(job.accounts_path) if job.accounts_path else None,
+    )
+    plan = plan_request(
+        products=products.available_products(),
+        buyers=buyers.buyers,
+        sources={
+            "products": str(products.source),
+            "customers": str(buyers.customer_source),
+            "accounts": str(buyers.accounts_source),
+        },
+        order_goal=job.order_goal,
+        seed=job.seed,
+        processed_at=job.processed_at,
+        window_start=job.window_start,
+        window_end=job.window_end,
+    )
+
+    def metadata(**counts: int) -> Dict[str, Any]:
+        result = plan.metadata(**counts)
+        if job.pagination is not None:
+            result["pagination"] = job.pagination
+        return result
+
+    counts = {"record_count": 0, "unique_orders": 0}
+    rows = count_orders(plan, counts, job.start, job.stop)
+    if job.output_format in COLUMNAR_FORMATS:
+        table = orders_table(rows)
+        body = serialize_table(table, job.output_format, metadata(**counts))
+        media_type = COLUMNAR_FORMATS[job.output_format]
+    else:
+        data = list(rows)
+        body = encode({"metadata": metadata(**counts), "data": data})
+        media_type = "application/json"
+    if job.gzip:
+        body = gzip.compress(body, compresslevel=6)
+    return RenderedBody(body=body, media_type=media_type, metadata=metadata())
+
+
+class GenerationPool:
+    """Bounded process pool for order generation, so the event loop only awaits results."""
+
+    def __init__(self, workers: int = GENERATION_WORKERS) -> None:
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._executor is not None:
+            return
+        # spawn, not fork: the server process already runs an event loop and threads.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+        )
+        self._slots = asyncio.Semaphore(self.workers * JOBS_PER_WORKER)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, job: OrdersJob, store: SeedStore) -> RenderedBody:
+        if self._executor is None or self._slots is None:
+            return await run_in_threadpool(partial(render_orders, job, store))
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, render_orders, job)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.append(str(CURRENT_DIR))
+
+from amazon_order import PayloadError
+from seed_cache import SeedStore
+
+LOGGER = logging.getLogger(__name__)
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the dataset API with several uvicorn worker processes.")
+    parser.add_argument("--host", default=os.environ.get("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("API_WORKERS", "1")),
+        help="uvicorn worker processes, each with its own seed cache and generation pool.",
+    )
+    parser.add_argument(
+        "--generation-workers",
+        type=int,
+        default=None,
+        help="Generation processes per uvicorn worker; defaults to GENERATION_WORKERS or an even share of the CPUs.",
+    )
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def check_seeds() -> bool:
+    """Parse the default seeds once, so a broken seed fails the launch instead of every worker's requests."""
+    store = SeedStore.from_defaults()
+    try:
+        products = store.products()
+        buyers = store.buyers()
+    except PayloadError as exc:
+        LOGGER.error("Seed data could not be loaded: %s", exc)
+        return False
+    LOGGER.info(
+        "Seeds ready: %s products from %s, %s buyers from %s and %s",
+        len(products.rows),
+        products.source,
+        len(buyers.buyers),
+        buyers.customer_source,
+        buyers.accounts_source,
+    )
+    return True
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+    if args.workers < 1:
+        raise SystemExit("--workers must be at least 1")
+
+    if args.generation_workers is not None:
+        os.environ["GENERATION_WORKERS"] = str(args.generation_workers)
+    elif "GENERATION_WORKERS" not in os.environ:
+        # Split the CPUs between the uvicorn workers rather than giving each a full pool.
+        os.environ["GENERATION_WORKERS"] = str(max(1, min(4, (os.cpu_count() or 1) // args.workers)))
+
+    if not check_seeds():
+        return 1
+
+    import uvicorn
+
+    # Every worker imports server:app and preloads the seeds in its lifespan before serving.
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=str(CURRENT_DIR),
+        log_level=args.log_level,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
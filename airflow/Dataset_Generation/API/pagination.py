@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+
+class CursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+@dataclass(frozen=True)
+class OrdersCursor:
+    """Everything needed to regenerate one /orders page without the earlier ones."""
+
+    offset: int
+    page_size: int
+    seed: int
+    order_goal: int
+    processed_at: str
+    # ISO bounds of an hourly window request, otherwise None.
+    window_start: str | None = None
+    window_end: str | None = None
+
+
+@dataclass(frozen=True)
+class ProductsCursor:
+    offset: int
+    page_size: int
+
+
+def encode_cursor(cursor: OrdersCursor | ProductsCursor) -> str:
+    raw = json.dumps(asdict(cursor), separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(token: str) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        fields = json.loads(raw)
+    except (binascii.Error, ValueError) as exc:
+        raise CursorError("malformed cursor") from exc
+    if not isinstance(fields, dict):
+        raise CursorError("malformed cursor")
+    return fields
+
+
+def decode_orders_cursor(token: str) -> OrdersCursor:
+    try:
+        cursor = OrdersCursor(**_decode(token))
+    except TypeError as exc:
+        raise CursorError("cursor does not belong to /orders") from exc
+    if not all(isinstance(value, int) for value in (cursor.offset, cursor.page_size, cursor.seed, cursor.order_goal)):
+        raise CursorError("malformed cursor")
+    if not all(value is None or isinstance(value, str) for value in (cursor.window_start, cursor.window_end)):
+        raise CursorError("malformed cursor")
+    # order_goal is per hour for window cursors, so the offset is checked against the plan later.
+    if cursor.offset < 0 or cursor.page_size < 1:
+        raise CursorError("cursor offset out of range")
+    return cursor
+
+
+def decode_products_cursor(token: str) -> ProductsCursor:
+    try:
+        cursor = ProductsCursor(**_decode(token))
+    except TypeError as exc:
+        raise CursorError("cursor does not belong to /products") from exc
+    if not all(isinstance(value, int) for value in (cursor.offset, cursor.page_size)):
+        raise CursorError("malformed cursor")
+    if cursor.offset < 0 or cursor.page_size < 1:
+        raise CursorError("cursor offset out of range")
+    return cursor
+
+
+def page_offsets(total: int, page_size: int) -> List[int]:
+    return list(range(0, total, page_size)) or [0]
+
+
+def pagination_metadata(
+    offset: int, page_size: int, total: int, next_cursor: str | None, page_cursors: List[str] | None = None
+) -> Dict[str, Any]:
+    metadata: Dict[str, Any] = {
+        "offset": offset,
+        "page_size": page_size,
+        "total": total,
+        "next_cursor": next_cursor,
+    }
+    if page_cursors is not None:
+        # Returned on the first page so clients can fetch the remaining pages concurrently.
+        metadata["page_cursors"] = page_cursors
+    return metadata
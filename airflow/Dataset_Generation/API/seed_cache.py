@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from amazon_order import (
+    Buyer,
+    PayloadError,
+    Product,
+    default_seed_paths,
+    load_buyers,
+    products_from_records,
+    read_products_seed,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+# Seed sets loaded for per-request path overrides; the default seeds are never evicted.
+OVERRIDE_CACHE_SIZE = int(os.environ.get("SEED_CACHE_SIZE", "16"))
+
+FileSignature = Tuple[Tuple[str, int, int], ...]
+
+
+@dataclass(frozen=True)
+class ProductsSeed:
+    source: Path
+    columns: Tuple[str, ...]
+    rows: Tuple[Tuple[str, ...], ...]
+    # Order generation needs available products; a seed that cannot build orders
+    # can still be served by /products, so the error is kept instead of raised.
+    products: Tuple[Product, ...]
+    products_error: PayloadError | None
+    digest: str
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def available_products(self) -> Tuple[Product, ...]:
+        if self.products_error is not None:
+            raise self.products_error
+        return self.products
+
+
+@dataclass(frozen=True)
+class BuyersSeed:
+    customer_source: Path
+    accounts_source: Path
+    buyers: Tuple[Buyer, ...]
+    digest: str
+
+
+@dataclass(frozen=True)
+class _Entry:
+    signature: FileSignature
+    value: Any
+
+
+def _signature(*paths: Path) -> FileSignature:
+    """mtime/size fingerprint of the seed files, empty if any of them is missing."""
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            return ()
+        signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _digest(*paths: Path) -> str:
+    """Content hash of the seed files, used to key cached responses."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _load_products_seed(path: Path) -> ProductsSeed:
+    records, columns = read_products_seed(path)
+    try:
+        products, products_error = tuple(products_from_records(records)), None
+    except PayloadError as exc:
+        products, products_error = (), exc
+    return ProductsSeed(
+        source=path,
+        columns=tuple(columns),
+        rows=tuple(tuple(record.get(column) for column in columns) for record in records),
+        products=products,
+        products_error=products_error,
+        digest=_digest(path),
+    )
+
+
+def _load_buyers_seed(customer_path: Path, accounts_path: Path) -> BuyersSeed:
+    return BuyersSeed(
+        customer_source=customer_path,
+        accounts_source=accounts_path,
+        buyers=tuple(load_buyers(customer_path, accounts_path)),
+        digest=_digest(customer_path, accounts_path),
+    )
+
+
+class SeedStore:
+    """Parsed seed files kept in memory and swapped out when their mtime changes.
+
+    Entries are immutable snapshots: a reload parses the files outside the lock and
+    replaces the entry in one assignment, so concurrent requests see either the old
+    or the new seed, never a mix. Paths other than the defaults are kept in a keyed
+    LRU of ``max_overrides`` entries.
+    """
+
+    def __init__(
+        self,
+        products_path: Path,
+        customer_path: Path,
+        accounts_path: Path,
+        max_overrides: int = OVERRIDE_CACHE_SIZE,
+    ) -> None:
+        self.products_path = products_path
+        self.customer_path = customer_path
+        self.accounts_path = accounts_path
+        self.max_overrides = max_overrides
+        self._pinned = {
+            ("products", products_path),
+            ("buyers", customer_path, accounts_path),
+        }
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_defaults(cls, max_overrides: int = OVERRIDE_CACHE_SIZE) -> "SeedStore":
+        return cls(*default_seed_paths(), max_overrides=max_overrides)
+
+    def preload(self) -> None:
+        """Load the default seeds; failures are logged and retried on first request."""
+        for load in (self.products, self.buyers):
+            try:
+                load()
+            except PayloadError as exc:
+                LOGGER.warning("Could not preload seed data: %s", exc)
+
+    def products(self, path: Path | None = None) -> ProductsSeed:
+        path = path or self.products_path
+        return self._get(("products", path), (path,), lambda: _load_products_seed(path))
+
+    def buyers(self, customer_path: Path | None = None, accounts_path: Path | None = None) -> BuyersSeed:
+        customer_path = customer_path or self.customer_path
+        accounts_path = accounts_path or self.accounts_path
+        return self._get(
+            ("buyers", customer_path, accounts_path),
+            (customer_path, accounts_path),
+            lambda: _load_buyers_seed(customer_path, accounts_path),
+        )
+
+    def _get(self, key: Hashable, paths: Tuple[Path, ...], loader: Callable[[], Any]) -> Any:
+        signature = _signature(*paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and signature and entry.signature == signature:
+            return entry.value
+
+        try:
+            value = loader()
+        except PayloadError as exc:
+            if entry is None:
+                raise
+            # Keep serving the last good snapshot while a seed is being rewritten.
+            LOGGER.warning("Seed reload failed, serving previous data: %s", exc)
+            return entry.value
+        # A write that landed while parsing leaves an empty signature, forcing another reload.
+        fresh = _signature(*paths)
+        with self._lock:
+            self._entries[key] = _Entry(signature=fresh if fresh == signature else (), value=value)
+            self._entries.move_to_end(key)
+            self._evict()
+        if entry is not None:
+            LOGGER.info("Reloaded seed data for %s", ", ".join(str(path) for path in paths))
+        return value
+
+    def _evict(self) -> None:
+        overrides = [key for key in self._entries if key not in self._pinned]
+        for key in overrides[: max(0, len(overrides) - self.max_overrides)]:
+            del self._entries[key]
@@ -1,71 +1,344 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
 from pathlib import Path
 import sys
+from datetime import datetime, timezone
+from typing import Any, Dict
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 
 CURRENT_DIR = Path(__file__).resolve().parent
 if str(CURRENT_DIR) not in sys.path:
     sys.path.append(str(CURRENT_DIR))
 
 from amazon_order import (
+    OrdersPlan,
+    OrdersWindow,
     PayloadError,
-    load_orders_payload,
-    load_products_payload,
+    build_products_payload,
+    hour_window,
+    plan_request,
+)
+from pagination import (
+    CursorError,
+    OrdersCursor,
+    ProductsCursor,
+    decode_orders_cursor,
+    decode_products_cursor,
+    encode_cursor,
+    page_offsets,
+    pagination_metadata,
+)
+from columnar import (
+    COLUMNAR_FORMATS,
+    negotiate_columnar_format,
+    products_table,
+    serialize_table,
+)
+from generation import GenerationPool, OrdersJob, RenderedBody, count_orders
+from response_cache import CachedResponse, ResponseCache, etag_for, etag_matches
+from seed_cache import SeedStore
+from streaming import (
+    EncodedJSONResponse,
+    accepts_gzip,
+    metadata_header,
+    negotiate_stream_format,
+    stream_rows,
 )
 
+SEED_STORE = SeedStore.from_defaults()
+RESPONSE_CACHE = ResponseCache()
+GENERATION_POOL = GenerationPool()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await run_in_threadpool(SEED_STORE.preload)
+    GENERATION_POOL.start()
+    try:
+        yield
+    finally:
+        GENERATION_POOL.shutdown()
+
 
 app = FastAPI(
     title="Amazon Dataset API",
     version="0.2.0",
     description="Serve denormalised product and order data sourced from dbt seeds.",
+    lifespan=lifespan,
+    default_response_class=EncodedJSONResponse,
 )
 
 
+FORMAT_QUERY = Query(
+    None,
+    pattern="^(json|ndjson|json-stream|arrow|parquet)$",
+    description=(
+        "json (default), ndjson or json-stream (streamed in chunks), or arrow/parquet "
+        "for a columnar body. Accept headers for these media types work as well."
+    ),
+)
+MAX_PAGE_SIZE = 10_000
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _orders_cursor(plan: OrdersPlan | OrdersWindow, offset: int, page_size: int) -> str:
+    parameters = plan.regeneration_parameters()
+    return encode_cursor(
+        OrdersCursor(
+            offset=offset,
+            page_size=page_size,
+            seed=parameters["seed"],
+            order_goal=parameters["order_goal"],
+            processed_at=parameters["processed_at"].isoformat(),
+            window_start=_isoformat(parameters["window_start"]),
+            window_end=_isoformat(parameters["window_end"]),
+        )
+    )
+
+
 @app.get("/products")
-def get_products(products_path: str | None = None) -> dict:
-    """Return the full products seed as JSON with metadata."""
+async def get_products(
+    request: Request,
+    products_path: str | None = None,
+    format: str | None = FORMAT_QUERY,
+    page_size: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+):
+    """Return the products seed as JSON with metadata, optionally one page at a time."""
 
     path = Path(products_path) if products_path else None
     try:
-        payload = load_products_payload(path)
+        page_cursor = decode_products_cursor(cursor) if cursor else None
+    except CursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    try:
+        products = await run_in_threadpool(SEED_STORE.products, path)
     except PayloadError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
-    return payload.to_dict()
+
+    total = len(products.rows)
+    offset, stop, pagination = 0, total, None
+    if page_size is not None or page_cursor is not None:
+        offset = page_cursor.offset if page_cursor else 0
+        page_size = page_size or page_cursor.page_size
+        stop = min(offset + page_size, total)
+        next_cursor = encode_cursor(ProductsCursor(offset=stop, page_size=page_size)) if stop < total else None
+        pagination = pagination_metadata(offset, page_size, total, next_cursor)
+
+    payload = build_products_payload(products.records()[offset:stop], products.columns, products.source)
+    if pagination is not None:
+        payload.metadata["pagination"] = pagination
+
+    columnar_format = negotiate_columnar_format(request, format)
+    if columnar_format:
+        table = products_table(products.columns, products.rows[offset:stop])
+        body = await run_in_threadpool(serialize_table, table, columnar_format, payload.metadata)
+        return Response(
+            content=body,
+            media_type=COLUMNAR_FORMATS[columnar_format],
+            headers=metadata_header(payload.metadata),
+        )
+
+    stream_format = negotiate_stream_format(request, format)
+    if stream_format:
+        return stream_rows(request, stream_format, payload.data, payload.metadata, lambda: payload.metadata)
+    return EncodedJSONResponse(payload.to_dict())
 
 
 @app.get("/orders")
-def get_orders(
+async def get_orders(
+    request: Request,
     products_path: str | None = None,
     customer_path: str | None = None,
     accounts_path: str | None = None,
     order_goal: int | None = Query(None, ge=1),
     seed: int | None = None,
-) -> dict:
-    """Return generated mock order payload using seed datasets."""
+    format: str | None = FORMAT_QUERY,
+    page_size: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Orders per page."),
+    cursor: str | None = None,
+    as_of: datetime | None = Query(None, description="Processing time to generate for; naive values are UTC."),
+    start: datetime | None = Query(None, description="Start of an hourly window of historical orders."),
+    end: datetime | None = Query(None, description="End of the window; defaults to one hour after start."),
+    if_none_match: str | None = Header(None),
+):
+    """Return generated mock order payload using seed datasets.
 
-    kwargs = {
-        "products_path": Path(products_path) if products_path else None,
-        "customer_path": Path(customer_path) if customer_path else None,
-        "accounts_path": Path(accounts_path) if accounts_path else None,
-        "order_goal": order_goal,
-        "seed": seed,
-    }
+    With ``page_size`` the orders are split into pages. The cursor pins the seed,
+    order goal and processing time, so any page can be regenerated on its own.
+    A request with both ``seed`` and ``as_of`` (or a cursor) is fully deterministic
+    and carries an ETag for conditional requests; JSON and columnar bodies are also
+    answered from the response cache, while ndjson/json-stream bodies are always streamed.
+
+    ``start``/``end`` return the orders created in that window of whole UTC hours,
+    ``order_goal`` per hour. Each hour is generated from a seed derived from ``seed``
+    (default 0) and the hour, so window requests are always deterministic.
+    """
+
+    try:
+        page_cursor = decode_orders_cursor(cursor) if cursor else None
+    except CursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if end is not None and start is None:
+        raise HTTPException(status_code=400, detail="end requires start")
+    if as_of is not None and start is not None:
+        raise HTTPException(status_code=400, detail="as_of cannot be combined with start/end")
+    processed_at = _utc(as_of) if as_of is not None else None
+    window_start = window_end = None
+    if start is not None:
+        try:
+            window_start, window_end = hour_window(start, end)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if page_cursor is not None:
+        seed = page_cursor.seed
+        order_goal = page_cursor.order_goal
+        processed_at = datetime.fromisoformat(page_cursor.processed_at)
+        window_start = datetime.fromisoformat(page_cursor.window_start) if page_cursor.window_start else None
+        window_end = datetime.fromisoformat(page_cursor.window_end) if page_cursor.window_end else None
+    deterministic = window_start is not None or (seed is not None and processed_at is not None)
 
     try:
-        payload = load_orders_payload(**kwargs)
+        products = await run_in_threadpool(SEED_STORE.products, Path(products_path) if products_path else None)
+        buyers = await run_in_threadpool(
+            SEED_STORE.buyers,
+            Path(customer_path) if customer_path else None,
+            Path(accounts_path) if accounts_path else None,
+        )
+        plan = plan_request(
+            products=products.available_products(),
+            buyers=buyers.buyers,
+            sources={
+                "products": str(products.source),
+                "customers": str(buyers.customer_source),
+                "accounts": str(buyers.accounts_source),
+            },
+            order_goal=order_goal,
+            seed=seed,
+            processed_at=processed_at,
+            window_start=window_start,
+            window_end=window_end,
+        )
     except PayloadError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
-    return payload.to_dict()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    offset, stop, pagination = 0, plan.order_goal, None
+    if page_size is not None or page_cursor is not None:
+        page_size = page_size or page_cursor.page_size
+        offset = page_cursor.offset if page_cursor else 0
+        if offset > plan.order_goal:
+            raise HTTPException(status_code=400, detail="cursor offset out of range")
+        stop = min(offset + page_size, plan.order_goal)
+        next_cursor = _orders_cursor(plan, stop, page_size) if stop < plan.order_goal else None
+        page_cursors = None
+        if page_cursor is None:
+            page_cursors = [
+                _orders_cursor(plan, offset, page_size) for offset in page_offsets(plan.order_goal, page_size)
+            ]
+        pagination = pagination_metadata(offset, page_size, plan.order_goal, next_cursor, page_cursors)
+
+    columnar_format = negotiate_columnar_format(request, format)
+    stream_format = None if columnar_format else negotiate_stream_format(request, format)
+    output_format = columnar_format or stream_format
+    # Parquet is compressed already and Arrow is read zero-copy, so neither is gzipped.
+    use_gzip = accepts_gzip(request) and not columnar_format
+
+    etag = None
+    if deterministic:
+        parameters = plan.regeneration_parameters()
+        cache_key = (
+            "orders",
+            parameters["seed"],
+            parameters["order_goal"],
+            parameters["processed_at"].isoformat(),
+            _isoformat(parameters["window_start"]),
+            _isoformat(parameters["window_end"]),
+            offset,
+            stop,
+            page_size,
+            page_cursor is None,
+            output_format or "json",
+            use_gzip,
+            tuple(sorted(plan.sources.items())),
+            products.digest,
+            buyers.digest,
+        )
+        etag = etag_for(cache_key)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    if stream_format:
+        # Rows are generated while the body is sent; the counts are only final afterwards.
+        # Streamed bodies bypass the worker pool and the response cache, so memory stays
+        # bounded by one chunk; deterministic ones still carry an ETag.
+        def metadata(**counts: int) -> Dict[str, Any]:
+            result = plan.metadata(**counts)
+            if pagination is not None:
+                result["pagination"] = pagination
+            return result
+
+        counts = {"record_count": 0, "unique_orders": 0}
+        rows = count_orders(plan, counts, offset, stop)
+        response = stream_rows(request, stream_format, rows, metadata(), lambda: metadata(**counts))
+        if etag is not None:
+            response.headers["ETag"] = etag
+        return response
+
+    job = OrdersJob(
+        products_path=products_path,
+        customer_path=customer_path,
+        accounts_path=accounts_path,
+        **plan.regeneration_parameters(),
+        start=offset,
+        stop=stop,
+        pagination=pagination,
+        output_format=columnar_format,
+        gzip=use_gzip,
+    )
+    if etag is None:
+        rendered = await GENERATION_POOL.render(job, SEED_STORE)
+        return Response(content=rendered.body, media_type=rendered.media_type, headers=_body_headers(job, rendered))
+
+    cached = RESPONSE_CACHE.get(cache_key)
+    cache_status = "HIT"
+    if cached is None:
+        rendered = await GENERATION_POOL.render(job, SEED_STORE)
+        headers = {"ETag": etag, **_body_headers(job, rendered)}
+        cached = CachedResponse(body=rendered.body, media_type=rendered.media_type, headers=headers)
+        RESPONSE_CACHE.put(cache_key, cached)
+        cache_status = "MISS"
+    return Response(
+        content=cached.body,
+        media_type=cached.media_type,
+        headers={**cached.headers, "X-Cache": cache_status},
+    )
+
+
+def _body_headers(job: OrdersJob, rendered: RenderedBody) -> Dict[str, str]:
+    headers = metadata_header(rendered.metadata) if job.output_format else {}
+    if job.gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return headers
 
 
 @app.get("/health")
-def healthcheck() -> dict:
+async def healthcheck() -> dict:
     return {"status": "ok"}
 
 
 if __name__ == "__main__":  # pragma: no cover - manual launch helper
-    import uvicorn
+    from launcher import main
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    sys.exit(main())
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+# Rows are serialized and flushed in batches so each chunk is one write, not one per row.
+ROWS_PER_CHUNK = 500
+METADATA_HEADER = "X-Dataset-Metadata"
+
+NDJSON = "ndjson"
+JSON_STREAM = "json-stream"
+STREAM_FORMATS = {
+    NDJSON: "application/x-ndjson",
+    JSON_STREAM: "application/json",
+}
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_ENCODER = json.JSONEncoder(default=json_default, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode(value: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson encodes datetimes natively when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default)
+    return _ENCODER.encode(value).encode("utf-8")
+
+
+class EncodedJSONResponse(JSONResponse):
+    """JSONResponse that skips ``jsonable_encoder``-style conversion and encodes directly."""
+
+    def render(self, content: Any) -> bytes:
+        return encode(content)
+
+
+def ndjson_chunks(rows: Iterable[Mapping[str, Any]]) -> Iterator[bytes]:
+    """One JSON object per line, emitted ``ROWS_PER_CHUNK`` rows at a time."""
+    batch = []
+    for row in rows:
+        batch.append(encode(row))
+        if len(batch) >= ROWS_PER_CHUNK:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def json_array_chunks(
+    rows: Iterable[Mapping[str, Any]], trailer: Callable[[], Dict[str, Any]]
+) -> Iterator[bytes]:
+    """``{"data": [...], "metadata": {...}}`` with the metadata written after the rows.
+
+    ``trailer`` is called once the rows are exhausted, so it can report counts that
+    are only known after generation.
+    """
+    yield b'{"data":['
+    first = True
+    for chunk in ndjson_chunks(rows):
+        body = chunk.rstrip(b"\n").replace(b"\n", b",")
+        yield body if first else b"," + body
+        first = False
+    yield b'],"metadata":' + encode(trailer()) + b"}"
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(request: Request) -> bool:
+    encodings = request.headers.get("accept-encoding", "")
+    return any(part.split(";")[0].strip() == "gzip" for part in encodings.split(","))
+
+
+def negotiate_stream_format(request: Request, requested: str | None) -> str | None:
+    """Return the streaming format asked for via ``format=`` or ``Accept``, if any."""
+    if requested:
+        return requested if requested in STREAM_FORMATS else None
+    accept = request.headers.get("accept", "")
+    if "application/x-ndjson" in accept:
+        return NDJSON
+    return None
+
+
+def render_chunks(
+    stream_format: str,
+    rows: Iterable[Mapping[str, Any]],
+    trailer: Callable[[], Dict[str, Any]],
+) -> Iterator[bytes]:
+    if stream_format == NDJSON:
+        return ndjson_chunks(rows)
+    return json_array_chunks(rows, trailer)
+
+
+def metadata_header(metadata: Dict[str, Any]) -> Dict[str, str]:
+    # Header values must be latin-1, so the header copy keeps ASCII escapes.
+    return {METADATA_HEADER: json.dumps(metadata, default=json_default, separators=(",", ":"))}
+
+
+def stream_rows(
+    request: Request,
+    stream_format: str,
+    rows: Iterable[Mapping[str, Any]],
+    header_metadata: Dict[str, Any],
+    trailer: Callable[[], Dict[str, Any]],
+) -> StreamingResponse:
+    """Build a chunked response; metadata goes into a header and, for JSON, a trailer."""
+    chunks = render_chunks(stream_format, rows, trailer)
+    headers = metadata_header(header_metadata)
+    if accepts_gzip(request):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(chunks, media_type=STREAM_FORMATS[stream_format], headers=headers)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+import httpx
+
+AIRFLOW_ROOT = Path(__file__).resolve().parents[1]
+LAUNCHER = AIRFLOW_ROOT / "Dataset_Generation" / "API" / "launcher.py"
+# Fixed inputs for --cached runs, so every request after the first is a response-cache hit.
+CACHED_SEED = 1
+CACHED_AS_OF = "2024-01-01T12:00:00+00:00"
+
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(round(fraction * len(ordered), 6)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def request_params(order_goal: int, response_format: str, cached: bool) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"order_goal": order_goal, "format": response_format}
+    if cached:
+        params.update(seed=CACHED_SEED, as_of=CACHED_AS_OF)
+    return params
+
+
+async def run_cell(
+    client: httpx.AsyncClient,
+    order_goal: int,
+    concurrency: int,
+    requests: int,
+    response_format: str,
+    cached: bool,
+) -> Dict[str, Any]:
+    """Send ``requests`` /orders calls from ``concurrency`` concurrent clients and summarize them."""
+    params = request_params(order_goal, response_format, cached)
+    pending = iter(range(requests))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    received = 0
+
+    async def client_loop() -> None:
+        nonlocal received
+        for _ in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.get("/orders", params=params)
+                status = str(response.status_code)
+                received += len(response.content)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "order_goal": order_goal,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status != "200"),
+        "statuses": statuses,
+        "seconds": round(elapsed, 4),
+        "requests_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mb_per_s": round(received / 2**20 / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99": round(percentile(ordered, 0.99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+    }
+
+
+async def run_matrix(args: argparse.Namespace, base_url: str, server_workers: int | None) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results: List[Dict[str, Any]] = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for order_goal in args.order_goals:
+            for concurrency in args.concurrency:
+                if args.warmup:
+                    await run_cell(client, order_goal, concurrency, args.warmup, args.format, args.cached)
+                result = await run_cell(client, order_goal, concurrency, args.requests, args.format, args.cached)
+                result.update(server_workers=server_workers, format=args.format, cached=args.cached)
+                results.append(result)
+                print(json.dumps(result))
+    return results
+
+
+def wait_until_healthy(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"API at {base_url} did not become healthy within {timeout}s")
+        time.sleep(0.25)
+
+
+@contextmanager
+def launched_server(port: int, workers: int, startup_timeout: float) -> Iterator[str]:
+    """Start the API through the launcher and stop it when the block exits."""
+    process = subprocess.Popen(
+        [sys.executable, str(LAUNCHER), "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_healthy(base_url, startup_timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure /orders throughput and latency of the dataset API.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="API to test when --server-workers is not set.")
+    parser.add_argument(
+        "--server-workers",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Launch the API locally once per worker count instead of using --base-url.",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port for launched servers.")
+    parser.add_argument("--order-goals", type=int, nargs="+", default=[100, 1_000, 5_000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=50, help="Measured requests per order_goal/concurrency cell.")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests sent before each cell.")
+    parser.add_argument("--format", default="json", choices=["json", "ndjson", "json-stream", "arrow", "parquet"])
+    parser.add_argument("--cached", action="store_true", help="Pin seed and as_of so responses come from the cache.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON results file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    results: List[Dict[str, Any]] = []
+    if args.server_workers:
+        for workers in args.server_workers:
+            with launched_server(args.port, workers, args.startup_timeout) as base_url:
+                results.extend(asyncio.run(run_matrix(args, base_url, workers)))
+    else:
+        results.extend(asyncio.run(run_matrix(args, args.base_url.rstrip("/"), None)))
+    if args.output:
+        report = {"generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "results": results}
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
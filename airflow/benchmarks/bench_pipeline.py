@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from random import Random
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+AIRFLOW_ROOT = BENCHMARKS_DIR.parent
+for extra in (BENCHMARKS_DIR, AIRFLOW_ROOT / "dags", AIRFLOW_ROOT / "Dataset_Generation" / "CSV"):
+    if str(extra) not in sys.path:
+        sys.path.append(str(extra))
+
+import numpy as np
+import pandas as pd
+
+import dag_stubs
+
+SEEDS_DIR = AIRFLOW_ROOT / "dbt" / "hitex-case-study" / "seeds"
+DDL_PATH = AIRFLOW_ROOT.parent / "SQL" / "create_raw_tables.sql"
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baselines" / "pipeline.json"
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000, 10_000_000]
+INTERVAL_START = "2025-01-02T03:00:00+00:00"
+
+# A run of the timed callable returns the number of rows it produced.
+Runner = Callable[[], int]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    prepare: Callable[[int, Path], Runner]
+    # False for cases whose cost does not depend on a row count; they run once.
+    scales: bool = True
+    max_rows: int | None = None
+    note: str = ""
+
+
+class _Response:
+    """Minimal requests.Response for a pre-rendered API body."""
+
+    def __init__(self, content: bytes, content_type: str = "application/json") -> None:
+        self.status_code = 200
+        self.content = content
+        self.headers = {"Content-Type": content_type}
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class _TaskInstance:
+    def __init__(self, xcom: Dict[str, Any]) -> None:
+        self.xcom = xcom
+
+    def xcom_pull(self, task_ids: str) -> Any:
+        return self.xcom[task_ids]
+
+    def xcom_push(self, key: str, value: Any) -> None:
+        self.xcom[key] = value
+
+
+def _context(xcom: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    import pendulum
+
+    start = pendulum.parse(INTERVAL_START)
+    return {
+        "data_interval_start": start,
+        "data_interval_end": start.add(hours=1),
+        "logical_date": start,
+        "ds": start.to_date_string(),
+        "ds_nodash": start.format("YYYYMMDD"),
+        "dag": dag_stubs.Placeholder(dag_id="benchmark"),
+        "ti": _TaskInstance(xcom or {}),
+    }
+
+
+def _api_body(frame: pd.DataFrame) -> bytes:
+    return b'{"metadata":{},"data":' + frame.to_json(orient="records").encode("utf-8") + b"}"
+
+
+def _order_api_rows(rows: int) -> pd.DataFrame:
+    """Order lines shaped like /orders rows, four per order, for seed buyers and products."""
+    rng = np.random.default_rng(7)
+    customers = pd.read_csv(SEEDS_DIR / "customer.csv")["customer_id"].to_numpy()
+    accounts = pd.read_csv(SEEDS_DIR / "accounts.csv")["account_id"].to_numpy()
+    products = pd.read_csv(SEEDS_DIR / "products.csv", dtype=str)
+    buyers = np.concatenate([customers, accounts])
+    is_b2b = np.arange(len(buyers)) >= len(customers)
+
+    order_index = np.arange(rows) // 4
+    orders = int(order_index[-1]) + 1
+    buyer = rng.integers(0, len(buyers), orders)[order_index]
+    product = rng.integers(0, len(products), rows)
+    quantity = rng.integers(1, 6, rows)
+    price = products["price"].astype(float).to_numpy()[product]
+    created = pd.Timestamp(INTERVAL_START) + pd.to_timedelta(rng.integers(0, 3600, orders)[order_index], unit="s")
+    order_ids = pd.Series(order_index).astype(str)
+    return pd.DataFrame(
+        {
+            "order_id": "order-" + order_ids,
+            "created_at": created.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            "processed_at": "2025-01-02T04:00:00+00:00",
+            "order_item_id": "item-" + pd.Series(np.arange(rows)).astype(str),
+            "product_id": products["product_id"].to_numpy()[product],
+            "SKU": products["seller_sku"].to_numpy()[product],
+            "quantity": quantity,
+            "price": pd.Series(price).map("{:.2f}".format),
+            "currency": "EUR",
+            "total_price": pd.Series(price * quantity).map("{:.2f}".format),
+            "customer_id": buyers[buyer],
+            "is_b2b": is_b2b[buyer],
+        }
+    )
+
+
+def _tiled_seed(filename: str, rows: int, unique_columns: List[str]) -> pd.DataFrame:
+    """Repeat a seed file up to ``rows`` rows, suffixing ``unique_columns`` per tile."""
+    seed = pd.read_csv(SEEDS_DIR / filename, dtype=str)
+    tiles = -(-rows // len(seed))
+    frame = pd.concat([seed] * tiles, ignore_index=True).iloc[:rows]
+    tile_ids = (pd.RangeIndex(len(frame)) // len(seed)).astype(str)
+    for column in unique_columns:
+        frame[column] = frame[column] + "-" + tile_ids
+    return frame
+
+
+def prepare_fetch_amazon_orders(rows: int, workdir: Path) -> Runner:
+    import raw_amazon_order_ingestion as module
+
+    response = _Response(_api_body(_order_api_rows(rows)))
+    module.requests.get = lambda *args, **kwargs: response
+    context = _context()
+
+    def run() -> int:
+        result = module.fetch_amazon_orders(**context)
+        return sum(1 for _ in open(result["items_local_path"], encoding="utf-8"))
+
+    return run
+
+
+def prepare_fetch_amazon_catalog(rows: int, workdir: Path) -> Runner:
+    import raw_amazon_catalog_ingestion as module
+
+    response = _Response(_api_body(_tiled_seed("products.csv", rows, ["product_id", "asin", "seller_sku"])))
+    module.requests.get = lambda *args, **kwargs: response
+    context = _context()
+
+    def run() -> int:
+        result = module.fetch_amazon_catalog(**context)
+        return sum(1 for _ in open(result["local_path"], encoding="utf-8"))
+
+    return run
+
+
+def prepare_shopify_orders(rows: int, workdir: Path) -> Runner:
+    import raw_shopify_order_ingestion as module
+    from bench_shopify_csv_read import write_line_csv
+
+    generated = workdir / "shopify_order_generated.csv"
+    write_line_csv(generated, rows)
+    context = _context({"generate_shopify_orders": str(generated)})
+
+    def run() -> int:
+        module.prepare_shopify_orders(**context)
+        return rows
+
+    return run
+
+
+def prepare_shopify_customers(rows: int, workdir: Path) -> Runner:
+    import raw_shopify_customer_ingestion as module
+
+    seed = _tiled_seed("customer.csv", rows, ["customer_id"])
+    generated = workdir / "shopify_customer_generated.csv"
+    pd.DataFrame(
+        {
+            "ingested_at": INTERVAL_START,
+            "id": seed["customer_id"],
+            "email": seed["email"],
+            "verified_email": seed["email"],
+            "addresses_json": seed["address_json"],
+            "load_at": INTERVAL_START,
+            "load_id": "benchmark",
+            "session_id": "benchmark",
+            "source_file": "shopify_customer_20250102T03.csv",
+            "source_ts": INTERVAL_START,
+            "ingestion_uuid": "benchmark",
+        }
+    ).to_csv(generated, index=False)
+    context = _context({"generate_shopify_customers": str(generated)})
+
+    def run() -> int:
+        module.prepare_shopify_customers(**context)
+        return rows
+
+    return run
+
+
+def prepare_shopify_order_generator(rows: int, workdir: Path) -> Runner:
+    import shopify_order as generator
+
+    products = generator.load_products(SEEDS_DIR / "products.csv")
+    # Average order size is (MIN + MAX) / 2 items; add buyers until their capacity covers the orders.
+    average_items = (generator.MIN_ITEMS_PER_ORDER + min(generator.MAX_ITEMS_PER_ORDER, len(products))) / 2
+    orders = max(1, round(rows / average_items))
+    buyer_count = -(-orders // generator.MAX_ORDERS_PER_CUSTOMER)
+    buyers = [generator.Buyer(f"buyer-{index}", index % 2 == 1) for index in range(buyer_count)]
+    processed_at = datetime.fromisoformat(INTERVAL_START)
+
+    def run() -> int:
+        generated = generator.build_orders(Random(7), buyers, products, processed_at, orders)
+        generator.write_csv(generated, workdir / "shopify_orders.csv")
+        return len(generated)
+
+    return run
+
+
+def prepare_shopify_customer_generator(rows: int, workdir: Path) -> Runner:
+    import shopify_customer as generator
+
+    generator.ROW_COUNT = rows
+    schema = generator.extract_shopify_customer_schema(DDL_PATH)
+    seed_frame = generator.load_customer_seed(SEEDS_DIR)
+
+    def run() -> int:
+        frame = generator.build_mock_dataframe(seed_frame, schema)
+        generator.save_csv(frame, workdir)
+        return len(frame)
+
+    return run
+
+
+def prepare_load_table_ddl(rows: int, workdir: Path) -> Runner:
+    import re
+
+    import common
+
+    tables = re.findall(r"CREATE TABLE IF NOT EXISTS\s+`[^`.]*\.?([^`]+)`", DDL_PATH.read_text(encoding="utf-8"))
+
+    def run() -> int:
+        # Cold cache: every table is parsed out of the DDL file once.
+        common._DDL_CACHE.clear()
+        for table in tables:
+            common.load_table_ddl(table, "benchmark-project", "raw")
+        return len(tables)
+
+    return run
+
+
+CASES: Dict[str, Case] = {
+    case.name: case
+    for case in [
+        Case("fetch_amazon_orders", prepare_fetch_amazon_orders),
+        Case("fetch_amazon_catalog", prepare_fetch_amazon_catalog),
+        Case("prepare_shopify_orders", prepare_shopify_orders),
+        Case("prepare_shopify_customers", prepare_shopify_customers),
+        Case(
+            "generate_shopify_orders",
+            prepare_shopify_order_generator,
+            max_rows=1_000_000,
+            note="build_orders rescans every buyer per order, so its cost grows quadratically with rows",
+        ),
+        Case("generate_shopify_customers", prepare_shopify_customer_generator),
+        Case("load_table_ddl", prepare_load_table_ddl, scales=False),
+    ]
+}
+
+
+def _rss_kb(field: str) -> int:
+    """VmRSS/VmHWM of this process in KiB, falling back to ru_maxrss off Linux."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak_rss() -> None:
+    # Writing 5 to clear_refs resets VmHWM, so the peak excludes setup allocations.
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as handle:
+            handle.write("5")
+    except OSError:
+        pass
+
+
+def _measure_in_child(name: str, rows: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        dag_stubs.install(
+            {
+                "amazon_json_output_dir": str(workdir / "amazon"),
+                "shopify_csv_output_dir": str(workdir / "shopify"),
+                "shopify_customer_csv_output_dir": str(workdir / "shopify_customers"),
+            }
+        )
+        logging.disable(logging.INFO)
+        run = CASES[name].prepare(rows, workdir)
+        gc.collect()
+        _reset_peak_rss()
+        rss_before = _rss_kb("VmRSS")
+        started = time.perf_counter()
+        produced = run()
+        elapsed = time.perf_counter() - started
+        peak = _rss_kb("VmHWM")
+    return {
+        "case": name,
+        "rows": rows if CASES[name].scales else None,
+        "produced_rows": produced,
+        "seconds": round(elapsed, 4),
+        "rows_per_s": round(produced / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(peak / 1024, 2),
+        "rss_growth_mb": round((peak - rss_before) / 1024, 2),
+    }
+
+
+def measure(name: str, rows: int) -> Dict[str, Any]:
+    """Run one case in a fresh process so stubs, caches and peak memory don't leak across cases."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_measure_in_child, (name, rows))
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> int:
+    """Annotate results with their baseline ratios; returns the number of regressions."""
+    previous = {(entry["case"], entry["rows"]): entry for entry in baseline.get("results", []) if "seconds" in entry}
+    regressions = 0
+    for result in results:
+        entry = previous.get((result["case"], result["rows"]))
+        if entry is None or "seconds" not in result:
+            continue
+        seconds_ratio = result["seconds"] / entry["seconds"] if entry["seconds"] else None
+        rss_ratio = result["peak_rss_mb"] / entry["peak_rss_mb"] if entry["peak_rss_mb"] else None
+        regressed = any(ratio is not None and ratio > 1 + tolerance for ratio in (seconds_ratio, rss_ratio))
+        result["baseline"] = {
+            "seconds": entry["seconds"],
+            "peak_rss_mb": entry["peak_rss_mb"],
+            "seconds_ratio": round(seconds_ratio, 3) if seconds_ratio is not None else None,
+            "peak_rss_ratio": round(rss_ratio, 3) if rss_ratio is not None else None,
+            "regression": regressed,
+        }
+        regressions += regressed
+    return regressions
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Time and peak memory of the DAG tasks and generators.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Stored results to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown or memory growth ratio.")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON results file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    results: List[Dict[str, Any]] = []
+    for name in args.cases:
+        case = CASES[name]
+        for rows in args.rows if case.scales else args.rows[:1]:
+            if case.max_rows is not None and rows > case.max_rows:
+                result: Dict[str, Any] = {"case": name, "rows": rows, "skipped": case.note}
+            else:
+                result = measure(name, rows)
+            results.append(result)
+            print(json.dumps(result))
+
+    regressions = 0
+    if args.baseline.exists() and not args.save_baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for result in results:
+            if result.get("baseline", {}).get("regression"):
+                print(f"REGRESSION {result['case']} rows={result['rows']}: {json.dumps(result['baseline'])}")
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from random import Random
+from typing import Any, Callable, Dict, List
+
+AIRFLOW_ROOT = Path(__file__).resolve().parents[1]
+for extra in (AIRFLOW_ROOT / "dags", AIRFLOW_ROOT / "Dataset_Generation" / "CSV"):
+    if str(extra) not in sys.path:
+        sys.path.append(str(extra))
+
+import pandas as pd
+import pyarrow as pa
+
+from ddl_schema import ISO_TIMESTAMP_FORMAT, csv_column_types, read_typed_csv
+from shopify_order import build_orders, load_buyers, load_products
+
+SEEDS_DIR = AIRFLOW_ROOT / "dbt" / "hitex-case-study" / "seeds"
+STRING_COLUMNS = ["order_id", "order_item_id", "product_id", "SKU", "currency", "customer_id"]
+
+
+def write_line_csv(path: Path, rows: int, seed: int = 7) -> None:
+    """Write a generator-shaped line-level CSV with ``rows`` rows by tiling one generator run."""
+    rng = Random(seed)
+    processed_at = datetime.now(timezone.utc)
+    products = load_products(SEEDS_DIR / "products.csv")
+    buyers = load_buyers(SEEDS_DIR / "customer.csv", SEEDS_DIR / "accounts.csv")
+    base = pd.DataFrame(build_orders(rng, buyers, products, processed_at, len(buyers) * 14))
+
+    tiles = -(-rows // len(base))
+    frame = pd.concat([base] * tiles, ignore_index=True).iloc[:rows]
+    tile_ids = (pd.RangeIndex(len(frame)) // len(base)).astype(str)
+    frame["order_id"] = frame["order_id"] + "-" + tile_ids
+    frame["order_item_id"] = frame["order_item_id"] + "-" + tile_ids
+    frame.to_csv(path, index=False)
+
+
+def legacy_read(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    for column in STRING_COLUMNS:
+        df[column] = df[column].astype(str).str.strip()
+    df["created_at"] = pd.to_datetime(df["created_at"])
+    df["processed_at"] = pd.to_datetime(df["processed_at"])
+    return df
+
+
+def typed_read(path: Path) -> pd.DataFrame:
+    column_types = {
+        **csv_column_types("raw_shopify_order", {"created_at": "created_at", "processed_at": "processed_at"}),
+        **csv_column_types(
+            "raw_shopify_order_line",
+            {"order_id": "order_id", "order_item_id": "id", "product_id": "product_id", "SKU": "sku",
+             "quantity": "quantity", "price": "price"},
+        ),
+        "is_b2b": pa.bool_(),
+    }
+    df = read_typed_csv(path, column_types)
+    df["created_at"] = pd.to_datetime(df["created_at"], format=ISO_TIMESTAMP_FORMAT)
+    df["processed_at"] = pd.to_datetime(df["processed_at"], format=ISO_TIMESTAMP_FORMAT)
+    return df
+
+
+READERS: Dict[str, Callable[[Path], pd.DataFrame]] = {
+    "pandas_default": legacy_read,
+    "pyarrow_typed": typed_read,
+}
+
+
+def _measure_in_child(label: str, path: Path) -> Dict[str, Any]:
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    frame = READERS[label](path)
+    elapsed = time.perf_counter() - started
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "reader": label,
+        "rows": len(frame),
+        "seconds": round(elapsed, 4),
+        "python_peak_mb": round(python_peak / 2**20, 2),
+        # ru_maxrss is reported in KiB on Linux; includes Arrow allocations tracemalloc misses.
+        "rss_growth_mb": round((peak_rss - baseline_rss) / 1024, 2),
+        "frame_mb": round(frame.memory_usage(deep=True).sum() / 2**20, 2),
+    }
+
+
+def measure(label: str, path: Path) -> Dict[str, Any]:
+    """Run one reader in a fresh process so peak-memory numbers don't bleed across readers."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_measure_in_child, (label, path))
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare default vs typed pyarrow reads of Shopify line CSVs.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON results file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = Path(tmp) / f"shopify_order_{rows}.csv"
+            write_line_csv(path, rows)
+            for label in READERS:
+                result = measure(label, path)
+                result["file_mb"] = round(path.stat().st_size / 2**20, 2)
+                results.append(result)
+                print(json.dumps(result))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
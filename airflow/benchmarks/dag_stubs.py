@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import sys
+import types
+from typing import Any, Dict
+
+# Airflow and Google modules the DAG files import; benchmarks only need them to import cleanly.
+STUBBED_MODULES = [
+    "airflow",
+    "airflow.exceptions",
+    "airflow.models",
+    "airflow.operators",
+    "airflow.operators.python",
+    "airflow.providers",
+    "airflow.providers.google",
+    "airflow.providers.google.cloud",
+    "airflow.providers.google.cloud.hooks",
+    "airflow.providers.google.cloud.hooks.bigquery",
+    "airflow.providers.google.cloud.hooks.gcs",
+    "airflow.providers.google.cloud.operators",
+    "airflow.providers.google.cloud.operators.bigquery",
+    "airflow.providers.standard",
+    "airflow.providers.standard.operators",
+    "airflow.providers.standard.operators.bash",
+    "airflow.providers.standard.operators.python",
+    "airflow.sensors",
+    "airflow.sensors.base",
+    "airflow.stats",
+    "airflow.triggers",
+    "airflow.triggers.base",
+    "airflow.utils",
+    "airflow.utils.trigger_rule",
+    "google",
+    "google.api_core",
+    "google.api_core.exceptions",
+    "google.cloud",
+    "google.cloud.bigquery",
+    "google.cloud.storage",
+    "google_crc32c",
+]
+
+VARIABLES: Dict[str, str] = {
+    "gcp_project": "benchmark-project",
+    "gcs_bucket_raw": "benchmark-bucket",
+}
+
+
+class Placeholder:
+    """Stands in for operators, hooks and clients: accepts any call and supports ``>>`` chaining."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self, *args: Any, **kwargs: Any) -> "Placeholder":
+        return Placeholder(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> "Placeholder":
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Placeholder()
+
+    def __rshift__(self, other: Any) -> Any:
+        return other
+
+    def __rrshift__(self, other: Any) -> "Placeholder":
+        return self
+
+    def __lshift__(self, other: Any) -> Any:
+        return other
+
+    def __rlshift__(self, other: Any) -> "Placeholder":
+        return self
+
+    def __enter__(self) -> "Placeholder":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+class DAG(Placeholder):
+    """Keeps ``dag_id``, which the DAG files read inside their ``with DAG(...)`` block."""
+
+    def __init__(self, *args: Any, dag_id: str = "", **kwargs: Any) -> None:
+        super().__init__(*args, dag_id=dag_id, **kwargs)
+        self.dag_id = dag_id
+
+
+class Variable:
+    @staticmethod
+    def get(name: str, default_var: Any = None) -> Any:
+        return VARIABLES.get(name, default_var)
+
+
+class GoogleAPICallError(Exception):
+    pass
+
+
+class Conflict(GoogleAPICallError):
+    pass
+
+
+class NotFound(GoogleAPICallError):
+    pass
+
+
+def _module_attribute(name: str) -> Placeholder:
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return Placeholder()
+
+
+def install(variables: Dict[str, str] | None = None) -> None:
+    """Register the stub modules; call before importing any DAG module."""
+    VARIABLES.update(variables or {})
+    for name in STUBBED_MODULES:
+        module = types.ModuleType(name)
+        module.__getattr__ = _module_attribute  # type: ignore[attr-defined]
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, module)
+    sys.modules["airflow"].DAG = DAG
+    sys.modules["airflow.models"].Variable = Variable
+    sys.modules["google.api_core.exceptions"].GoogleAPICallError = GoogleAPICallError
+    sys.modules["google.api_core.exceptions"].Conflict = Conflict
+    sys.modules["google.api_core.exceptions"].NotFound = NotFound
@@ -0,0 +1,498 @@
+from __future__ import annotations
+
+import base64
+import fnmatch
+import gzip
+import io
+import json
+import logging
+import math
+import re
+import sqlite3
+import sys
+import threading
+import uuid
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+AIRFLOW_ROOT = Path(__file__).resolve().parents[1]
+if str(AIRFLOW_ROOT / "dags") not in sys.path:
+    sys.path.append(str(AIRFLOW_ROOT / "dags"))
+
+import google_crc32c
+import numpy as np
+import pandas as pd
+
+from ddl_schema import ColumnSpec, parse_create_table
+from validation import validate_frame
+
+LOGGER = logging.getLogger(__name__)
+
+SQLITE_TYPES = {
+    "INT64": "INTEGER",
+    "INTEGER": "INTEGER",
+    "BOOL": "INTEGER",
+    "BOOLEAN": "INTEGER",
+    "NUMERIC": "REAL",
+    "BIGNUMERIC": "REAL",
+    "FLOAT64": "REAL",
+    "FLOAT": "REAL",
+}
+TRUE_TOKENS = {"true", "1", "t", "yes", "y"}
+
+
+class StandInError(RuntimeError):
+    """A job the stand-in rejects the way BigQuery would, e.g. too many bad records."""
+
+
+class JobConflict(StandInError):
+    """Raised when a job id is reused, mirroring BigQuery's 409 Conflict."""
+
+
+def table_key(identifier: str) -> str:
+    """``project.dataset.table`` or ``dataset.table`` -> the SQLite table name ``dataset.table``."""
+    parts = identifier.split(".")
+    return ".".join(parts[-2:])
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class FilesystemGCS:
+    """GCS buckets as directories: ``gs://bucket/a/b.json`` lives at ``<root>/bucket/a/b.json``."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def path(self, bucket_name: str, object_name: str) -> Path:
+        return self.root / bucket_name / object_name
+
+    def upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        filename: str | None = None,
+        data: str | bytes | None = None,
+        mime_type: str | None = None,
+        gzip: bool = False,
+        **_: Any,
+    ) -> None:
+        if filename is not None:
+            payload = Path(filename).read_bytes()
+        elif data is not None:
+            payload = data.encode("utf-8") if isinstance(data, str) else data
+        else:
+            raise ValueError("upload needs either filename or data")
+        if gzip:
+            payload = _gzip(payload)
+        target = self.path(bucket_name, object_name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(payload)
+
+    def download(self, bucket_name: str, object_name: str, filename: str | None = None, **_: Any) -> bytes:
+        payload = self.path(bucket_name, object_name).read_bytes()
+        if filename is not None:
+            Path(filename).write_bytes(payload)
+        return payload
+
+    def exists(self, bucket_name: str, object_name: str, **_: Any) -> bool:
+        return self.path(bucket_name, object_name).is_file()
+
+    def delete(self, bucket_name: str, object_name: str, **_: Any) -> None:
+        self.path(bucket_name, object_name).unlink()
+
+    def get_crc32c(self, bucket_name: str, object_name: str) -> str:
+        """Base64 big-endian CRC32C of the stored bytes, as ``Blob.crc32c`` reports it."""
+        checksum = google_crc32c.Checksum(self.path(bucket_name, object_name).read_bytes())
+        return base64.b64encode(checksum.digest()).decode("ascii")
+
+    def list(
+        self,
+        bucket_name: str,
+        versions: bool | None = None,
+        max_results: int | None = None,
+        prefix: str | None = None,
+        delimiter: str | None = None,
+        match_glob: str | None = None,
+        **_: Any,
+    ) -> List[str]:
+        bucket_root = self.root / bucket_name
+        if not bucket_root.exists():
+            return []
+        names = sorted(path.relative_to(bucket_root).as_posix() for path in bucket_root.rglob("*") if path.is_file())
+        names = [name for name in names if name.startswith(prefix or "")]
+        if delimiter:
+            names = [name for name in names if name.endswith(delimiter)]
+        if match_glob:
+            names = [name for name in names if fnmatch.fnmatchcase(name, match_glob)]
+        return names[:max_results] if max_results else names
+
+    def read_uris(self, uris: List[str]) -> Iterator[Tuple[str, bytes]]:
+        """Yield ``(uri, bytes)`` for load sourceUris, expanding BigQuery's single ``*`` wildcard."""
+        for uri in uris:
+            match = re.match(r"gs://(?P<bucket>[^/]+)/(?P<name>.+)", uri)
+            if not match:
+                raise StandInError(f"Unsupported source URI {uri}")
+            bucket, name = match.group("bucket"), match.group("name")
+            if "*" in name:
+                names = [candidate for candidate in self.list(bucket, prefix=name.split("*")[0])
+                         if fnmatch.fnmatchcase(candidate, name)]
+                if not names:
+                    raise StandInError(f"Not found: URI {uri}")
+            else:
+                if not self.exists(bucket, name):
+                    raise StandInError(f"Not found: URI {uri}")
+                names = [name]
+            for object_name in names:
+                payload = self.download(bucket, object_name)
+                # BigQuery reads gzip-compressed sources transparently.
+                yield f"gs://{bucket}/{object_name}", gzip_decompress(payload)
+
+
+def _gzip(payload: bytes) -> bytes:
+    return gzip.compress(payload)
+
+
+def gzip_decompress(payload: bytes) -> bytes:
+    return gzip.decompress(payload) if payload[:2] == b"\x1f\x8b" else payload
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True)
+class StandInTableReference:
+    dataset_id: str
+    table_id: str
+
+
+@dataclass
+class StandInJob:
+    job_id: str
+    job_type: str
+    rows: List[Tuple[Any, ...]] = field(default_factory=list)
+    output_rows: Optional[int] = None
+    state: str = "DONE"
+    error_result: Optional[Dict[str, Any]] = None
+    labels: Dict[str, str] = field(default_factory=dict)
+    query: Optional[str] = None
+    referenced_tables: List[StandInTableReference] = field(default_factory=list)
+    # SQLite has no cost model, so the usage statistics stay zero.
+    total_bytes_processed: int = 0
+    total_bytes_billed: int = 0
+    slot_millis: int = 0
+    cache_hit: bool = False
+    created: datetime = field(default_factory=_now)
+    started: datetime = field(default_factory=_now)
+    ended: datetime = field(default_factory=_now)
+
+    def result(self, *args: Any, **kwargs: Any) -> List[Tuple[Any, ...]]:
+        return self.rows
+
+    def __iter__(self) -> Iterator[Tuple[Any, ...]]:
+        return iter(self.rows)
+
+
+class StandInClient:
+    """The slice of ``google.cloud.bigquery.Client`` the DAG helpers use."""
+
+    def __init__(self, bigquery: "SQLiteBigQuery") -> None:
+        self.bigquery = bigquery
+
+    def query(self, query: str, job_config: Any = None, location: str | None = None, **_: Any) -> StandInJob:
+        parameters = {
+            parameter.name: parameter.value for parameter in getattr(job_config, "query_parameters", None) or []
+        }
+        configuration = {"query": {"query": query}, "labels": dict(getattr(job_config, "labels", None) or {})}
+        return self.bigquery.insert_job(configuration, parameters=parameters)
+
+    def list_jobs(
+        self, project: str | None = None, min_creation_time: datetime | None = None, **_: Any
+    ) -> List[StandInJob]:
+        jobs = list(self.bigquery.jobs.values())
+        if min_creation_time is not None:
+            jobs = [job for job in jobs if job.created >= min_creation_time]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+
+class SQLiteBigQuery:
+    """BigQuery stand-in on SQLite that applies the DDL, load options and simple queries.
+
+    Table schemas come from the CREATE TABLE statements the DAGs submit. Loads read
+    staged objects from ``FilesystemGCS``, map CSV columns by position and NDJSON
+    fields by name, and reject rows that violate the declared types or NOT NULL
+    constraints via ``validate_frame``. ``maxBadRecords``, ``ignoreUnknownValues``
+    and the write/create dispositions are honoured. Queries are run by SQLite after
+    backtick table ids and ``@parameters`` are rewritten, which covers the COUNT and
+    DATE() checks in the DAGs but not BigQuery SQL in general.
+    """
+
+    def __init__(self, path: Path, gcs: FilesystemGCS) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.gcs = gcs
+        self.jobs: Dict[str, StandInJob] = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS _bq_columns ("
+            "table_id TEXT, position INTEGER, name TEXT, data_type TEXT, required INTEGER, "
+            "PRIMARY KEY (table_id, position))"
+        )
+        self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def schema(self, table_id: str) -> Optional[List[ColumnSpec]]:
+        rows = self._connection.execute(
+            "SELECT name, data_type, required FROM _bq_columns WHERE table_id = ? ORDER BY position",
+            (table_id,),
+        ).fetchall()
+        return [ColumnSpec(name, data_type, bool(required)) for name, data_type, required in rows] or None
+
+    def row_counts(self) -> Dict[str, int]:
+        tables = [row[0] for row in self._connection.execute("SELECT DISTINCT table_id FROM _bq_columns ORDER BY 1")]
+        return {
+            table: self._connection.execute(f"SELECT COUNT(1) FROM {_quote(table)}").fetchone()[0] for table in tables
+        }
+
+    def insert_job(
+        self,
+        configuration: Dict[str, Any],
+        job_id: str | None = None,
+        parameters: Dict[str, Any] | None = None,
+        **_: Any,
+    ) -> StandInJob:
+        job_id = job_id or f"standin_{uuid.uuid4().hex}"
+        if job_id in self.jobs:
+            raise JobConflict(f"Already Exists: Job {job_id}")
+        created = _now()
+        if "load" in configuration:
+            job = self._load(job_id, configuration["load"])
+        elif "query" in configuration:
+            sql = configuration["query"]["query"]
+            job = StandInJob(
+                job_id,
+                "query",
+                rows=self.query(sql, parameters),
+                query=sql,
+                referenced_tables=[
+                    StandInTableReference(*table_key(identifier).split(".", 1))
+                    for identifier in sorted(set(re.findall(r"`([^`]+)`", sql)))
+                    if not sql.lstrip().upper().startswith("CREATE")
+                ],
+            )
+        else:
+            raise StandInError(f"Unsupported job configuration: {sorted(configuration)}")
+        job.labels = dict(configuration.get("labels") or {})
+        job.created = job.started = created
+        self.jobs[job_id] = job
+        return job
+
+    def get_job(self, job_id: str, **_: Any) -> StandInJob:
+        if job_id not in self.jobs:
+            raise StandInError(f"Not found: Job {job_id}")
+        return self.jobs[job_id]
+
+    def query(self, sql: str, parameters: Dict[str, Any] | None = None) -> List[Tuple[Any, ...]]:
+        created = parse_create_table(sql)
+        if created is not None:
+            self._create_table(table_key(created[0]), created[1], created[2])
+            return []
+        translated = re.sub(r"`([^`]+)`", lambda match: _quote(table_key(match.group(1))), sql)
+        translated = re.sub(r"@(\w+)", r":\1", translated)
+        with self._lock:
+            try:
+                return [tuple(row) for row in self._connection.execute(translated, parameters or {}).fetchall()]
+            except sqlite3.Error as exc:
+                raise StandInError(f"Query failed in the SQLite stand-in: {exc}\n{translated}") from exc
+
+    def _create_table(self, table_id: str, if_not_exists: bool, columns: List[ColumnSpec]) -> None:
+        if self.schema(table_id) is not None:
+            if if_not_exists:
+                return
+            raise StandInError(f"Already Exists: Table {table_id}")
+        definitions = ", ".join(
+            f"{_quote(spec.name)} {SQLITE_TYPES.get(spec.data_type, 'TEXT')}{' NOT NULL' if spec.required else ''}"
+            for spec in columns
+        )
+        with self._lock, self._connection:
+            self._connection.execute(f"CREATE TABLE {_quote(table_id)} ({definitions})")
+            self._connection.executemany(
+                "INSERT INTO _bq_columns VALUES (?, ?, ?, ?, ?)",
+                [(table_id, position, spec.name, spec.data_type, int(spec.required))
+                 for position, spec in enumerate(columns)],
+            )
+        LOGGER.info("Created stand-in table %s with %s columns", table_id, len(columns))
+
+    def _load(self, job_id: str, load: Dict[str, Any]) -> StandInJob:
+        destination = load["destinationTable"]
+        table_id = f"{destination['datasetId']}.{destination['tableId']}"
+        specs = self.schema(table_id)
+        if specs is None:
+            # CREATE_IF_NEEDED would need a schema in the job; the DAGs always create tables first.
+            raise StandInError(f"Not found: Table {table_id} (createDisposition={load.get('createDisposition')})")
+
+        frames = [self._read_source(uri, payload, load, specs) for uri, payload in self.gcs.read_uris(load["sourceUris"])]
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[s.name for s in specs])
+        names = [spec.name for spec in specs]
+        bad_rows = np.zeros(len(frame), dtype=bool)
+        unknown = [column for column in frame.columns if column not in names]
+        if unknown and not load.get("ignoreUnknownValues", False):
+            bad_rows |= frame[unknown].notna().any(axis=1).to_numpy(dtype=bool)
+        frame = frame.reindex(columns=names)
+        report, invalid = validate_frame(frame, table_id, specs=specs)
+        bad_rows |= invalid
+        bad_count = int(bad_rows.sum())
+        max_bad = int(load.get("maxBadRecords", 0))
+        if bad_count > max_bad:
+            raise StandInError(
+                f"Load into {table_id} failed: {bad_count} bad records exceed maxBadRecords={max_bad} "
+                f"({report.summary()}; unknown fields: {unknown or 'none'})"
+            )
+
+        good = frame[~bad_rows]
+        values = [
+            [_sqlite_value(value, spec.data_type) for value in good[spec.name].tolist()] for spec in specs
+        ]
+        placeholders = ", ".join("?" for _ in specs)
+        disposition = load.get("writeDisposition", "WRITE_APPEND")
+        with self._lock, self._connection:
+            existing = self._connection.execute(f"SELECT COUNT(1) FROM {_quote(table_id)}").fetchone()[0]
+            if disposition == "WRITE_EMPTY" and existing:
+                raise StandInError(f"Load into {table_id} failed: table is not empty (WRITE_EMPTY)")
+            if disposition == "WRITE_TRUNCATE":
+                self._connection.execute(f"DELETE FROM {_quote(table_id)}")
+            self._connection.executemany(
+                f"INSERT INTO {_quote(table_id)} VALUES ({placeholders})", list(zip(*values)) if values else []
+            )
+        LOGGER.info("Loaded %s rows into %s (%s bad records skipped)", len(good), table_id, bad_count)
+        return StandInJob(job_id, "load", output_rows=len(good))
+
+    @staticmethod
+    def _read_source(uri: str, payload: bytes, load: Dict[str, Any], specs: List[ColumnSpec]) -> pd.DataFrame:
+        source_format = load.get("sourceFormat", "CSV")
+        if source_format == "NEWLINE_DELIMITED_JSON":
+            records = [json.loads(line) for line in payload.decode("utf-8").splitlines() if line.strip()]
+            return pd.DataFrame.from_records(records)
+        if source_format != "CSV":
+            raise StandInError(f"Unsupported sourceFormat {source_format} for {uri}")
+
+        frame = pd.read_csv(
+            io.BytesIO(payload),
+            header=None,
+            skiprows=int(load.get("skipLeadingRows", 0)),
+            sep=load.get("fieldDelimiter", ","),
+            dtype=str,
+            keep_default_na=False,
+            na_values=[""],
+        )
+        # Without autodetect BigQuery maps CSV columns to the table schema by position.
+        if frame.shape[1] > len(specs) and not load.get("ignoreUnknownValues", False):
+            raise StandInError(f"{uri} has {frame.shape[1]} columns but the table has {len(specs)}")
+        frame = frame.iloc[:, : len(specs)]
+        frame.columns = [spec.name for spec in specs[: frame.shape[1]]]
+        return frame
+
+
+def _sqlite_value(value: Any, data_type: str) -> Any:
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, str) and not value.strip() and data_type != "STRING":
+        return None
+    if data_type in {"BOOL", "BOOLEAN"}:
+        return int(value) if isinstance(value, (bool, int)) else int(str(value).strip().lower() in TRUE_TOKENS)
+    if data_type in {"INT64", "INTEGER"}:
+        return int(float(value))
+    if data_type in {"NUMERIC", "BIGNUMERIC", "FLOAT64", "FLOAT"}:
+        return float(value)
+    if data_type in {"TIMESTAMP", "DATETIME"}:
+        stamp = pd.Timestamp(value)
+        stamp = stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+        return stamp.isoformat(sep=" ")
+    if data_type == "DATE":
+        return pd.Timestamp(value).date().isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _skip_init(self: Any, *args: Any, **kwargs: Any) -> None:
+    return None
+
+
+@contextmanager
+def offline_gcp(root: Path) -> Iterator[SQLiteBigQuery]:
+    """Route the GCS/BigQuery hooks and operators used by the DAGs to local stand-ins.
+
+    Objects land under ``<root>/gcs`` and tables in ``<root>/bigquery.sqlite``; no
+    ``google_cloud_default`` connection is needed while the block is active.
+    """
+    from airflow.exceptions import AirflowException
+    from airflow.providers.google.cloud.hooks.bigquery import BigQueryHook
+    from airflow.providers.google.cloud.hooks.gcs import GCSHook
+    from airflow.providers.google.cloud.operators.bigquery import BigQueryCheckOperator, BigQueryInsertJobOperator
+    from google.api_core.exceptions import Conflict, NotFound
+
+    from common import bigquery_job_labels
+
+    gcs = FilesystemGCS(root / "gcs")
+    bigquery = SQLiteBigQuery(root / "bigquery.sqlite", gcs)
+
+    def insert_job(hook: Any, configuration: Dict[str, Any], job_id: str | None = None, **kwargs: Any) -> StandInJob:
+        try:
+            return bigquery.insert_job(configuration, job_id=job_id)
+        except JobConflict as exc:
+            # coalesce.py recovers from Conflict by attaching to the existing job.
+            raise Conflict(str(exc)) from exc
+
+    def get_job(hook: Any, job_id: str, **kwargs: Any) -> StandInJob:
+        if job_id not in bigquery.jobs:
+            # coalesce.py probes earlier tries' job ids and skips the missing ones.
+            raise NotFound(f"Not found: Job {job_id}")
+        return bigquery.get_job(job_id)
+
+    def run_job(operator: Any, context: Any) -> str:
+        # The provider labels insert jobs with the DAG and task ids inside execute(), which is replaced here.
+        labels = {
+            **bigquery_job_labels(operator.dag_id, operator.task_id),
+            **(operator.configuration.get("labels") or {}),
+        }
+        return insert_job(None, {**operator.configuration, "labels": labels}, job_id=operator.job_id).job_id
+
+    def check(operator: Any, context: Any) -> None:
+        rows = bigquery.insert_job({"query": {"query": operator.sql}, "labels": operator.labels or {}}).rows
+        if not rows:
+            raise AirflowException(f"The following query returned zero rows: {operator.sql}")
+        if not all(rows[0]):
+            raise AirflowException(f"Test failed.\nQuery:\n{operator.sql}\nResults:\n{rows[0]!s}")
+        LOGGER.info("Check passed: %s", rows[0])
+
+    patches = [
+        (GCSHook, "__init__", _skip_init),
+        (GCSHook, "upload", lambda hook, *args, **kwargs: gcs.upload(*args, **kwargs)),
+        (GCSHook, "download", lambda hook, *args, **kwargs: gcs.download(*args, **kwargs)),
+        (GCSHook, "exists", lambda hook, *args, **kwargs: gcs.exists(*args, **kwargs)),
+        (GCSHook, "list", lambda hook, *args, **kwargs: gcs.list(*args, **kwargs)),
+        (GCSHook, "delete", lambda hook, *args, **kwargs: gcs.delete(*args, **kwargs)),
+        (GCSHook, "get_crc32c", lambda hook, *args, **kwargs: gcs.get_crc32c(*args, **kwargs)),
+        (BigQueryHook, "__init__", _skip_init),
+        (BigQueryHook, "insert_job", insert_job),
+        (BigQueryHook, "get_job", get_job),
+        (BigQueryHook, "get_client", lambda hook, *args, **kwargs: StandInClient(bigquery)),
+        (BigQueryInsertJobOperator, "execute", run_job),
+        (BigQueryCheckOperator, "execute", check),
+    ]
+    try:
+        with ExitStack() as stack:
+            for owner, name, replacement in patches:
+                stack.enter_context(mock.patch.object(owner, name, replacement))
+            yield bigquery
+    finally:
+        bigquery.close()
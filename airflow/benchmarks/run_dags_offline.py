@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+AIRFLOW_ROOT = Path(__file__).resolve().parents[1]
+DAGS_DIR = AIRFLOW_ROOT / "dags"
+if str(Path(__file__).resolve().parent) not in sys.path:
+    sys.path.append(str(Path(__file__).resolve().parent))
+
+from bench_api_load import launched_server
+
+LOGGER = logging.getLogger(__name__)
+
+DAG_IDS = [
+    "raw_amazon_order_ingestion",
+    "raw_amazon_catalog_ingestion",
+    "raw_shopify_order_ingestion",
+    "raw_shopify_customer_ingestion",
+]
+
+
+def offline_variables(workdir: Path, api_url: str) -> Dict[str, str]:
+    """Variables that point every DAG at local directories, the stand-in bucket and a local API."""
+    return {
+        "gcp_project": "offline-project",
+        "gcs_bucket_raw": "offline-bucket",
+        "bq_dataset_raw": "raw",
+        "amazon_json_output_dir": str(workdir / "data" / "amazon"),
+        "shopify_csv_output_dir": str(workdir / "data" / "shopify"),
+        "shopify_customer_csv_output_dir": str(workdir / "data" / "shopify" / "customers"),
+        "checkpoint_dir": str(workdir / "data" / "checkpoints"),
+        "amazon_order_api_endpoint_path": f"{api_url}/orders",
+        "amazon_products_api_endpoint_path": f"{api_url}/products",
+    }
+
+
+def _as_utc(value: Any) -> str | None:
+    return value.astimezone(timezone.utc).isoformat() if value else None
+
+
+def task_timings(dag_id: str, run_id: str) -> List[Dict[str, Any]]:
+    from airflow.models.taskinstance import TaskInstance
+    from airflow.utils.session import create_session
+    from sqlalchemy import select
+
+    with create_session() as session:
+        instances = session.scalars(
+            select(TaskInstance)
+            .where(TaskInstance.dag_id == dag_id, TaskInstance.run_id == run_id)
+            .order_by(TaskInstance.start_date)
+        ).all()
+        return [
+            {
+                "task_id": instance.task_id,
+                "state": str(instance.state),
+                "duration": round(instance.duration, 4) if instance.duration is not None else None,
+                "start": _as_utc(instance.start_date),
+                "end": _as_utc(instance.end_date),
+            }
+            for instance in instances
+        ]
+
+
+def run_dags(dag_ids: List[str], logical_date: datetime) -> List[Dict[str, Any]]:
+    from airflow.models.dagbag import DagBag
+
+    dagbag = DagBag(dag_folder=str(DAGS_DIR), include_examples=False)
+    if dagbag.import_errors:
+        raise RuntimeError(f"DAG import errors: {dagbag.import_errors}")
+    results = []
+    for dag_id in dag_ids:
+        dag = dagbag.get_dag(dag_id)
+        if dag is None:
+            raise KeyError(f"DAG {dag_id} not found in {DAGS_DIR}")
+        started = time.perf_counter()
+        dag_run = dag.test(logical_date=logical_date)
+        elapsed = time.perf_counter() - started
+        result = {
+            "dag_id": dag_id,
+            "run_id": dag_run.run_id,
+            "state": str(dag_run.state),
+            "seconds": round(elapsed, 4),
+            "tasks": task_timings(dag_id, dag_run.run_id),
+        }
+        LOGGER.info("%s finished %s in %.2fs", dag_id, result["state"], elapsed)
+        results.append(result)
+    return results
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run the ingestion DAGs with dag.test() against filesystem GCS and a SQLite BigQuery stand-in."
+    )
+    parser.add_argument("--workdir", type=Path, default=Path("offline-run"), help="Staged files, buckets and tables.")
+    parser.add_argument("--dags", nargs="+", default=DAG_IDS, choices=DAG_IDS)
+    parser.add_argument(
+        "--logical-date",
+        type=datetime.fromisoformat,
+        default=datetime(2025, 1, 2, 3, tzinfo=timezone.utc),
+        help="ISO timestamp of the run; the same date re-appends to the stand-in tables.",
+    )
+    parser.add_argument("--api-url", default=None, help="Use a running dataset API instead of launching one.")
+    parser.add_argument("--port", type=int, default=8766, help="Port for the launched API.")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON results file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    workdir = args.workdir.resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    logical_date = args.logical_date
+    if logical_date.tzinfo is None:
+        logical_date = logical_date.replace(tzinfo=timezone.utc)
+
+    with ExitStack() as stack:
+        api_url = args.api_url or stack.enter_context(launched_server(args.port, 1, args.startup_timeout))
+        # Module-level Variable.get calls run at parse time, so the values must exist before the DagBag loads.
+        for name, value in offline_variables(workdir, api_url.rstrip("/")).items():
+            os.environ.setdefault(f"AIRFLOW_VAR_{name.upper()}", value)
+
+        from offline_gcp import offline_gcp
+
+        bigquery = stack.enter_context(offline_gcp(workdir))
+        results = run_dags(args.dags, logical_date)
+        row_counts = bigquery.row_counts()
+
+    for result in results:
+        print(json.dumps({key: value for key, value in result.items() if key != "tasks"}))
+        for task in result["tasks"]:
+            print(f"  {task['task_id']:<45} {task['state']:<10} {task['duration']}")
+    print(json.dumps({"row_counts": row_counts}))
+    if args.output:
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "logical_date": logical_date.isoformat(),
+            "dags": results,
+            "row_counts": row_counts,
+        }
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0 if all(result["state"] == "success" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
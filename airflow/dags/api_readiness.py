@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+import httpx
+from airflow.exceptions import AirflowSensorTimeout
+from airflow.models import Variable
+from airflow.sensors.base import BaseSensorOperator
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POLL_SECONDS = 15
+DEFAULT_TIMEOUT_SECONDS = 900
+REQUEST_TIMEOUT_SECONDS = 5.0
+
+
+def api_health_url(endpoint_url: str) -> str:
+    """``http://host:8000/orders`` -> ``http://host:8000/health``."""
+    return urljoin(endpoint_url, "/health")
+
+
+def api_readiness_poll_seconds() -> int:
+    return int(Variable.get("api_readiness_poll_seconds", default_var=str(DEFAULT_POLL_SECONDS)))
+
+
+def api_readiness_timeout_seconds() -> int:
+    return int(Variable.get("api_readiness_timeout_seconds", default_var=str(DEFAULT_TIMEOUT_SECONDS)))
+
+
+class ApiHealthTrigger(BaseTrigger):
+    """Poll ``url`` from the triggerer until it answers 200 or the ``deadline`` (epoch seconds) passes.
+
+    The deadline is absolute so a trigger resumed on another triggerer does not start its wait over.
+    """
+
+    def __init__(self, url: str, poll_interval: float, deadline: float) -> None:
+        super().__init__()
+        self.url = url
+        self.poll_interval = poll_interval
+        self.deadline = deadline
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return (
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            {"url": self.url, "poll_interval": self.poll_interval, "deadline": self.deadline},
+        )
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        attempts = 0
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT_SECONDS) as client:
+            while True:
+                attempts += 1
+                try:
+                    response = await client.get(self.url)
+                    if response.status_code == 200:
+                        yield TriggerEvent({"status": "ready", "url": self.url, "attempts": attempts})
+                        return
+                    problem = f"HTTP {response.status_code}"
+                except httpx.HTTPError as exc:
+                    problem = f"{type(exc).__name__}: {exc}"
+                self.log.info("%s not ready after %s attempts (%s)", self.url, attempts, problem)
+                if time.time() + self.poll_interval > self.deadline:
+                    yield TriggerEvent({"status": "timeout", "url": self.url, "attempts": attempts, "error": problem})
+                    return
+                await asyncio.sleep(self.poll_interval)
+
+
+class ApiReadySensor(BaseSensorOperator):
+    """Wait for the dataset API behind ``endpoint_url`` to answer its ``/health`` endpoint.
+
+    A healthy API passes on the first probe. Otherwise the wait is deferred to
+    ``ApiHealthTrigger`` and no worker slot is held; with ``deferrable=False`` the
+    sensor falls back to rescheduled pokes.
+    """
+
+    template_fields = ("endpoint_url",)
+
+    def __init__(self, *, endpoint_url: str, deferrable: bool = True, **kwargs: Any) -> None:
+        kwargs.setdefault("mode", "reschedule")
+        super().__init__(**kwargs)
+        self.endpoint_url = endpoint_url
+        self.deferrable = deferrable
+
+    def poke(self, context: Dict[str, Any]) -> bool:
+        url = api_health_url(self.endpoint_url)
+        try:
+            ready = httpx.get(url, timeout=REQUEST_TIMEOUT_SECONDS).status_code == 200
+        except httpx.HTTPError as exc:
+            LOGGER.info("%s is not reachable: %s", url, exc)
+            return False
+        return ready
+
+    def execute(self, context: Dict[str, Any]) -> None:
+        if not self.deferrable:
+            super().execute(context)
+            return
+        if self.poke(context):
+            return
+        self.defer(
+            trigger=ApiHealthTrigger(
+                url=api_health_url(self.endpoint_url),
+                poll_interval=self.poke_interval,
+                deadline=time.time() + self.timeout,
+            ),
+            method_name="execute_complete",
+            timeout=timedelta(seconds=self.timeout),
+        )
+
+    def execute_complete(self, context: Dict[str, Any], event: Optional[Dict[str, Any]] = None) -> None:
+        event = event or {}
+        if event.get("status") != "ready":
+            raise AirflowSensorTimeout(
+                f"{event.get('url')} did not become ready within {self.timeout}s: {event.get('error')}"
+            )
+        LOGGER.info("%s is ready after %s attempts", event["url"], event["attempts"])
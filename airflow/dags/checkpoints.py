@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from airflow.models import Variable
+
+from telemetry import current_telemetry
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = "/opt/airflow/data/checkpoints"
+DEFAULT_MAX_AGE_HOURS = 168
+DEFAULT_MAX_BYTES = 10 * 1024**3
+HASH_CHUNK_BYTES = 1024 * 1024
+# Exit code of ``checkpoints.py restore`` when there is no valid checkpoint.
+MISSING_EXIT_CODE = 3
+
+T = TypeVar("T")
+
+
+@dataclass
+class CheckpointFile:
+    path: str
+    sha256: str
+    size: int
+    rows: Optional[int] = None
+
+    @classmethod
+    def of(cls, path: Path, rows: Optional[int] = None) -> "CheckpointFile":
+        return cls(str(path), _sha256(path), path.stat().st_size, rows)
+
+    def is_intact(self) -> bool:
+        path = Path(self.path)
+        return path.is_file() and path.stat().st_size == self.size and _sha256(path) == self.sha256
+
+
+@dataclass
+class Checkpoint:
+    """Output of one stage of one DAG run: its files, XCom result and telemetry."""
+
+    dag_id: str
+    run_id: str
+    stage: str
+    files: Dict[str, CheckpointFile]
+    result: Any = None
+    telemetry: Dict[str, Any] = field(default_factory=dict)
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "Checkpoint":
+        files = {key: CheckpointFile(**value) for key, value in payload.pop("files").items()}
+        return cls(files=files, **payload)
+
+    @property
+    def size(self) -> int:
+        return sum(item.size for item in self.files.values())
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _safe(part: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_.=-]+", "_", part)
+
+
+def checkpoint_root() -> Path:
+    return Path(Variable.get("checkpoint_dir", default_var=DEFAULT_CHECKPOINT_DIR)).expanduser()
+
+
+def checkpoint_path(root: Path, dag_id: str, run_id: str, stage: str) -> Path:
+    return root / _safe(dag_id) / _safe(run_id) / f"{_safe(stage)}.json"
+
+
+def load_checkpoint(root: Path, dag_id: str, run_id: str, stage: str) -> Optional[Checkpoint]:
+    """The stage's checkpoint for this run, or None when missing or any file changed since."""
+    path = checkpoint_path(root, dag_id, run_id, stage)
+    if not path.is_file():
+        return None
+    checkpoint = Checkpoint.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    broken = [item.path for item in checkpoint.files.values() if not item.is_intact()]
+    if broken:
+        LOGGER.warning("Ignoring checkpoint %s: %s missing or changed", path, broken)
+        return None
+    return checkpoint
+
+
+def save_checkpoint(root: Path, checkpoint: Checkpoint) -> Path:
+    path = checkpoint_path(root, checkpoint.dag_id, checkpoint.run_id, checkpoint.stage)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(asdict(checkpoint), indent=2, default=str), encoding="utf-8")
+    temporary.replace(path)
+    return path
+
+
+def _remove(path: Path, checkpoint: Checkpoint, keep_files: set) -> int:
+    freed = 0
+    for item in checkpoint.files.values():
+        file_path = Path(item.path)
+        if item.path not in keep_files and file_path.is_file():
+            freed += file_path.stat().st_size
+            file_path.unlink()
+    path.unlink(missing_ok=True)
+    for directory in (path.parent, path.parent.parent):
+        if directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+    return freed
+
+
+def collect_garbage(root: Path, max_age: timedelta, max_bytes: int, keep_run: Optional[Path] = None) -> int:
+    """Delete checkpoints, and the files they own, older than ``max_age`` or beyond ``max_bytes``.
+
+    The quota evicts the oldest checkpoints first and never touches the ``keep_run``
+    directory. A file still referenced by a surviving checkpoint is kept. Returns
+    the number of checkpoints removed.
+    """
+    entries: List[tuple] = []
+    for path in root.glob("*/*/*.json"):
+        try:
+            entries.append((path, Checkpoint.from_dict(json.loads(path.read_text(encoding="utf-8")))))
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            LOGGER.warning("Skipping unreadable checkpoint %s: %s", path, exc)
+    entries.sort(key=lambda entry: entry[1].created_at)
+
+    cutoff = (datetime.now(timezone.utc) - max_age).isoformat()
+    expired = [entry for entry in entries if entry[1].created_at < cutoff and entry[0].parent != keep_run]
+    survivors = [entry for entry in entries if entry not in expired]
+    total = sum(checkpoint.size for _, checkpoint in survivors)
+    for entry in list(survivors):
+        if total <= max_bytes:
+            break
+        if entry[0].parent == keep_run:
+            continue
+        expired.append(entry)
+        survivors.remove(entry)
+        total -= entry[1].size
+
+    keep_files = {item.path for _, checkpoint in survivors for item in checkpoint.files.values()}
+    freed = sum(_remove(path, checkpoint, keep_files) for path, checkpoint in expired)
+    if expired:
+        LOGGER.info("Removed %s stale checkpoints under %s, freeing %s bytes", len(expired), root, freed)
+    return len(expired)
+
+
+def _collect_garbage_quietly(root: Path, keep_run: Path) -> None:
+    max_age = timedelta(hours=float(Variable.get("checkpoint_max_age_hours", default_var=str(DEFAULT_MAX_AGE_HOURS))))
+    max_bytes = int(Variable.get("checkpoint_max_bytes", default_var=str(DEFAULT_MAX_BYTES)))
+    try:
+        collect_garbage(root, max_age, max_bytes, keep_run=keep_run)
+    except OSError as exc:
+        LOGGER.warning("Checkpoint garbage collection under %s failed: %s", root, exc)
+
+
+def checkpoints_enabled(context: Dict[str, Any]) -> bool:
+    """On unless the run conf sets ``ignore_checkpoints`` or the ``stage_checkpoints`` Variable is false."""
+    conf = getattr(context.get("dag_run"), "conf", None) or {}
+    if conf.get("ignore_checkpoints"):
+        return False
+    return Variable.get("stage_checkpoints", default_var="true").strip().lower() in {"true", "1", "yes", "y"}
+
+
+def checkpointed_stage(outputs: Dict[str, str]) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Skip a staging callable whose output for this DAG run is already on disk and intact.
+
+    ``outputs`` maps result keys holding local file paths to the telemetry output
+    names whose row counts they carry. On a hit the stored result is returned and
+    the stored telemetry restored, so XCom consumers see the same values. Apply it
+    below ``instrumented_task``.
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(func)
+        def wrapper(**context: Any) -> T:
+            ti = context.get("ti")
+            identity = [getattr(ti, name, None) for name in ("dag_id", "run_id", "task_id")]
+            # Outside a DAG run (benchmarks, ad-hoc calls) there is no run to scope a checkpoint to.
+            if not all(isinstance(part, str) and part for part in identity) or not checkpoints_enabled(context):
+                return func(**context)
+            root = checkpoint_root()
+            telemetry = current_telemetry()
+            checkpoint = load_checkpoint(root, *identity)
+            if checkpoint is not None:
+                LOGGER.info(
+                    "Reusing checkpoint of %s from %s: %s",
+                    ti.task_id,
+                    checkpoint.created_at,
+                    {key: item.path for key, item in checkpoint.files.items()},
+                )
+                telemetry.restore(checkpoint.telemetry)
+                telemetry.lap("checkpoint")
+                return checkpoint.result
+
+            result = func(**context)
+            rows_out = telemetry.rows_out
+            files = {
+                key: CheckpointFile.of(Path(result[key]), rows_out.get(output)) for key, output in outputs.items()
+            }
+            payload = telemetry.to_dict()
+            checkpoint = Checkpoint(*identity, files, result=result, telemetry=payload)
+            path = save_checkpoint(root, checkpoint)
+            LOGGER.info("Saved checkpoint of %s at %s", ti.task_id, path)
+            _collect_garbage_quietly(root, path.parent)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def bash_checkpoint_env() -> Dict[str, str]:
+    """Templated BashOperator ``env`` naming the checkpoint the CLI below reads and writes.
+
+    Only strings go through ``env``: DAGs rendering native objects would turn numeric
+    values into ints, which the subprocess environment rejects.
+    """
+    return {
+        "CHECKPOINT_DIR": f"{{{{ var.value.get('checkpoint_dir', '{DEFAULT_CHECKPOINT_DIR}') }}}}",
+        "CHECKPOINT_DAG_ID": "{{ dag.dag_id }}",
+        "CHECKPOINT_RUN_ID": "{{ run_id }}",
+        "CHECKPOINT_STAGE": "{{ task.task_id }}",
+        "CHECKPOINT_ENABLED": (
+            "{{ 'false' if (dag_run.conf or {}).get('ignore_checkpoints') "
+            "else var.value.get('stage_checkpoints', 'true') | lower }}"
+        ),
+    }
+
+
+def bash_restore_checkpoint(python_bin: str) -> str:
+    """Shell lines ending the task with the checkpointed output path when this run already produced it."""
+    return f"if {python_bin} {Path(__file__).resolve()} restore; then\n  exit 0\nfi\n"
+
+
+def bash_save_checkpoint(python_bin: str, output_file: str) -> str:
+    """Shell line recording ``output_file`` (a shell expression) as this stage's checkpoint."""
+    return (
+        f"{python_bin} {Path(__file__).resolve()} save --file {output_file} "
+        f"--max-age-hours {{{{ var.value.get('checkpoint_max_age_hours', '{DEFAULT_MAX_AGE_HOURS}') }}}} "
+        f"--max-bytes {{{{ var.value.get('checkpoint_max_bytes', '{DEFAULT_MAX_BYTES}') }}}}\n"
+    )
+
+
+def _count_csv_rows(path: Path) -> int:
+    with path.open(newline="", encoding="utf-8") as handle:
+        return max(0, sum(1 for _ in csv.reader(handle)) - 1)
+
+
+def _cli(argv: Optional[List[str]] = None) -> int:
+    """``restore``/``save`` for BashOperator stages; identity comes from the ``CHECKPOINT_*`` environment."""
+    parser = argparse.ArgumentParser(description="Run-scoped checkpoints for shell stages.")
+    parser.add_argument("action", choices=["restore", "save"])
+    parser.add_argument("--file", type=Path, help="Output file of the stage (save).")
+    parser.add_argument("--max-age-hours", type=float, default=DEFAULT_MAX_AGE_HOURS)
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args(argv)
+    root = Path(os.environ["CHECKPOINT_DIR"]).expanduser()
+    dag_id, run_id, stage = (os.environ[name] for name in ("CHECKPOINT_DAG_ID", "CHECKPOINT_RUN_ID", "CHECKPOINT_STAGE"))
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    if args.action == "restore":
+        if os.environ.get("CHECKPOINT_ENABLED", "true").lower() not in {"true", "1", "yes", "y"}:
+            return MISSING_EXIT_CODE
+        checkpoint = load_checkpoint(root, dag_id, run_id, stage)
+        if checkpoint is None:
+            return MISSING_EXIT_CODE
+        LOGGER.info("Reusing checkpoint of %s from %s", stage, checkpoint.created_at)
+        # stdout carries only the path, which the BashOperator pushes to XCom.
+        print(checkpoint.result)
+        return 0
+
+    path = args.file.resolve()
+    checkpoint = Checkpoint(dag_id, run_id, stage, {"output": CheckpointFile.of(path, _count_csv_rows(path))}, str(path))
+    saved = save_checkpoint(root, checkpoint)
+    LOGGER.info("Saved checkpoint of %s at %s", stage, saved)
+    collect_garbage(root, timedelta(hours=args.max_age_hours), args.max_bytes, keep_run=saved.parent)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_cli())
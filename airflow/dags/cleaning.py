@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Whole-column cleaning helpers for the prepare stages. Everything here runs on
+# Arrow compute kernels or NumPy; there are no per-row Python callbacks.
+
+NULL_TOKENS = ("", "nan", "none")
+TRUTHY_TOKENS = ("true", "1", "yes", "y", "t")
+
+_UUID_LENGTH = 36
+# (hex start, hex end, output start) for the 8-4-4-4-12 layout.
+_UUID_GROUPS = ((0, 8, 0), (8, 12, 9), (12, 16, 14), (16, 20, 19), (20, 32, 24))
+
+
+def _as_arrow_strings(series: pd.Series) -> pa.Array | pa.ChunkedArray:
+    if isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_string(series.dtype.pyarrow_dtype):
+        return pa.array(series.array)
+    # Non-Arrow input (e.g. numpy object columns) pays one conversion, mirroring astype(str).
+    mask = series.isna().to_numpy()
+    return pa.array(series.astype(object).astype(str).to_numpy(dtype=object), mask=mask, type=pa.string())
+
+
+def _to_series(array: pa.ChunkedArray | pa.Array, index: pd.Index) -> pd.Series:
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=index)
+
+
+def clean_string(series: pd.Series, null_tokens: Iterable[str] = NULL_TOKENS) -> pd.Series:
+    """Trim whitespace and turn blank or placeholder tokens into nulls."""
+    trimmed = pc.utf8_trim_whitespace(pc.fill_null(_as_arrow_strings(series), ""))
+    is_null_token = pc.is_in(trimmed, value_set=pa.array(list(null_tokens), type=pa.string()))
+    cleaned = pc.if_else(is_null_token, pa.scalar(None, type=pa.string()), trimmed)
+    return _to_series(cleaned, series.index)
+
+
+def normalize_verified_email(series: pd.Series) -> pd.Series:
+    """True for truthy flags or values that look like an email address."""
+    lowered = pc.utf8_lower(pc.utf8_trim_whitespace(pc.fill_null(_as_arrow_strings(series), "")))
+    truthy = pc.is_in(lowered, value_set=pa.array(TRUTHY_TOKENS, type=pa.string()))
+    has_at = pc.match_substring(lowered, "@")
+    flags = pc.or_(truthy, has_at).to_numpy(zero_copy_only=False)
+    return pd.Series(flags.astype(bool), index=series.index)
+
+
+def bulk_uuid4(count: int) -> pd.arrays.ArrowExtensionArray:
+    """Generate ``count`` random (version 4) UUID strings from a single random buffer.
+
+    The result has ``ArrowDtype(pa.large_string())``.
+    """
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+
+    hex_digits = np.frombuffer(raw.tobytes().hex().encode("ascii"), dtype=np.uint8).reshape(count, 32)
+    formatted = np.full((count, _UUID_LENGTH), ord("-"), dtype=np.uint8)
+    for hex_start, hex_end, out_start in _UUID_GROUPS:
+        formatted[:, out_start : out_start + hex_end - hex_start] = hex_digits[:, hex_start:hex_end]
+
+    # 32-bit string offsets wrap past ~59.6M UUIDs, so the array uses large_string.
+    if _UUID_LENGTH * count > np.iinfo(np.int64).max:
+        raise OverflowError(f"Cannot build {count} UUIDs: string offsets exceed int64")
+    offsets = np.arange(0, _UUID_LENGTH * (count + 1), _UUID_LENGTH, dtype=np.int64)
+    array = pa.LargeStringArray.from_buffers(count, pa.py_buffer(offsets), pa.py_buffer(formatted.tobytes()))
+    return pd.arrays.ArrowExtensionArray(array)
@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from airflow.models import Variable
+from airflow.providers.google.cloud.hooks.bigquery import BigQueryHook
+from airflow.providers.google.cloud.hooks.gcs import GCSHook
+from google.api_core.exceptions import Conflict, GoogleAPICallError, NotFound
+
+from common import (
+    bigquery_job_labels,
+    get_bool_variable,
+    get_bq_dataset,
+    get_bq_location,
+    get_gcp_project,
+    get_raw_bucket,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+COALESCE_VARIABLE = "coalesce_raw_loads"
+COALESCE_MANIFEST_PREFIX = "datasets/manifests/coalesced"
+# BigQuery accepts at most 10,000 URIs per load job.
+MAX_URIS_PER_JOB = 10_000
+DEFAULT_LOOKBACK_HOURS = 24
+DEFAULT_GRACE_MINUTES = 120
+DEFAULT_COVERED_RETENTION_DAYS = 7
+_HOUR_PATTERN = re.compile(r"/dt=(\d{4}-\d{2}-\d{2})/hr=(\d{2})/")
+
+_NDJSON_LOAD_OPTIONS: Dict[str, Any] = {
+    "sourceFormat": "NEWLINE_DELIMITED_JSON",
+    "writeDisposition": "WRITE_APPEND",
+    "createDisposition": "CREATE_NEVER",
+    "schemaUpdateOptions": ["ALLOW_FIELD_ADDITION", "ALLOW_FIELD_RELAXATION"],
+    "ignoreUnknownValues": True,
+    "maxBadRecords": 0,
+}
+
+_CSV_LOAD_OPTIONS: Dict[str, Any] = {
+    "sourceFormat": "CSV",
+    "skipLeadingRows": 1,
+    "writeDisposition": "WRITE_APPEND",
+    "createDisposition": "CREATE_NEVER",
+    "schemaUpdateOptions": ["ALLOW_FIELD_ADDITION", "ALLOW_FIELD_RELAXATION"],
+    "fieldDelimiter": ",",
+    "allowQuotedNewlines": True,
+    "ignoreUnknownValues": True,
+}
+
+
+@dataclass(frozen=True)
+class CoalesceTarget:
+    table_name: str
+    prefix: str
+    suffix: str
+    load_options: Dict[str, Any] = field(default_factory=dict)
+
+
+COALESCE_TARGETS: List[CoalesceTarget] = [
+    CoalesceTarget("raw_amazon_order", "datasets/source/amazon_orders", ".json", _NDJSON_LOAD_OPTIONS),
+    CoalesceTarget("raw_amazon_order_item", "datasets/source/amazon_order_items", ".json", _NDJSON_LOAD_OPTIONS),
+    CoalesceTarget("raw_shopify_order", "datasets/source/shopify_orders", ".csv", _CSV_LOAD_OPTIONS),
+    CoalesceTarget("raw_shopify_order_line", "datasets/source/shopify_order_lines", ".csv", _CSV_LOAD_OPTIONS),
+    CoalesceTarget("raw_shopify_customer", "datasets/source/shopify_customers", ".csv", _CSV_LOAD_OPTIONS),
+]
+
+
+def coalescing_enabled() -> bool:
+    return get_bool_variable(COALESCE_VARIABLE, default=False)
+
+
+def should_load_per_run(**context: Dict[str, Any]) -> bool:
+    """ShortCircuit callable: skip the per-run load when the coalescing DAG owns loading."""
+    if coalescing_enabled():
+        LOGGER.info(
+            "Variable %s is enabled; leaving staged object for the coalesced load of %s",
+            COALESCE_VARIABLE,
+            context.get("ds"),
+        )
+        return False
+    return True
+
+
+def _window_bounds(context: Dict[str, Any]) -> tuple[datetime, datetime]:
+    start = context.get("data_interval_start")
+    end = context.get("data_interval_end")
+    if start is None or end is None:
+        raise ValueError("Coalesced loads require a data interval")
+    return start.in_timezone("UTC"), end.in_timezone("UTC")
+
+
+def scan_bounds(start: datetime, end: datetime, high_water: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """Staged hours a run lists: back to the lookback or the last scanned hour, up to the grace period.
+
+    The hourly DAGs upload hour H only after H ends, so the last hours of the
+    interval are left for the next run. Starting at the high-water mark when it
+    is older than the lookback picks up the hours of runs that never happened.
+    """
+    lookback = timedelta(hours=int(Variable.get("coalesce_lookback_hours", default_var=str(DEFAULT_LOOKBACK_HOURS))))
+    grace = timedelta(minutes=int(Variable.get("coalesce_grace_minutes", default_var=str(DEFAULT_GRACE_MINUTES))))
+    scan_start = start - lookback
+    if high_water is not None and high_water < scan_start:
+        scan_start = high_water
+    return scan_start, end - grace
+
+
+def hourly_prefixes(prefix: str, start: datetime, end: datetime) -> List[str]:
+    """Return the dt=/hr= staging prefixes covering [start, end)."""
+    cursor = start.replace(minute=0, second=0, microsecond=0)
+    prefixes: List[str] = []
+    while cursor < end:
+        prefixes.append(f"{prefix}/dt={cursor.strftime('%Y-%m-%d')}/hr={cursor.strftime('%H')}/")
+        cursor += timedelta(hours=1)
+    return prefixes
+
+
+def _manifest_prefix(table_name: str, window_label: str) -> str:
+    return f"{COALESCE_MANIFEST_PREFIX}/{table_name}/window={window_label}/"
+
+
+def _covered_index_object(table_name: str) -> str:
+    return f"{COALESCE_MANIFEST_PREFIX}/{table_name}/covered.json"
+
+
+def _object_hour(name: str) -> Optional[datetime]:
+    match = _HOUR_PATTERN.search(name)
+    if match is None:
+        return None
+    return datetime.strptime(f"{match.group(1)}T{match.group(2)}", "%Y-%m-%dT%H").replace(tzinfo=timezone.utc)
+
+
+def _window_label(start: datetime, end: datetime) -> str:
+    return f"{start.strftime('%Y%m%dT%H')}_{end.strftime('%Y%m%dT%H')}"
+
+
+@dataclass
+class CoveredIndex:
+    """Table-wide record of every staged object a coalesced job loaded, and the end of the last scan."""
+
+    table_name: str
+    objects: Dict[str, str] = field(default_factory=dict)
+    high_water: Optional[str] = None
+
+    @property
+    def high_water_at(self) -> Optional[datetime]:
+        return datetime.fromisoformat(self.high_water) if self.high_water else None
+
+
+def read_covered_index(hook: GCSHook, bucket: str, table_name: str) -> CoveredIndex:
+    """The table's covered index; built once from the per-window manifests when it does not exist yet."""
+    index_object = _covered_index_object(table_name)
+    if hook.exists(bucket, index_object):
+        return CoveredIndex(**json.loads(hook.download(bucket, index_object).decode("utf-8")))
+    index = CoveredIndex(table_name)
+    for manifest_name in hook.list(bucket, prefix=f"{COALESCE_MANIFEST_PREFIX}/{table_name}/window="):
+        manifest = json.loads(hook.download(bucket, manifest_name).decode("utf-8"))
+        for job in manifest.get("jobs", []):
+            index.objects.update({name: job["job_id"] for name in job.get("objects", [])})
+    return index
+
+
+def write_covered_index(hook: GCSHook, bucket: str, index: CoveredIndex, scan_start: datetime) -> None:
+    """Persist the index, dropping objects of hours no later scan can list again."""
+    retention = timedelta(
+        days=int(Variable.get("coalesce_covered_retention_days", default_var=str(DEFAULT_COVERED_RETENTION_DAYS)))
+    )
+    horizon = scan_start - retention
+    index.objects = {
+        name: job_id
+        for name, job_id in index.objects.items()
+        if (_object_hour(name) or horizon) >= horizon
+    }
+    hook.upload(
+        bucket_name=bucket,
+        object_name=_covered_index_object(index.table_name),
+        data=json.dumps(asdict(index), indent=2, sort_keys=True),
+        mime_type="application/json",
+    )
+
+
+def collect_window_objects(
+    hook: GCSHook, bucket: str, target: CoalesceTarget, start: datetime, end: datetime, covered: Set[str]
+) -> List[str]:
+    """List staged objects of the hours in [start, end) that no coalesced job has loaded yet."""
+    objects: List[str] = []
+    for hour_prefix in hourly_prefixes(target.prefix, start, end):
+        for name in hook.list(bucket, prefix=hour_prefix):
+            if name.endswith((target.suffix, f"{target.suffix}.gz")) and name not in covered:
+                objects.append(name)
+    return sorted(objects)
+
+
+def _advance_high_water(hook: GCSHook, bucket: str, index: CoveredIndex, start: datetime, end: datetime) -> None:
+    if index.high_water_at is None or end > index.high_water_at:
+        index.high_water = end.isoformat()
+    write_covered_index(hook, bucket, index, start)
+
+
+def _succeeded(job: Any) -> bool:
+    try:
+        job.result()
+    except GoogleAPICallError as exc:
+        LOGGER.warning("Load job %s failed: %s", job.job_id, exc)
+        return False
+    return True
+
+
+def _run_load_job(
+    hook: BigQueryHook,
+    configuration: Dict[str, Any],
+    job_id: str,
+    try_number: int,
+    project: str,
+    location: str,
+) -> Any:
+    """Run a load job, reusing an earlier try's job for the same objects only if it succeeded.
+
+    The first try submits ``job_id`` and try ``n`` submits ``<job_id>_try<n>``, so a
+    failed job is resubmitted on retry instead of its failure being re-raised.
+    """
+    candidates = [job_id] + [f"{job_id}_try{number}" for number in range(2, try_number + 1)]
+    for previous_id in candidates[:-1]:
+        try:
+            previous = hook.get_job(job_id=previous_id, project_id=project, location=location)
+        except NotFound:
+            continue
+        if _succeeded(previous):
+            LOGGER.info("Load job %s already succeeded; reusing its result", previous_id)
+            return previous
+
+    submit_id = candidates[-1]
+    try:
+        return hook.insert_job(configuration=configuration, job_id=submit_id, project_id=project, location=location)
+    except Conflict:
+        LOGGER.info("Load job %s already exists; reusing its result", submit_id)
+        job = hook.get_job(job_id=submit_id, project_id=project, location=location)
+        job.result()
+        return job
+
+
+def coalesce_table_window(table_name: str, **context: Dict[str, Any]) -> Dict[str, Any]:
+    """Submit one load job per table for every staged object not loaded yet in the run's scan range."""
+    target = next((t for t in COALESCE_TARGETS if t.table_name == table_name), None)
+    if target is None:
+        raise ValueError(f"No coalesce target registered for {table_name}")
+
+    project = get_gcp_project()
+    dataset = get_bq_dataset()
+    location = get_bq_location()
+    bucket = get_raw_bucket()
+    gcs_hook = GCSHook(gcp_conn_id="google_cloud_default")
+    index = read_covered_index(gcs_hook, bucket, table_name)
+    start, end = scan_bounds(*_window_bounds(context), index.high_water_at)
+    objects = collect_window_objects(gcs_hook, bucket, target, start, end, set(index.objects))
+    window_label = _window_label(start, end)
+    if not objects:
+        LOGGER.info("No staged objects left to load for %s in %s", table_name, window_label)
+        _advance_high_water(gcs_hook, bucket, index, start, end)
+        return {"table": table_name, "window": window_label, "job_ids": [], "object_count": 0}
+
+    bq_hook = BigQueryHook(gcp_conn_id="google_cloud_default", location=location)
+    jobs: List[Dict[str, Any]] = []
+    for offset in range(0, len(objects), MAX_URIS_PER_JOB):
+        batch = objects[offset : offset + MAX_URIS_PER_JOB]
+        configuration = {
+            "load": {
+                "sourceUris": [f"gs://{bucket}/{name}" for name in batch],
+                "destinationTable": {
+                    "projectId": project,
+                    "datasetId": dataset,
+                    "tableId": table_name,
+                },
+                **target.load_options,
+            },
+            "labels": bigquery_job_labels(context["ti"].dag_id, context["ti"].task_id),
+        }
+        # Deterministic job ids make a retry after a lost manifest attach to the finished job.
+        digest = hashlib.sha256("\n".join(batch).encode("utf-8")).hexdigest()[:32]
+        job = _run_load_job(
+            bq_hook,
+            configuration,
+            f"coalesce_{table_name}_{window_label}_{digest}",
+            getattr(context["ti"], "try_number", None) or 1,
+            project,
+            location,
+        )
+        jobs.append(
+            {
+                "job_id": job.job_id,
+                "output_rows": getattr(job, "output_rows", None),
+                "objects": batch,
+            }
+        )
+        LOGGER.info(
+            "Coalesced %s staged objects into %s with job %s",
+            len(batch),
+            table_name,
+            job.job_id,
+        )
+
+    recorded_at = datetime.now(timezone.utc)
+    manifest = {
+        "table": table_name,
+        "window": window_label,
+        "window_start": start.isoformat(),
+        "window_end": end.isoformat(),
+        "run_id": context.get("run_id"),
+        "recorded_at": recorded_at.isoformat(),
+        "jobs": jobs,
+    }
+    manifest_object = f"{_manifest_prefix(table_name, window_label)}{recorded_at.strftime('%Y%m%dT%H%M%S')}.json"
+    gcs_hook.upload(
+        bucket_name=bucket,
+        object_name=manifest_object,
+        data=json.dumps(manifest, indent=2),
+        mime_type="application/json",
+    )
+    LOGGER.info("Recorded coalesced load manifest at gs://%s/%s", bucket, manifest_object)
+    for job in jobs:
+        index.objects.update({name: job["job_id"] for name in job["objects"]})
+    _advance_high_water(gcs_hook, bucket, index, start, end)
+
+    return {
+        "table": table_name,
+        "window": window_label,
+        "manifest": manifest_object,
+        "job_ids": [job["job_id"] for job in jobs],
+        "object_count": len(objects),
+    }
@@ -6,15 +6,21 @@ import re
 from datetime import date, datetime
 from decimal import Decimal
 from pathlib import Path
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import pendulum
 from airflow.models import Variable
 from airflow.providers.google.cloud.hooks.bigquery import BigQueryHook
+from airflow.providers.google.cloud.operators.bigquery import BigQueryCheckOperator
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 from jinja2 import Template
 
+# pandas, pyarrow and the validation helpers are imported where they are used, so
+# parsing a DAG file that only needs the Variable getters stays cheap.
+if TYPE_CHECKING:
+    import pandas as pd
+
 LOGGER = logging.getLogger(__name__)
 
 AIRFLOW_ROOT = Path(__file__).resolve().parents[1]
@@ -31,6 +37,12 @@ DEFAULT_ARGS = {
 
 _DDL_CACHE: Dict[str, str] = {}
 
+API_RESPONSE_FORMATS = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
 
 def get_bool_variable(name: str, default: bool = False) -> bool:
     """Return Airflow Variable as boolean with sane defaults."""
@@ -59,6 +71,45 @@ def sanitize_run_id(run_id: str) -> str:
     return re.sub(r"[^0-9a-zA-Z_]+", "_", run_id)
 
 
+def bigquery_job_labels(dag_id: str, task_id: str) -> Dict[str, str]:
+    """BigQuery job labels that attribute a job to its DAG and task (lowercase, at most 63 chars)."""
+    def label(value: str) -> str:
+        return re.sub(r"[^a-z0-9_-]+", "_", value.lower())[:63]
+
+    return {"airflow-dag": label(dag_id), "airflow-task": label(task_id)}
+
+
+def use_deferrable_operators() -> bool:
+    """BigQuery jobs, checks and the API readiness sensor wait in the triggerer unless ``deferrable_operators`` is false."""
+    return get_bool_variable("deferrable_operators", default=True)
+
+
+class LabelledBigQueryCheckOperator(BigQueryCheckOperator):
+    """``BigQueryCheckOperator`` whose deferrable job also carries ``labels``.
+
+    The provider passes ``labels`` to the synchronous check only; without them the
+    deferred check jobs would be missing from ``collect_bigquery_job_stats``. No public
+    argument reaches the deferred job's configuration, so this overrides the private
+    ``_submit_job``. Its body mirrors the provider's (checked against 17.1.0 through
+    22.6.0, the range pinned in ``docker/requirements.txt``) plus the labels.
+    """
+
+    def _submit_job(self, hook: BigQueryHook, job_id: str) -> Any:
+        configuration: Dict[str, Any] = {"query": {"query": self.sql, "useLegacySql": self.use_legacy_sql}}
+        if self.query_params:
+            configuration["query"]["queryParameters"] = self.query_params
+        if self.labels:
+            configuration["labels"] = self.labels
+        self.include_encryption_configuration(configuration, "query")
+        return hook.insert_job(
+            configuration=configuration,
+            project_id=self.project_id,
+            location=self.location,
+            job_id=job_id,
+            nowait=True,
+        )
+
+
 def render_json_template(template_str: str, context: Dict[str, Any]) -> Dict[str, Any]:
     if not template_str:
         return {}
@@ -78,6 +129,32 @@ def json_default(value: Any) -> Any:
     return value
 
 
+def api_accept_header() -> str:
+    """Accept header for the dataset API, chosen by the amazon_api_response_format Variable."""
+    response_format = Variable.get("amazon_api_response_format", default_var="json").strip().lower()
+    if response_format not in API_RESPONSE_FORMATS:
+        raise ValueError(f"Unsupported amazon_api_response_format {response_format!r}")
+    return API_RESPONSE_FORMATS[response_format]
+
+
+def read_columnar_response(content: bytes, content_type: str) -> Optional[pd.DataFrame]:
+    """Read an Arrow IPC or Parquet API body into a DataFrame; None for other content types."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    media_type = content_type.split(";")[0].strip().lower()
+    # py_buffer wraps the body without copying, so the Arrow columns point into it.
+    buffer = pa.py_buffer(content)
+    if media_type == API_RESPONSE_FORMATS["arrow"]:
+        table = pa.ipc.open_stream(buffer).read_all()
+    elif media_type in {API_RESPONSE_FORMATS["parquet"], "application/x-parquet"}:
+        table = pq.read_table(pa.BufferReader(buffer))
+    else:
+        return None
+    # Null-free numeric columns are handed to pandas without a copy.
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
 def load_table_ddl(table_name: str, project: str, dataset: str) -> str:
     """Fetch and cache CREATE TABLE statement for the requested table."""
     cache_key = f"{project}.{dataset}.{table_name}"
@@ -99,6 +176,29 @@ def load_table_ddl(table_name: str, project: str, dataset: str) -> str:
     return statement
 
 
+def validate_for_staging(
+    frame: pd.DataFrame, table_name: str, local_path: Path, append: bool = False
+) -> pd.DataFrame:
+    """Validate a prepared frame against the DDL before it is written for staging.
+
+    Bad rows raise by default; with the ``quarantine_invalid_rows`` Variable they are
+    moved to a ``<file>.rejected.csv`` sidecar next to ``local_path`` instead. The first
+    call for a file (``append=False``) removes sidecars left by an earlier try.
+    """
+    from validation import enforce_schema
+
+    sidecar = local_path.with_name(f"{local_path.stem}.rejected.csv")
+    if not append:
+        for stale in (sidecar, sidecar.with_suffix(".report.json")):
+            stale.unlink(missing_ok=True)
+    if not get_bool_variable("validate_before_staging", default=True):
+        return frame
+    quarantine_path = sidecar if get_bool_variable("quarantine_invalid_rows", default=False) else None
+    valid, report = enforce_schema(frame, table_name, quarantine_path, "a" if append else "w")
+    LOGGER.info("Pre-load validation for %s: %s", table_name, report.summary())
+    return valid
+
+
 def partition_has_rows(table_name: str, context: Dict[str, Any]) -> bool:
     """Return whether the DATE(ingested_at) partition already has data."""
     project = get_gcp_project()
@@ -115,7 +215,8 @@ def partition_has_rows(table_name: str, context: Dict[str, Any]) -> bool:
     job_config = bigquery.QueryJobConfig(
         query_parameters=[
             bigquery.ScalarQueryParameter("partition_date", "DATE", context["ds"])
-        ]
+        ],
+        labels=bigquery_job_labels(context["ti"].dag_id, context["ti"].task_id),
     )
     try:
         result = client.query(query, job_config=job_config, location=location)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import csv
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+# No Airflow imports in this module: generators and benchmarks import it directly.
+DEFAULT_DDL_PATH = Path(__file__).resolve().parents[2] / "SQL" / "create_raw_tables.sql"
+
+ISO_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+# Arrow types used when reading staged CSVs; TIMESTAMP/DATE stay text and are
+# parsed afterwards with ISO_TIMESTAMP_FORMAT.
+BQ_ARROW_TYPES: Dict[str, pa.DataType] = {
+    "STRING": pa.string(),
+    "TIMESTAMP": pa.string(),
+    "DATE": pa.string(),
+    "INT64": pa.int64(),
+    "NUMERIC": pa.float64(),
+    "FLOAT64": pa.float64(),
+    "BOOL": pa.bool_(),
+}
+
+_SCHEMA_CACHE: Dict[str, List["ColumnSpec"]] = {}
+_PARTITION_CACHE: Dict[str, Dict[str, str]] = {}
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str
+    data_type: str
+    required: bool
+
+
+_COLUMN_PATTERN = re.compile(r"`(?P<name>[^`]+)`\s+(?P<type>[A-Z0-9_]+)(?P<rest>[^,\n]*)", re.IGNORECASE)
+_CREATE_TABLE_PATTERN = re.compile(
+    r"CREATE TABLE (?P<if_not_exists>IF NOT EXISTS\s+)?`(?P<table>[^`]+)`\s*\((?P<body>.*?)\n\)",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def _parse_columns(body: str) -> List[ColumnSpec]:
+    return [
+        ColumnSpec(
+            name=column.group("name"),
+            data_type=column.group("type").upper(),
+            required="NOT NULL" in column.group("rest").upper(),
+        )
+        for column in _COLUMN_PATTERN.finditer(body)
+    ]
+
+
+def parse_create_table(statement: str) -> Optional[Tuple[str, bool, List[ColumnSpec]]]:
+    """Split a CREATE TABLE statement into its table id, IF NOT EXISTS flag and columns."""
+    match = _CREATE_TABLE_PATTERN.search(statement)
+    if not match:
+        return None
+    return match.group("table"), bool(match.group("if_not_exists")), _parse_columns(match.group("body"))
+
+
+def load_table_schema(table_name: str, ddl_path: Path = DEFAULT_DDL_PATH) -> List[ColumnSpec]:
+    """Parse column names, types and NOT NULL flags for a table from the DDL file."""
+    cache_key = f"{ddl_path}:{table_name}"
+    cached = _SCHEMA_CACHE.get(cache_key)
+    if cached:
+        return cached
+
+    ddl_text = ddl_path.read_text(encoding="utf-8")
+    pattern = re.compile(
+        rf"CREATE TABLE IF NOT EXISTS\s+`[^`]*\.{table_name}`\s*\((?P<body>.*?)\n\)",
+        re.DOTALL | re.IGNORECASE,
+    )
+    match = pattern.search(ddl_text)
+    if not match:
+        raise ValueError(f"DDL for table {table_name} not found in {ddl_path}")
+
+    columns = _parse_columns(match.group("body"))
+    if not columns:
+        raise ValueError(f"No columns parsed for table {table_name} in {ddl_path}")
+
+    _SCHEMA_CACHE[cache_key] = columns
+    return columns
+
+
+_PARTITION_PATTERN = re.compile(
+    r"CREATE TABLE IF NOT EXISTS\s+`[^`]*\.(?P<table>\w+)`.*\n\)\s*PARTITION BY\s+(?:DATE\()?`(?P<column>\w+)`",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def required_partition_filters(ddl_path: Path = DEFAULT_DDL_PATH) -> Dict[str, str]:
+    """Map tables declared with ``require_partition_filter = true`` to their partition column."""
+    cache_key = f"{ddl_path}:partition_filters"
+    cached = _PARTITION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    filters: Dict[str, str] = {}
+    for statement in ddl_path.read_text(encoding="utf-8").split(";"):
+        match = _PARTITION_PATTERN.search(statement)
+        if match and re.search(r"require_partition_filter\s*=\s*true", statement, re.IGNORECASE):
+            filters[match.group("table")] = match.group("column")
+    _PARTITION_CACHE[cache_key] = filters
+    return filters
+
+
+def csv_column_types(
+    table_name: str,
+    columns: Optional[Dict[str, str]] = None,
+    overrides: Optional[Dict[str, pa.DataType]] = None,
+    ddl_path: Path = DEFAULT_DDL_PATH,
+) -> Dict[str, pa.DataType]:
+    """Build Arrow column types for reading a CSV from the table's DDL.
+
+    ``columns`` maps CSV column names to DDL column names when they differ;
+    ``overrides`` forces a type for CSV columns whose raw form differs from
+    the target type (e.g. free text that is normalised into a BOOL).
+    """
+    types = {spec.name: spec.data_type for spec in load_table_schema(table_name, ddl_path)}
+    mapping = columns or {name: name for name in types}
+    column_types = {
+        csv_column: BQ_ARROW_TYPES.get(types[ddl_column], pa.string())
+        for csv_column, ddl_column in mapping.items()
+        if ddl_column in types
+    }
+    column_types.update(overrides or {})
+    return column_types
+
+
+def read_csv_header(path: Path) -> List[str]:
+    with Path(path).open(newline="", encoding="utf-8") as handle:
+        return next(csv.reader(handle), [])
+
+
+def _convert_options(path: Path, column_types: Dict[str, pa.DataType]) -> pa_csv.ConvertOptions:
+    return pa_csv.ConvertOptions(
+        column_types={name: column_types.get(name, pa.string()) for name in read_csv_header(path)},
+        strings_can_be_null=True,
+    )
+
+
+def read_typed_csv(path: Path, column_types: Dict[str, pa.DataType]) -> pd.DataFrame:
+    """Read a CSV with pyarrow using explicit column types and Arrow-backed dtypes.
+
+    Columns without an explicit type are read as strings rather than inferred.
+    """
+    table = pa_csv.read_csv(path, convert_options=_convert_options(path, column_types))
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def iter_typed_csv(
+    path: Path, column_types: Dict[str, pa.DataType], block_size: int = 64 << 20
+) -> Iterator[pd.DataFrame]:
+    """Stream a CSV as Arrow-backed DataFrames of roughly ``block_size`` bytes each."""
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=_convert_options(path, column_types),
+    )
+    for batch in reader:
+        yield batch.to_pandas(types_mapper=pd.ArrowDtype)
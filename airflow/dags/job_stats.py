@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from airflow.providers.google.cloud.hooks.bigquery import BigQueryHook
+from airflow.stats import Stats
+
+from common import bigquery_job_labels, get_bool_variable, get_bq_location, get_gcp_project
+from telemetry import METRIC_PREFIX
+
+LOGGER = logging.getLogger(__name__)
+
+DAG_LABEL = "airflow-dag"
+TASK_LABEL = "airflow-task"
+
+
+class PartitionPruningError(RuntimeError):
+    """Raised when ``fail_on_partition_pruning_violation`` is set and a query skipped pruning."""
+
+
+@dataclass
+class JobStats:
+    job_id: str
+    task_id: str
+    job_type: str
+    statement_type: Optional[str]
+    state: Optional[str]
+    error: Optional[str]
+    bytes_processed: int
+    bytes_billed: int
+    slot_ms: int
+    cache_hit: bool
+    duration_seconds: float
+    referenced_tables: List[str] = field(default_factory=list)
+    pruning_violations: List[str] = field(default_factory=list)
+
+
+def _slot_ms(job: Any) -> int:
+    slot_ms = getattr(job, "slot_millis", None)
+    if slot_ms is None:
+        # Load jobs expose totalSlotMs only in the raw statistics resource.
+        slot_ms = (getattr(job, "_properties", {}).get("statistics") or {}).get("totalSlotMs")
+    return int(slot_ms or 0)
+
+
+def pruning_violations(
+    query: str, referenced_tables: List[str], error: Optional[str], partition_filters: Dict[str, str]
+) -> List[str]:
+    """Flag queries on ``require_partition_filter`` tables that do not filter on the partition column."""
+    violations: List[str] = []
+    where_clause = re.split(r"\bWHERE\b", query or "", maxsplit=1, flags=re.IGNORECASE)
+    for table in referenced_tables:
+        column = partition_filters.get(table.split(".")[-1])
+        if column is None:
+            continue
+        if len(where_clause) < 2 or not re.search(rf"\b{column}\b", where_clause[1], re.IGNORECASE):
+            violations.append(f"{table}: no filter on partition column {column}")
+    if error and "without a filter over column" in error:
+        violations.append(f"rejected by require_partition_filter: {error}")
+    return violations
+
+
+def job_stats(job: Any, partition_filters: Dict[str, str]) -> JobStats:
+    job_type = getattr(job, "job_type", None) or "unknown"
+    referenced = [
+        f"{reference.dataset_id}.{reference.table_id}" for reference in getattr(job, "referenced_tables", None) or []
+    ]
+    error_result = getattr(job, "error_result", None) or {}
+    error = error_result.get("message")
+    started, ended = getattr(job, "started", None), getattr(job, "ended", None)
+    query = getattr(job, "query", None) if job_type == "query" else None
+    return JobStats(
+        job_id=job.job_id,
+        task_id=(getattr(job, "labels", None) or {}).get(TASK_LABEL, "unknown"),
+        job_type=job_type,
+        statement_type=getattr(job, "statement_type", None),
+        state=getattr(job, "state", None),
+        error=error,
+        bytes_processed=int(getattr(job, "total_bytes_processed", None) or 0),
+        bytes_billed=int(getattr(job, "total_bytes_billed", None) or 0),
+        slot_ms=_slot_ms(job),
+        cache_hit=bool(getattr(job, "cache_hit", None)),
+        duration_seconds=round((ended - started).total_seconds(), 3) if started and ended else 0.0,
+        referenced_tables=referenced,
+        pruning_violations=pruning_violations(query, referenced, error, partition_filters) if query else [],
+    )
+
+
+def summarize_by_task(stats: List[JobStats]) -> Dict[str, Dict[str, Any]]:
+    summary: Dict[str, Dict[str, Any]] = {}
+    for item in stats:
+        task = summary.setdefault(
+            item.task_id,
+            {"jobs": 0, "bytes_processed": 0, "bytes_billed": 0, "slot_ms": 0, "cache_hits": 0,
+             "duration_seconds": 0.0, "pruning_violations": 0},
+        )
+        task["jobs"] += 1
+        task["bytes_processed"] += item.bytes_processed
+        task["bytes_billed"] += item.bytes_billed
+        task["slot_ms"] += item.slot_ms
+        task["cache_hits"] += int(item.cache_hit)
+        task["duration_seconds"] = round(task["duration_seconds"] + item.duration_seconds, 3)
+        task["pruning_violations"] += len(item.pruning_violations)
+    return summary
+
+
+def collect_bigquery_job_stats(**context: Dict[str, Any]) -> Dict[str, Any]:
+    """Gather statistics of every BigQuery job this DAG run submitted.
+
+    Jobs are matched by their ``airflow-dag`` label and creation time after the run
+    started. Totals per task are logged, emitted as metrics and returned to XCom.
+    Queries on ``require_partition_filter`` tables without a partition filter are
+    flagged; with ``fail_on_partition_pruning_violation`` they fail this task.
+    """
+    # ddl_schema pulls in pandas and pyarrow; importing it here keeps them out of DAG parsing.
+    from ddl_schema import required_partition_filters
+
+    ti = context["ti"]
+    dag_run = context.get("dag_run")
+    project = get_gcp_project()
+    location = get_bq_location()
+    labels = bigquery_job_labels(ti.dag_id, ti.task_id)
+    run_started = getattr(dag_run, "start_date", None) or context["data_interval_end"]
+
+    client = BigQueryHook(gcp_conn_id="google_cloud_default", location=location).get_client(project_id=project)
+    partition_filters = required_partition_filters()
+    stats = [
+        job_stats(job, partition_filters)
+        for job in client.list_jobs(project=project, min_creation_time=run_started, all_users=False)
+        if (getattr(job, "labels", None) or {}).get(DAG_LABEL) == labels[DAG_LABEL]
+    ]
+    by_task = summarize_by_task(stats)
+
+    for task_id, totals in by_task.items():
+        prefix = f"{METRIC_PREFIX}.{ti.dag_id}.bigquery.{task_id}"
+        tags = {"dag_id": ti.dag_id, "task_id": task_id}
+        for name in ("jobs", "bytes_processed", "bytes_billed", "slot_ms", "cache_hits"):
+            Stats.gauge(f"{prefix}.{name}", totals[name], tags=tags)
+        Stats.timing(f"{prefix}.duration", totals["duration_seconds"] * 1000, tags=tags)
+        LOGGER.info("BigQuery usage of %s: %s", task_id, totals)
+
+    violations = [f"{item.job_id} ({item.task_id}): {message}" for item in stats for message in item.pruning_violations]
+    for violation in violations:
+        LOGGER.warning("Partition pruning violation: %s", violation)
+    LOGGER.info(
+        "Collected %s BigQuery jobs for %s: %s bytes processed, %s bytes billed, %s slot ms",
+        len(stats),
+        ti.run_id,
+        sum(item.bytes_processed for item in stats),
+        sum(item.bytes_billed for item in stats),
+        sum(item.slot_ms for item in stats),
+    )
+    if violations and get_bool_variable("fail_on_partition_pruning_violation", default=False):
+        raise PartitionPruningError(f"{len(violations)} queries did not prune partitions: {violations}")
+    return {
+        "collected_at": datetime.now(timezone.utc).isoformat(),
+        "by_task": by_task,
+        "jobs": [asdict(item) for item in stats],
+    }
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from airflow.models import Variable
+from airflow.providers.google.cloud.hooks.bigquery import BigQueryHook
+from airflow.stats import Stats
+from google.cloud import bigquery
+
+from common import bigquery_job_labels, get_bq_dataset, get_bq_location, get_gcp_project, load_table_ddl
+from telemetry import METRIC_PREFIX, TELEMETRY_XCOM_KEY, current_telemetry
+
+LOGGER = logging.getLogger(__name__)
+
+LATENCY_TABLE = "ingestion_latency"
+SLO_VARIABLE = "ingestion_latency_slo_seconds"
+
+
+class LatencySLOBreach(RuntimeError):
+    """Raised when the p95 source-to-load lag of a run exceeds the configured SLO."""
+
+
+@dataclass(frozen=True)
+class LagSummary:
+    rows: int
+    p50: float
+    p95: float
+    max: float
+
+    @classmethod
+    def from_seconds(cls, lags: np.ndarray) -> "LagSummary":
+        if len(lags) == 0:
+            return cls(0, 0.0, 0.0, 0.0)
+        p50, p95 = np.percentile(lags, [50, 95])
+        return cls(len(lags), round(float(p50), 3), round(float(p95), 3), round(float(lags.max()), 3))
+
+    def shifted(self, seconds: float) -> "LagSummary":
+        """The same rows measured ``seconds`` later; every lag grows by the same amount."""
+        return LagSummary(
+            self.rows, round(self.p50 + seconds, 3), round(self.p95 + seconds, 3), round(self.max + seconds, 3)
+        )
+
+
+def record_stage_latency(table_name: str, source_times: pd.Series, source_column: str) -> LagSummary:
+    """Measure source-to-stage lag for rows just written to the staged file.
+
+    The summary is kept in the task telemetry, so it reaches XCom with the other task metrics.
+    """
+    staged_at = datetime.now(timezone.utc)
+    parsed = pd.to_datetime(source_times, utc=True, errors="coerce").dropna()
+    lags = (pd.Timestamp(staged_at) - parsed).dt.total_seconds().to_numpy()
+    summary = LagSummary.from_seconds(lags)
+    current_telemetry().latency[table_name] = {
+        "source_column": source_column,
+        "staged_at": staged_at.isoformat(),
+        **asdict(summary),
+    }
+    LOGGER.info("Source-to-stage lag for %s (%s): %s", table_name, source_column, summary)
+    return summary
+
+
+def _load_end_time(hook: BigQueryHook, job_id: Optional[str], project: str, location: str) -> datetime:
+    if job_id:
+        job = hook.get_job(job_id=job_id, project_id=project, location=location)
+        ended = getattr(job, "ended", None)
+        if ended is not None:
+            return ended
+    LOGGER.warning("No end time for load job %s; using the current time", job_id)
+    return datetime.now(timezone.utc)
+
+
+def _slo_seconds() -> Optional[float]:
+    raw_value = Variable.get(SLO_VARIABLE, default_var="").strip()
+    return float(raw_value) if raw_value else None
+
+
+def record_ingestion_latency(
+    table_name: str, stage_task_id: str, load_task_id: str, **context: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Combine the staged lag with the load job's end time, store it and enforce the SLO.
+
+    The row goes to ``raw.ingestion_latency``. With the ``ingestion_latency_slo_seconds``
+    Variable set, a p95 source-to-load lag above it fails the task after the row is stored.
+    """
+    ti = context["ti"]
+    telemetry = ti.xcom_pull(task_ids=stage_task_id, key=TELEMETRY_XCOM_KEY) or {}
+    stage = (telemetry.get("latency") or {}).get(table_name)
+    if not stage:
+        raise ValueError(f"No staged latency for {table_name} in the telemetry of {stage_task_id}")
+
+    project = get_gcp_project()
+    dataset = get_bq_dataset()
+    location = get_bq_location()
+    hook = BigQueryHook(gcp_conn_id="google_cloud_default", location=location)
+
+    staged_at = datetime.fromisoformat(stage["staged_at"])
+    loaded_at = _load_end_time(hook, ti.xcom_pull(task_ids=load_task_id), project, location)
+    stage_lag = LagSummary(stage["rows"], stage["p50"], stage["p95"], stage["max"])
+    load_lag = stage_lag.shifted(max(0.0, (loaded_at - staged_at).total_seconds()))
+    slo_seconds = _slo_seconds()
+    slo_met = None if slo_seconds is None else load_lag.p95 <= slo_seconds
+
+    row = {
+        "measured_at": datetime.now(timezone.utc),
+        "dag_id": ti.dag_id,
+        "run_id": ti.run_id,
+        "table_name": table_name,
+        "source_column": stage["source_column"],
+        "row_count": stage_lag.rows,
+        "staged_at": staged_at,
+        "loaded_at": loaded_at,
+        "stage_lag_p50_s": stage_lag.p50,
+        "stage_lag_p95_s": stage_lag.p95,
+        "stage_lag_max_s": stage_lag.max,
+        "load_lag_p50_s": load_lag.p50,
+        "load_lag_p95_s": load_lag.p95,
+        "load_lag_max_s": load_lag.max,
+        "slo_seconds": slo_seconds,
+        "slo_met": slo_met,
+    }
+    parameter_types = {
+        "measured_at": "TIMESTAMP",
+        "staged_at": "TIMESTAMP",
+        "loaded_at": "TIMESTAMP",
+        "row_count": "INT64",
+        "slo_met": "BOOL",
+        "dag_id": "STRING",
+        "run_id": "STRING",
+        "table_name": "STRING",
+        "source_column": "STRING",
+    }
+    labels = bigquery_job_labels(ti.dag_id, ti.task_id)
+    client = hook.get_client(project_id=project)
+    client.query(
+        load_table_ddl(LATENCY_TABLE, project, dataset),
+        job_config=bigquery.QueryJobConfig(labels=labels),
+        location=location,
+    ).result()
+    insert = (
+        f"INSERT INTO `{project}.{dataset}.{LATENCY_TABLE}` ({', '.join(row)}) "
+        f"VALUES ({', '.join(f'@{name}' for name in row)})"
+    )
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter(name, parameter_types.get(name, "FLOAT64"), value)
+            for name, value in row.items()
+        ],
+        labels=labels,
+    )
+    client.query(insert, job_config=job_config, location=location).result()
+
+    prefix = f"{METRIC_PREFIX}.{ti.dag_id}.latency.{table_name}"
+    tags = {"dag_id": ti.dag_id, "table": table_name}
+    for stage_name, summary in (("stage", stage_lag), ("load", load_lag)):
+        Stats.gauge(f"{prefix}.{stage_name}_p50_s", summary.p50, tags=tags)
+        Stats.gauge(f"{prefix}.{stage_name}_p95_s", summary.p95, tags=tags)
+        Stats.gauge(f"{prefix}.{stage_name}_max_s", summary.max, tags=tags)
+
+    LOGGER.info(
+        "Latency for %s: source-to-stage %s, source-to-load %s (load finished %s)",
+        table_name,
+        stage_lag,
+        load_lag,
+        loaded_at.isoformat(),
+    )
+    if slo_met is False:
+        raise LatencySLOBreach(
+            f"{table_name} p95 source-to-load lag {load_lag.p95:.0f}s exceeds the {slo_seconds:.0f}s SLO"
+        )
+    return {name: value.isoformat() if isinstance(value, datetime) else value for name, value in row.items()}
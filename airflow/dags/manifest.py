@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import google_crc32c
+import numpy as np
+import pandas as pd
+from airflow.models import Variable
+from airflow.providers.google.cloud.hooks.gcs import GCSHook
+
+from common import get_bool_variable, get_raw_bucket
+from sharding import (
+    gzip_file,
+    shard_max_bytes,
+    shard_object_names,
+    shard_source_uri,
+    split_staged_file,
+    stale_shard_prefix,
+)
+from telemetry import current_telemetry, instrumented_task
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_PREFIX = "manifests"
+HASH_CHUNK_BYTES = 1024 * 1024
+DEFAULT_MAX_MANIFEST_OBJECTS = 500
+DEFAULT_UPLOAD_WORKERS = 8
+
+
+class UploadVerificationError(RuntimeError):
+    """Raised when the CRC32C GCS reports for an upload differs from the local file's."""
+
+
+@dataclass
+class FileDigest:
+    sha256: str
+    # Base64 of the big-endian CRC32C, the encoding GCS uses for ``Blob.crc32c``.
+    crc32c: str
+    size: int
+
+
+@dataclass
+class StagingManifest:
+    """Per-table record of the staged objects in GCS and of the content last loaded to BigQuery."""
+
+    table_name: str
+    objects: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    loaded: Dict[str, Any] = field(default_factory=dict)
+
+
+def file_digest(path: str | Path, chunk_size: int = HASH_CHUNK_BYTES) -> FileDigest:
+    """SHA-256 and CRC32C of a file in one streaming pass."""
+    sha256 = hashlib.sha256()
+    crc32c = google_crc32c.Checksum()
+    size = 0
+    with Path(path).open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            sha256.update(chunk)
+            crc32c.update(chunk)
+            size += len(chunk)
+    return FileDigest(sha256.hexdigest(), base64.b64encode(crc32c.digest()).decode("ascii"), size)
+
+
+def frame_content_digest(frame: pd.DataFrame, columns: List[str]) -> str:
+    """SHA-256 over the sorted row hashes of ``columns``, so row order does not change the digest.
+
+    Staged files carry per-run values (``ingested_at``, ``load_id``, uuids) and never
+    repeat byte for byte; this digest covers only the source content.
+    """
+    row_hashes = pd.util.hash_pandas_object(frame[columns].astype(str), index=False).to_numpy()
+    return hashlib.sha256(np.sort(row_hashes).tobytes()).hexdigest()
+
+
+def _local_manifest_path(table_name: str) -> Optional[Path]:
+    directory = Variable.get("staging_manifest_dir", default_var="")
+    return Path(directory).expanduser() / f"{table_name}.json" if directory else None
+
+
+def _manifest_object(table_name: str) -> str:
+    return f"{MANIFEST_PREFIX}/{table_name}.json"
+
+
+def read_manifest(table_name: str, hook: GCSHook, bucket: str) -> StagingManifest:
+    """Manifest from ``staging_manifest_dir`` when that Variable is set, otherwise from the raw bucket."""
+    local_path = _local_manifest_path(table_name)
+    if local_path is not None:
+        payload = local_path.read_text(encoding="utf-8") if local_path.exists() else None
+    elif hook.exists(bucket, _manifest_object(table_name)):
+        payload = hook.download(bucket, _manifest_object(table_name)).decode("utf-8")
+    else:
+        payload = None
+    if payload is None:
+        return StagingManifest(table_name)
+    return StagingManifest(**json.loads(payload))
+
+
+def write_manifest(manifest: StagingManifest, hook: GCSHook, bucket: str) -> None:
+    max_objects = int(Variable.get("staging_manifest_max_objects", default_var=str(DEFAULT_MAX_MANIFEST_OBJECTS)))
+    recent = sorted(manifest.objects.items(), key=lambda item: item[1].get("uploaded_at", ""))[-max_objects:]
+    manifest.objects = dict(recent)
+    payload = json.dumps(asdict(manifest), indent=2, sort_keys=True)
+    local_path = _local_manifest_path(manifest.table_name)
+    if local_path is not None:
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        local_path.write_text(payload, encoding="utf-8")
+    else:
+        hook.upload(bucket, _manifest_object(manifest.table_name), data=payload, mime_type="application/json")
+
+
+def _shard_entry_valid(entry: Dict[str, Any], digest: FileDigest, compressed: bool, hook: GCSHook, bucket: str) -> bool:
+    """The manifest entry describes these bytes and every recorded shard is still in GCS unchanged."""
+    if entry.get("sha256") != digest.sha256 or entry.get("compressed", False) != compressed:
+        return False
+    shards = entry.get("shards") or []
+    return bool(shards) and all(
+        hook.exists(bucket, shard["object"]) and hook.get_crc32c(bucket, shard["object"]) == shard["crc32c"]
+        for shard in shards
+    )
+
+
+def _upload_shard(
+    hook: GCSHook, bucket: str, path: Path, object_name: str, mime_type: str, gzip_dir: Optional[Path]
+) -> Dict[str, Any]:
+    """Compress (into ``gzip_dir``, if given), upload and CRC32C-verify one shard; runs on the upload pool."""
+    if gzip_dir is not None:
+        path = gzip_file(path, gzip_dir / f"{path.name}.gz")
+    digest = file_digest(path)
+    hook.upload(bucket, object_name, filename=str(path), mime_type=mime_type)
+    remote_crc32c = hook.get_crc32c(bucket, object_name)
+    if remote_crc32c != digest.crc32c:
+        raise UploadVerificationError(
+            f"CRC32C mismatch for gs://{bucket}/{object_name}: local {digest.crc32c}, GCS {remote_crc32c}"
+        )
+    return {"object": object_name, "crc32c": digest.crc32c, "size": digest.size}
+
+
+def _remove_stale_shards(hook: GCSHook, bucket: str, gcs_object: str, keep: List[str]) -> None:
+    """Delete shards of earlier attempts with another layout so wildcard and coalesced loads never see them."""
+    prefix = stale_shard_prefix(gcs_object)
+    for name in hook.list(bucket, prefix=prefix):
+        if name not in keep and (name.startswith(f"{prefix}-") or name.startswith(gcs_object)):
+            hook.delete(bucket, name)
+            LOGGER.info("Removed stale shard gs://%s/%s", bucket, name)
+
+
+@instrumented_task
+def upload_staged_file(
+    table_name: str,
+    stage_task_id: str,
+    mime_type: str,
+    path_key: str = "local_path",
+    object_key: str = "gcs_object",
+    **context: Any,
+) -> Dict[str, Any]:
+    """Upload the file a staging task produced, in parallel shards, unless GCS already holds the same bytes.
+
+    Files over ``staging_shard_max_bytes`` are split at record boundaries and, with
+    ``staging_shard_gzip``, compressed. Shards go up from a thread pool and are
+    verified by the CRC32C GCS computed instead of reading them back. The returned
+    ``source_uri`` matches exactly this upload's shards, for the load job.
+    A retry whose file hashes to the manifest entry of shards still intact is skipped.
+    """
+    telemetry = current_telemetry()
+    staged = context["ti"].xcom_pull(task_ids=stage_task_id)
+    local_path, gcs_object = Path(staged[path_key]), staged[object_key]
+    bucket = get_raw_bucket()
+    compressed = get_bool_variable("staging_shard_gzip", default=False)
+    hook = GCSHook(gcp_conn_id="google_cloud_default")
+
+    digest = file_digest(local_path)
+    manifest = read_manifest(table_name, hook, bucket)
+    telemetry.lap("hash")
+    result = {"gcs_object": gcs_object, "sha256": digest.sha256, "size": digest.size}
+
+    entry = manifest.objects.get(gcs_object)
+    if entry is not None and _shard_entry_valid(entry, digest, compressed, hook, bucket):
+        telemetry.lap("verify")
+        LOGGER.info(
+            "gs://%s already holds %s (sha256 %s) in %s shards; skipping upload",
+            bucket,
+            local_path,
+            digest.sha256,
+            len(entry["shards"]),
+        )
+        source_uri = shard_source_uri(bucket, gcs_object, len(entry["shards"]), compressed)
+        return {**result, "shards": entry["shards"], "source_uri": source_uri, "uploaded": False}
+
+    shard_dir = local_path.with_name(f"{local_path.name}.shards")
+    paths = split_staged_file(local_path, shard_dir, shard_max_bytes(), has_header=mime_type == "text/csv")
+    gzip_dir = shard_dir if compressed else None
+    if gzip_dir is not None:
+        gzip_dir.mkdir(parents=True, exist_ok=True)
+    telemetry.lap("split")
+
+    object_names = shard_object_names(gcs_object, len(paths), compressed)
+    workers = min(len(paths), int(Variable.get("staging_upload_workers", default_var=str(DEFAULT_UPLOAD_WORKERS))))
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gcs-upload") as pool:
+        # zlib and the HTTP uploads release the GIL, so shards compress and upload in parallel.
+        shards = list(
+            pool.map(
+                lambda pair: _upload_shard(hook, bucket, pair[0], pair[1], mime_type, gzip_dir),
+                zip(paths, object_names),
+            )
+        )
+    telemetry.lap("upload")
+    _remove_stale_shards(hook, bucket, gcs_object, object_names)
+    shutil.rmtree(shard_dir, ignore_errors=True)
+
+    manifest.objects[gcs_object] = {
+        "sha256": digest.sha256,
+        "size": digest.size,
+        "compressed": compressed,
+        "shards": shards,
+        "uploaded_at": datetime.now(timezone.utc).isoformat(),
+    }
+    write_manifest(manifest, hook, bucket)
+    LOGGER.info(
+        "Uploaded %s to gs://%s as %s shards (%s bytes) with %s workers",
+        local_path,
+        bucket,
+        len(shards),
+        sum(shard["size"] for shard in shards),
+        workers,
+    )
+    source_uri = shard_source_uri(bucket, gcs_object, len(shards), compressed)
+    return {**result, "shards": shards, "source_uri": source_uri, "uploaded": True}
+
+
+def content_changed(table_name: str, stage_task_id: str, **context: Any) -> bool:
+    """ShortCircuit callable: False when the staged content digest equals the one last loaded."""
+    staged = context["ti"].xcom_pull(task_ids=stage_task_id)
+    manifest = read_manifest(table_name, GCSHook(gcp_conn_id="google_cloud_default"), get_raw_bucket())
+    last_loaded = manifest.loaded.get("content_sha256")
+    if last_loaded is not None and last_loaded == staged["content_sha256"]:
+        LOGGER.info(
+            "%s content is unchanged since the load of %s (sha256 %s); skipping upload and load",
+            table_name,
+            manifest.loaded.get("loaded_at"),
+            last_loaded,
+        )
+        return False
+    return True
+
+
+def record_loaded_content(table_name: str, stage_task_id: str, load_task_id: str, **context: Any) -> None:
+    """Remember the content digest of a successful load so an identical payload can skip the next one."""
+    ti = context["ti"]
+    staged = ti.xcom_pull(task_ids=stage_task_id)
+    hook = GCSHook(gcp_conn_id="google_cloud_default")
+    bucket = get_raw_bucket()
+    manifest = read_manifest(table_name, hook, bucket)
+    manifest.loaded = {
+        "content_sha256": staged["content_sha256"],
+        "gcs_object": staged["gcs_object"],
+        "load_job_id": ti.xcom_pull(task_ids=load_task_id),
+        "run_id": ti.run_id,
+        "loaded_at": datetime.now(timezone.utc).isoformat(),
+    }
+    write_manifest(manifest, hook, bucket)
+    LOGGER.info("Recorded %s content %s as loaded", table_name, staged["content_sha256"])
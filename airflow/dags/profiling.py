@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set
+
+from airflow.models import Variable
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_VARIABLE = "profile_tasks"
+PROFILE_PARAM = "profile"
+PROFILE_MODES = {"cpu", "memory"}
+DEFAULT_PROFILE_DIR = Path(__file__).resolve().parents[1] / "logs" / "profiles"
+SAMPLE_INTERVAL_SECONDS = 0.005
+TOP_ALLOCATIONS = 30
+TRACEMALLOC_FRAMES = 25
+
+
+def _parse_modes(value: Any) -> Set[str]:
+    """``true``/``all`` -> cpu and memory; ``cpu``, ``memory`` or ``cpu,memory``; anything falsy -> off."""
+    if isinstance(value, bool):
+        return set(PROFILE_MODES) if value else set()
+    tokens = {token.strip().lower() for token in str(value or "").split(",") if token.strip()}
+    if tokens & {"true", "1", "yes", "y", "all"}:
+        return set(PROFILE_MODES)
+    return tokens & PROFILE_MODES
+
+
+def profiling_modes(context: Dict[str, Any], task_id: str) -> Set[str]:
+    """Profilers requested for this task run, by DAG param/run conf first, then by Variable.
+
+    The ``profile_task_ids`` Variable (comma-separated) limits profiling to some tasks.
+    """
+    dag_run = context.get("dag_run")
+    requested = (context.get("params") or {}).get(PROFILE_PARAM)
+    if requested is None:
+        requested = (getattr(dag_run, "conf", None) or {}).get(PROFILE_PARAM)
+    if requested is None:
+        requested = Variable.get(PROFILE_VARIABLE, default_var="false")
+    modes = _parse_modes(requested)
+    if not modes:
+        return modes
+    task_ids = {
+        name.strip() for name in Variable.get("profile_task_ids", default_var="").split(",") if name.strip()
+    }
+    return modes if not task_ids or task_id in task_ids else set()
+
+
+def _safe(part: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_.=-]+", "_", part)
+
+
+def profile_directory(context: Dict[str, Any], task_id: str) -> Path:
+    ti = context.get("ti")
+    base = Path(Variable.get("profile_output_dir", default_var=str(DEFAULT_PROFILE_DIR))).expanduser()
+    run_id = str(getattr(ti, "run_id", None) or context.get("run_id") or "manual")
+    try_number = getattr(ti, "try_number", None) or 1
+    dag_id = str(getattr(ti, "dag_id", None) or "dag")
+    return base / _safe(dag_id) / _safe(run_id) / f"{_safe(task_id)}.try{try_number}"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and folds it into flamegraph.pl format."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+def _write_allocations(snapshot: tracemalloc.Snapshot, peak: int, path: Path) -> None:
+    # Leave out the profilers' own bookkeeping.
+    snapshot = snapshot.filter_traces(
+        [tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, sys.modules[__name__])]
+    )
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write(f"Peak traced memory: {peak / 2**20:.1f} MiB\n\n")
+        handle.write(f"Top {TOP_ALLOCATIONS} allocation sites still alive at task end:\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            handle.write(f"{stat.size / 2**20:10.2f} MiB {stat.count:>10} blocks  {stat.traceback[0]}\n")
+        handle.write(f"\nTop {TOP_ALLOCATIONS} allocation tracebacks:\n")
+        for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS]:
+            handle.write(f"\n{stat.size / 2**20:.2f} MiB in {stat.count} blocks\n")
+            handle.write("\n".join(stat.traceback.format(limit=TRACEMALLOC_FRAMES)))
+            handle.write("\n")
+
+
+@contextmanager
+def profiling_session(context: Dict[str, Any], task_id: str) -> Iterator[Optional[Path]]:
+    """Profile the enclosed block when requested; yields the artifact directory or None.
+
+    CPU mode writes ``profile.pstats`` (cProfile), ``profile.txt`` (top functions) and
+    ``stacks.folded`` (sampled stacks for flamegraph.pl/speedscope). Memory mode writes
+    ``allocations.txt`` from tracemalloc. When profiling is off nothing is started.
+    """
+    modes = profiling_modes(context, task_id)
+    if not modes:
+        yield None
+        return
+
+    directory = profile_directory(context, task_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    sampler = StackSampler(threading.get_ident()) if "cpu" in modes else None
+    started_tracemalloc = "memory" in modes and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    if sampler is not None:
+        sampler.start()
+    if profiler is not None:
+        profiler.enable()
+    started = time.perf_counter()
+    try:
+        yield directory
+    finally:
+        elapsed = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        # Snapshot before writing the other artifacts so their allocations stay out of it.
+        if "memory" in modes and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            _write_allocations(snapshot, peak, directory / "allocations.txt")
+        if profiler is not None:
+            profiler.dump_stats(str(directory / "profile.pstats"))
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+            (directory / "profile.txt").write_text(summary.getvalue(), encoding="utf-8")
+        if sampler is not None:
+            sampler.write_folded(directory / "stacks.folded")
+        LOGGER.info("Profiled %s (%s) for %.2fs; artifacts in %s", task_id, ",".join(sorted(modes)), elapsed, directory)
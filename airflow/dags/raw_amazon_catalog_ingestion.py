@@ -11,7 +11,6 @@ import pandas as pd
 import hashlib
 import json
 import logging
-import uuid
 from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Dict, List
@@ -22,16 +21,18 @@ from airflow import DAG
 from airflow.models import Variable
 from airflow.operators.python import ShortCircuitOperator
 from airflow.providers.standard.operators.python import PythonOperator
-from airflow.providers.google.cloud.operators.bigquery import (
-    BigQueryCheckOperator,
-    BigQueryInsertJobOperator,
-)
-from airflow.providers.google.cloud.transfers.local_to_gcs import LocalFilesystemToGCSOperator
+from airflow.providers.google.cloud.operators.bigquery import BigQueryInsertJobOperator
 from airflow.utils.trigger_rule import TriggerRule
 
+from api_readiness import ApiReadySensor, api_readiness_poll_seconds, api_readiness_timeout_seconds
+from checkpoints import checkpointed_stage
+from cleaning import bulk_uuid4
 from common import (
     DAG_USER_AGENT,
     DEFAULT_ARGS,
+    LabelledBigQueryCheckOperator,
+    api_accept_header,
+    bigquery_job_labels,
     get_bq_dataset,
     get_bq_location,
     get_gcp_project,
@@ -40,11 +41,19 @@ from common import (
     json_default,
     load_table_ddl,
     partition_has_rows,
+    read_columnar_response,
     render_json_template,
+    use_deferrable_operators,
+    validate_for_staging,
 )
+from job_stats import collect_bigquery_job_stats
+from manifest import content_changed, frame_content_digest, record_loaded_content, upload_staged_file
+from telemetry import current_telemetry, expected_rows_template, instrumented_task
 
 LOGGER = logging.getLogger(__name__)
 
+PRODUCTS_API_DEFAULT_URL = "http://host.docker.internal:8000/products"
+
 AMAZON_GCS_TEMPLATE = "datasets/source/amazon_catalog/dt={ds}/amazon_catalog_{ds_nodash}.json"
 
 AMAZON_SCHEMA: List[Dict[str, str]] = [
@@ -72,7 +81,10 @@ def _should_run_today(table_name: str, **context: Dict[str, Any]) -> bool:
     return True
 
 
+@instrumented_task
+@checkpointed_stage({"local_path": "raw_amazon_catalog"})
 def fetch_amazon_catalog(**context: Dict[str, Any]) -> Dict[str, str]:
+    telemetry = current_telemetry()
     ds = context["ds"]
     ds_nodash = context["ds_nodash"]
 
@@ -91,11 +103,11 @@ def fetch_amazon_catalog(**context: Dict[str, Any]) -> Dict[str, str]:
     source_uri = f"gs://{bucket}/{gcs_object}"
     source_ts_value = load_at_iso
     
-    api_url = Variable.get("amazon_products_api_endpoint_path", default_var="http://host.docker.internal:8000/products")
+    api_url = Variable.get("amazon_products_api_endpoint_path", default_var=PRODUCTS_API_DEFAULT_URL)
     timeout_seconds = int(Variable.get("amazon_api_timeout_seconds", default_var="30"))
 
     headers = {
-        "Accept": "application/json",
+        "Accept": api_accept_header(),
         "dag_user_agent": context["dag"].dag_id,
         "User-Agent": DAG_USER_AGENT,
     }
@@ -108,18 +120,22 @@ def fetch_amazon_catalog(**context: Dict[str, Any]) -> Dict[str, str]:
     if response.status_code >= 400:
         raise RuntimeError(f"Amazon API responded with status {response.status_code}")
 
-    try:
-        payload = response.json()
-    except json.JSONDecodeError as exc:
-        raise ValueError("Amazon API returned invalid JSON") from exc
-
-    data_rows = payload.get("data") or []
-    if not isinstance(data_rows, list):
-        raise ValueError("Amazon API payload 'data' should be a list")
-    if not data_rows:
+    rows_df = read_columnar_response(response.content, response.headers.get("Content-Type", ""))
+    if rows_df is None:
+        try:
+            payload = response.json()
+        except json.JSONDecodeError as exc:
+            raise ValueError("Amazon API returned invalid JSON") from exc
+
+        data_rows = payload.get("data") or []
+        if not isinstance(data_rows, list):
+            raise ValueError("Amazon API payload 'data' should be a list")
+        rows_df = pd.DataFrame(data_rows)
+    if rows_df.empty:
         raise ValueError("Amazon API returned no order rows")
+    telemetry.record_input(len(rows_df))
+    telemetry.lap("fetch")
 
-    metadata = payload.get("metadata") or {}
     required_columns = [
         "product_id",
         "asin",
@@ -134,13 +150,14 @@ def fetch_amazon_catalog(**context: Dict[str, Any]) -> Dict[str, str]:
         "price",
         "currency"
     ]
-    products_df = pd.DataFrame(data_rows)[required_columns].drop_duplicates().assign(
+    products_df = rows_df[required_columns].drop_duplicates().assign(
         ingested_at=ingested_at_iso,
         load_at=load_at_iso,
         load_id=load_id,
         source_file=source_uri,
         source_ts=source_ts_value,
-        ingestion_uuid=[str(uuid.uuid4()) for _ in range(len(data_rows))],
+        # Sized from the de-duplicated frame, not rows_df.
+        ingestion_uuid=lambda frame: bulk_uuid4(len(frame)),
     )
     
 
@@ -151,7 +168,10 @@ def fetch_amazon_catalog(**context: Dict[str, Any]) -> Dict[str, str]:
         if column not in products_df.columns:
             products_df[column] = None    
 
+    products_df = validate_for_staging(products_df, "raw_amazon_catalog", local_path)
+    content_sha256 = frame_content_digest(products_df, required_columns)
 
+    telemetry.lap("enrich")
     records: List[Dict[str, Any]] = []
     for record in products_df.to_dict(orient="records"):
         cleaned: Dict[str, Any] = {}
@@ -176,6 +196,8 @@ def fetch_amazon_catalog(**context: Dict[str, Any]) -> Dict[str, str]:
         for order in records:
             handle.write(json.dumps(order, default=json_default))
             handle.write("\n")
+    telemetry.lap("serialize")
+    telemetry.record_output("raw_amazon_catalog", len(records), local_path)
 
     LOGGER.info("Persisted %s Amazon order records to %s", len(records), local_path)
 
@@ -184,6 +206,7 @@ def fetch_amazon_catalog(**context: Dict[str, Any]) -> Dict[str, str]:
         "gcs_object": gcs_object,
         "load_id": load_id,
         "ingested_at": ingested_at_iso,
+        "content_sha256": content_sha256,
     }
 
 
@@ -200,7 +223,7 @@ with DAG(
     project = get_gcp_project()
     dataset = get_bq_dataset()
     location = get_bq_location()
-    bucket = get_raw_bucket()
+    deferrable = use_deferrable_operators()
 
     create_table = BigQueryInsertJobOperator(
         task_id="create_amazon_table",
@@ -211,6 +234,7 @@ with DAG(
             }
         },
         location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
     )
 
@@ -220,28 +244,46 @@ with DAG(
         op_kwargs={"table_name": "raw_amazon_catalog"},
     )
 
+    wait_for_api = ApiReadySensor(
+        task_id="wait_for_products_api",
+        endpoint_url=f"{{{{ var.value.get('amazon_products_api_endpoint_path', '{PRODUCTS_API_DEFAULT_URL}') }}}}",
+        poke_interval=api_readiness_poll_seconds(),
+        timeout=api_readiness_timeout_seconds(),
+        deferrable=deferrable,
+    )
+
     fetch_catalog = PythonOperator(
         task_id="fetch_amazon_products",
         python_callable=fetch_amazon_catalog,
         do_xcom_push=True,
     )
 
-    upload_to_gcs = LocalFilesystemToGCSOperator(
+    # The /products payload rarely changes between days; reloading an identical catalog is skipped.
+    skip_if_unchanged = ShortCircuitOperator(
+        task_id="skip_catalog_if_unchanged",
+        python_callable=content_changed,
+        op_kwargs={"table_name": "raw_amazon_catalog", "stage_task_id": "fetch_amazon_products"},
+        ignore_downstream_trigger_rules=False,
+    )
+
+    upload_to_gcs = PythonOperator(
         task_id="upload_amazon_to_gcs",
-        gcp_conn_id="google_cloud_default",
-        src="{{ ti.xcom_pull(task_ids='fetch_amazon_products')['local_path'] }}",
-        dst="{{ ti.xcom_pull(task_ids='fetch_amazon_products')['gcs_object'] }}",
-        bucket=bucket,
-        mime_type="application/json",
+        python_callable=upload_staged_file,
+        op_kwargs={
+            "table_name": "raw_amazon_catalog",
+            "stage_task_id": "fetch_amazon_products",
+            "mime_type": "application/json",
+        },
     )
 
     insert_into_raw = BigQueryInsertJobOperator(
         task_id="insert_amazon_raw",
         location=location,
+        deferrable=deferrable,
         configuration={
             "load": {
                 "sourceUris": [
-                    f"gs://{bucket}/{{{{ ti.xcom_pull(task_ids='fetch_amazon_products')['gcs_object'] }}}}"
+                    "{{ ti.xcom_pull(task_ids='upload_amazon_to_gcs')['source_uri'] }}"
                 ],
                 "destinationTable": {
                     "projectId": project,
@@ -260,14 +302,36 @@ with DAG(
         gcp_conn_id="google_cloud_default",
     )
 
-    row_count_check = BigQueryCheckOperator(
+    row_count_check = LabelledBigQueryCheckOperator(
         task_id="amazon_row_count_check",
-        sql=f"SELECT COUNT(1) FROM `{project}.{dataset}.raw_amazon_catalog` WHERE DATE(ingested_at) = DATE('{{{{ ds }}}}')",
+        sql=(
+            f"SELECT COUNT(1) > 0 AND COUNT(1) >= {expected_rows_template('fetch_amazon_products', 'raw_amazon_catalog')} "
+            f"FROM `{project}.{dataset}.raw_amazon_catalog` WHERE DATE(ingested_at) = DATE('{{{{ ds }}}}')"
+        ),
         use_legacy_sql=False,
+        labels=bigquery_job_labels(AMAZON_DAG.dag_id, "amazon_row_count_check"),
         location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
         trigger_rule=TriggerRule.NONE_FAILED_MIN_ONE_SUCCESS,
     )
 
+    record_loaded = PythonOperator(
+        task_id="record_catalog_content_loaded",
+        python_callable=record_loaded_content,
+        op_kwargs={
+            "table_name": "raw_amazon_catalog",
+            "stage_task_id": "fetch_amazon_products",
+            "load_task_id": "insert_amazon_raw",
+        },
+    )
+
+    collect_job_stats = PythonOperator(
+        task_id="collect_bigquery_job_stats",
+        python_callable=collect_bigquery_job_stats,
+        trigger_rule=TriggerRule.ALL_DONE,
+    )
+
     create_table >> skip_if_loaded
-    skip_if_loaded >> fetch_catalog >> upload_to_gcs >> insert_into_raw >> row_count_check
+    skip_if_loaded >> wait_for_api >> fetch_catalog >> skip_if_unchanged >> upload_to_gcs >> insert_into_raw >> row_count_check
+    row_count_check >> record_loaded >> collect_job_stats
@@ -11,7 +11,6 @@ import pandas as pd
 import hashlib
 import json
 import logging
-import uuid
 from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Dict, List
@@ -20,17 +19,20 @@ import pendulum
 import requests
 from airflow import DAG
 from airflow.models import Variable
-from airflow.providers.standard.operators.python import PythonOperator
-from airflow.providers.google.cloud.operators.bigquery import (
-    BigQueryCheckOperator,
-    BigQueryInsertJobOperator,
-)
-from airflow.providers.google.cloud.transfers.local_to_gcs import LocalFilesystemToGCSOperator
+from airflow.providers.standard.operators.python import PythonOperator, ShortCircuitOperator
+from airflow.providers.google.cloud.operators.bigquery import BigQueryInsertJobOperator
 from airflow.utils.trigger_rule import TriggerRule
 
+from api_readiness import ApiReadySensor, api_readiness_poll_seconds, api_readiness_timeout_seconds
+from checkpoints import checkpointed_stage
+from cleaning import bulk_uuid4
+from coalesce import should_load_per_run
 from common import (
     DAG_USER_AGENT,
     DEFAULT_ARGS,
+    LabelledBigQueryCheckOperator,
+    api_accept_header,
+    bigquery_job_labels,
     get_bq_dataset,
     get_bq_location,
     get_gcp_project,
@@ -38,14 +40,26 @@ from common import (
     ingestion_ts_from_context,
     json_default,
     load_table_ddl,
+    read_columnar_response,
     render_json_template,
+    use_deferrable_operators,
+    validate_for_staging,
 )
+from job_stats import collect_bigquery_job_stats
+from latency import record_ingestion_latency, record_stage_latency
+from manifest import upload_staged_file
+from telemetry import current_telemetry, expected_rows_template, instrumented_task
 
 LOGGER = logging.getLogger(__name__)
 
+ORDER_API_DEFAULT_URL = "http://host.docker.internal:8000/orders"
+
 AMAZON_GCS_TEMPLATE = (
     "datasets/source/amazon_orders/dt={date}/hr={hour}/amazon_orders_{timestamp}.json"
 )
+AMAZON_ITEM_GCS_TEMPLATE = (
+    "datasets/source/amazon_order_items/dt={date}/hr={hour}/amazon_order_items_{timestamp}.json"
+)
 
 AMAZON_SCHEMA: List[Dict[str, str]] = [
     {"name": "ingested_at", "type": "TIMESTAMP", "mode": "NULLABLE"},
@@ -68,6 +82,44 @@ AMAZON_SCHEMA: List[Dict[str, str]] = [
     {"name": "ingestion_uuid", "type": "STRING", "mode": "NULLABLE"},
 ]
 
+AMAZON_ITEM_SCHEMA: List[Dict[str, str]] = [
+    {"name": "ingested_at", "type": "TIMESTAMP", "mode": "NULLABLE"},
+    {"name": "order_date", "type": "DATE", "mode": "NULLABLE"},
+    {"name": "order_item_id", "type": "STRING", "mode": "REQUIRED"},
+    {"name": "amazon_order_id", "type": "STRING", "mode": "REQUIRED"},
+    {"name": "asin", "type": "STRING", "mode": "NULLABLE"},
+    {"name": "seller_sku", "type": "STRING", "mode": "NULLABLE"},
+    {"name": "quantity_ordered", "type": "INT64", "mode": "NULLABLE"},
+    {"name": "item_price_amount", "type": "NUMERIC", "mode": "NULLABLE"},
+    {"name": "tax_amount", "type": "NUMERIC", "mode": "NULLABLE"},
+    {"name": "load_at", "type": "TIMESTAMP", "mode": "NULLABLE"},
+    {"name": "load_id", "type": "STRING", "mode": "NULLABLE"},
+    {"name": "source_file", "type": "STRING", "mode": "NULLABLE"},
+    {"name": "source_ts", "type": "TIMESTAMP", "mode": "NULLABLE"},
+    {"name": "ingestion_uuid", "type": "STRING", "mode": "NULLABLE"},
+]
+
+
+ORDER_HEADER_COLUMNS: List[str] = [
+    "order_id",
+    "customer_id",
+    "created_at",
+    "processed_at",
+    "currency",
+    "total_price",
+    "is_b2b",
+]
+
+ORDER_ITEM_COLUMNS: List[str] = [
+    "order_id",
+    "created_at",
+    "order_item_id",
+    "product_id",
+    "SKU",
+    "quantity",
+    "price",
+]
+
 
 def _format_timestamp_parts(context: Dict[str, Any]) -> Dict[str, str]:
     data_interval_start = context.get("data_interval_start")
@@ -86,23 +138,64 @@ def _format_timestamp_parts(context: Dict[str, Any]) -> Dict[str, str]:
     }
 
 
+def _with_interval_window(query_params: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    """Ask for the orders of the run's data interval, so backfills get that hour's data."""
+    interval_start = context.get("data_interval_start")
+    interval_end = context.get("data_interval_end")
+    if interval_start is None or interval_end is None or interval_end <= interval_start:
+        return query_params
+    if {"as_of", "start", "end", "cursor"} & query_params.keys():
+        return query_params
+    return {**query_params, "start": interval_start.isoformat(), "end": interval_end.isoformat()}
+
+
+def _clean_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+    for record in frame.to_dict(orient="records"):
+        cleaned: Dict[str, Any] = {}
+        for key, value in record.items():
+            if value is None:
+                cleaned[key] = None
+            elif isinstance(value, float) and pd.isna(value):
+                cleaned[key] = None
+            elif pd.isna(value):
+                cleaned[key] = None
+            else:
+                cleaned[key] = value
+        records.append(cleaned)
+    return records
+
+
+def _write_ndjson(records: List[Dict[str, Any]], local_path: Path) -> None:
+    with local_path.open("w", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, default=json_default))
+            handle.write("\n")
+
+
+@instrumented_task
+@checkpointed_stage({"local_path": "raw_amazon_order", "items_local_path": "raw_amazon_order_item"})
 def fetch_amazon_orders(**context: Dict[str, Any]) -> Dict[str, str]:
+    """Fetch /orders once and stage both raw_amazon_order and raw_amazon_order_item."""
+    telemetry = current_telemetry()
     timestamp_parts = _format_timestamp_parts(context)
 
     bucket = get_raw_bucket()
     output_dir = Path(Variable.get("amazon_json_output_dir", default_var="/opt/airflow/data/amazon")).expanduser()
     output_dir.mkdir(parents=True, exist_ok=True)
     local_path = output_dir / f"amazon_orders_{timestamp_parts['timestamp']}.json"
+    items_local_path = output_dir / f"amazon_order_items_{timestamp_parts['timestamp']}.json"
     gcs_object = AMAZON_GCS_TEMPLATE.format(**timestamp_parts)
+    items_gcs_object = AMAZON_ITEM_GCS_TEMPLATE.format(**timestamp_parts)
 
-    def get_orders_set() -> pd.DataFrame:
-        api_url = Variable.get("amazon_order_api_endpoint_path", default_var="http://host.docker.internal:8000/orders")
+    def get_order_rows() -> pd.DataFrame:
+        api_url = Variable.get("amazon_order_api_endpoint_path", default_var=ORDER_API_DEFAULT_URL)
         params_template = Variable.get("amazon_order_api_query_params", default_var="{}")
-        query_params = render_json_template(params_template, context)
+        query_params = _with_interval_window(render_json_template(params_template, context), context)
         timeout_seconds = int(Variable.get("amazon_api_timeout_seconds", default_var="30"))
 
         headers = {
-            "Accept": "application/json",
+            "Accept": api_accept_header(),
             "dag_user_agent": context["dag"].dag_id,
             "User-Agent": DAG_USER_AGENT,
         }
@@ -115,43 +208,25 @@ def fetch_amazon_orders(**context: Dict[str, Any]) -> Dict[str, str]:
         if response.status_code >= 400:
             raise RuntimeError(f"Amazon API responded with status {response.status_code}")
 
-        try:
-            payload = response.json()
-        except json.JSONDecodeError as exc:
-            raise ValueError("Amazon API returned invalid JSON") from exc
-
-        data_rows = payload.get("data") or []
-        if not isinstance(data_rows, list):
-            raise ValueError("Amazon API payload 'data' should be a list")
-        if not data_rows:
+        rows_df = read_columnar_response(response.content, response.headers.get("Content-Type", ""))
+        if rows_df is None:
+            try:
+                payload = response.json()
+            except json.JSONDecodeError as exc:
+                raise ValueError("Amazon API returned invalid JSON") from exc
+
+            data_rows = payload.get("data") or []
+            if not isinstance(data_rows, list):
+                raise ValueError("Amazon API payload 'data' should be a list")
+            rows_df = pd.DataFrame(data_rows)
+        if rows_df.empty:
             raise ValueError("Amazon API returned no order rows")
 
-        metadata = payload.get("metadata") or {}
-        required_columns = [
-            "order_id",
-            "customer_id",
-            "created_at",
-            "processed_at",
-            "currency",
-            "total_price",
-            "is_b2b"
-        ]
-        orders_df = pd.DataFrame(data_rows)[required_columns].drop_duplicates()
-        
-
-
-        if orders_df.empty:
-            raise ValueError("Amazon API returned no usable order rows")
-
-        for column in required_columns:
-            if column not in orders_df.columns:
-                orders_df[column] = None
-    
-        orders_df['created_at'] = pd.to_datetime(orders_df['created_at']).dt.date
-    
-        return orders_df
-
-    
+        for column in ORDER_HEADER_COLUMNS + ORDER_ITEM_COLUMNS:
+            if column not in rows_df.columns:
+                rows_df[column] = None
+        rows_df["created_at"] = pd.to_datetime(rows_df["created_at"]).dt.date
+        return rows_df
 
     seeds_root = DAGS_ROOT.parent / "dbt" / "hitex-case-study" / "seeds"
 
@@ -164,24 +239,32 @@ def fetch_amazon_orders(**context: Dict[str, Any]) -> Dict[str, str]:
 
     customers_df = load_seed_df("customer.csv")[["customer_id", "first_name", "last_name", "email" ,"address_json"]]
     accounts_df = load_seed_df("accounts.csv")[["account_id", "company_name", "company_email" ,"company_address"]]
-    orders_df = get_orders_set()
+    products_df = load_seed_df("products.csv")[["product_id", "asin"]].drop_duplicates("product_id")
+
+    # One HTTP call and one parse feed both the header and the line-item datasets.
+    telemetry.lap("load_seeds")
+    rows_df = get_order_rows()
+    telemetry.record_input(len(rows_df))
+    telemetry.lap("fetch")
+    orders_df = rows_df[ORDER_HEADER_COLUMNS].drop_duplicates()
+    if orders_df.empty:
+        raise ValueError("Amazon API returned no usable order rows")
+    items_df = rows_df[ORDER_ITEM_COLUMNS].drop_duplicates("order_item_id")
 
     ingested_at_iso = ingestion_ts_from_context(context)
     load_at_iso = datetime.now(timezone.utc).isoformat()
     load_id = hashlib.sha256(gcs_object.encode("utf-8")).hexdigest()
+    items_load_id = hashlib.sha256(items_gcs_object.encode("utf-8")).hexdigest()
     source_uri = f"gs://{bucket}/{gcs_object}"
+    items_source_uri = f"gs://{bucket}/{items_gcs_object}"
     source_ts_value = load_at_iso
 
-    
-
-
     merged = (
         orders_df
         .merge(customers_df, on="customer_id", how="left")
         .merge(accounts_df, left_on="customer_id", right_on="account_id", how="left")
     )
 
-    
     result_df = pd.DataFrame({
         "amazon_order_id": merged["order_id"],
         "purchase_date": merged["created_at"],
@@ -200,76 +283,76 @@ def fetch_amazon_orders(**context: Dict[str, Any]) -> Dict[str, str]:
         "is_b2b": merged["is_b2b"]
     }).assign(
         ingested_at=ingested_at_iso,
-        load_at=datetime.now(timezone.utc).isoformat(),
+        load_at=load_at_iso,
         load_id=load_id,
         source_file=source_uri,
         source_ts=source_ts_value,
-        ingestion_uuid=[str(uuid.uuid4()) for _ in range(len(merged))]
+        ingestion_uuid=bulk_uuid4(len(merged))
     )
 
-    
-
-    
-
-    output_columns = [
-        "ingested_at",
-        "amazon_order_id",
-        "purchase_date",
-        "last_update_date",
-        "order_status",
-        "fulfillment_channel",
-        "sales_channel",
-        "buyer_name",
-        "buyer_email",
-        "shipping_address_json",
-        "currency",
-        "order_total",
-        "is_b2b",
-        "load_at",
-        "load_id",
-        "source_file",
-        "source_ts",
-        "ingestion_uuid",
-    ]
-    aggregated = result_df[output_columns]
+    items_merged = items_df.merge(products_df, on="product_id", how="left")
+    items_result_df = pd.DataFrame({
+        "order_date": items_merged["created_at"],
+        "order_item_id": items_merged["order_item_id"],
+        "amazon_order_id": items_merged["order_id"],
+        "asin": items_merged["asin"],
+        "seller_sku": items_merged["SKU"],
+        "quantity_ordered": pd.to_numeric(items_merged["quantity"]).astype("Int64"),
+        "item_price_amount": items_merged["price"],
+        "tax_amount": None,
+    }).assign(
+        ingested_at=ingested_at_iso,
+        load_at=load_at_iso,
+        load_id=items_load_id,
+        source_file=items_source_uri,
+        source_ts=source_ts_value,
+        ingestion_uuid=bulk_uuid4(len(items_merged))
+    )
 
-    records: List[Dict[str, Any]] = []
-    for record in aggregated.to_dict(orient="records"):
-        cleaned: Dict[str, Any] = {}
-        for key, value in record.items():
-            if value is None:
-                cleaned[key] = None
-            elif isinstance(value, float) and pd.isna(value):
-                cleaned[key] = None
-            elif pd.isna(value):
-                cleaned[key] = None
-            else:
-                cleaned[key] = value
-        records.append(cleaned)
+    result_df = validate_for_staging(
+        result_df[[field["name"] for field in AMAZON_SCHEMA]], "raw_amazon_order", local_path
+    )
+    # Items of quarantined orders would be orphans in raw_amazon_order_item.
+    orphaned = ~items_result_df["amazon_order_id"].isin(result_df["amazon_order_id"])
+    if orphaned.any():
+        LOGGER.warning("Dropping %s items of quarantined orders", int(orphaned.sum()))
+        items_result_df = items_result_df[~orphaned]
+    items_result_df = validate_for_staging(
+        items_result_df[[field["name"] for field in AMAZON_ITEM_SCHEMA]], "raw_amazon_order_item", items_local_path
+    )
+    telemetry.lap("enrich")
+    records = _clean_records(result_df)
+    item_records = _clean_records(items_result_df)
 
     LOGGER.info(
-        "Constructed %s Amazon orders from %s API records with CSV enrichment",
+        "Constructed %s Amazon orders and %s order items from %s API records with CSV enrichment",
         len(records),
-        orders_df.count(),
+        len(item_records),
+        len(rows_df),
     )
 
-    with local_path.open("w", encoding="utf-8") as handle:
-        for order in records:
-            handle.write(json.dumps(order, default=json_default))
-            handle.write("\n")
+    _write_ndjson(records, local_path)
+    _write_ndjson(item_records, items_local_path)
+    telemetry.lap("serialize")
+    record_stage_latency("raw_amazon_order", result_df["last_update_date"], "last_update_date")
+    telemetry.record_output("raw_amazon_order", len(records), local_path)
+    telemetry.record_output("raw_amazon_order_item", len(item_records), items_local_path)
 
     LOGGER.info("Persisted %s Amazon order records to %s", len(records), local_path)
+    LOGGER.info("Persisted %s Amazon order item records to %s", len(item_records), items_local_path)
 
     return {
         "local_path": str(local_path),
         "gcs_object": gcs_object,
         "load_id": load_id,
+        "items_local_path": str(items_local_path),
+        "items_gcs_object": items_gcs_object,
+        "items_load_id": items_load_id,
         "ingested_at": ingested_at_iso,
     }
 
 
 
-
 with DAG(
     dag_id="raw_amazon_order_ingestion",
     default_args=DEFAULT_ARGS,
@@ -283,7 +366,7 @@ with DAG(
     project = get_gcp_project()
     dataset = get_bq_dataset()
     location = get_bq_location()
-    bucket = get_raw_bucket()
+    deferrable = use_deferrable_operators()
 
     create_table = BigQueryInsertJobOperator(
         task_id="create_amazon_table",
@@ -294,9 +377,30 @@ with DAG(
             }
         },
         location=location,
+        deferrable=deferrable,
+        gcp_conn_id="google_cloud_default",
+    )
+
+    create_item_table = BigQueryInsertJobOperator(
+        task_id="create_amazon_item_table",
+        configuration={
+            "query": {
+                "query": load_table_ddl("raw_amazon_order_item", project, dataset),
+                "useLegacySql": False,
+            }
+        },
+        location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
     )
 
+    wait_for_api = ApiReadySensor(
+        task_id="wait_for_order_api",
+        endpoint_url=f"{{{{ var.value.get('amazon_order_api_endpoint_path', '{ORDER_API_DEFAULT_URL}') }}}}",
+        poke_interval=api_readiness_poll_seconds(),
+        timeout=api_readiness_timeout_seconds(),
+        deferrable=deferrable,
+    )
 
     fetch_orders = PythonOperator(
         task_id="fetch_amazon_orders",
@@ -304,22 +408,42 @@ with DAG(
         do_xcom_push=True,
     )
 
-    upload_to_gcs = LocalFilesystemToGCSOperator(
+    upload_to_gcs = PythonOperator(
         task_id="upload_amazon_to_gcs",
-        gcp_conn_id="google_cloud_default",
-        src="{{ ti.xcom_pull(task_ids='fetch_amazon_orders')['local_path'] }}",
-        dst="{{ ti.xcom_pull(task_ids='fetch_amazon_orders')['gcs_object'] }}",
-        bucket=bucket,
-        mime_type="application/json",
+        python_callable=upload_staged_file,
+        op_kwargs={
+            "table_name": "raw_amazon_order",
+            "stage_task_id": "fetch_amazon_orders",
+            "mime_type": "application/json",
+        },
+    )
+
+    upload_items_to_gcs = PythonOperator(
+        task_id="upload_amazon_items_to_gcs",
+        python_callable=upload_staged_file,
+        op_kwargs={
+            "table_name": "raw_amazon_order_item",
+            "stage_task_id": "fetch_amazon_orders",
+            "mime_type": "application/json",
+            "path_key": "items_local_path",
+            "object_key": "items_gcs_object",
+        },
+    )
+
+    skip_if_coalesced = ShortCircuitOperator(
+        task_id="skip_amazon_load_if_coalesced",
+        python_callable=should_load_per_run,
+        ignore_downstream_trigger_rules=False,
     )
 
     insert_into_raw = BigQueryInsertJobOperator(
         task_id="insert_amazon_raw",
         location=location,
+        deferrable=deferrable,
         configuration={
             "load": {
                 "sourceUris": [
-                    f"gs://{bucket}/{{{{ ti.xcom_pull(task_ids='fetch_amazon_orders')['gcs_object'] }}}}"
+                    "{{ ti.xcom_pull(task_ids='upload_amazon_to_gcs')['source_uri'] }}"
                 ],
                 "destinationTable": {
                     "projectId": project,
@@ -337,13 +461,78 @@ with DAG(
         gcp_conn_id="google_cloud_default",
     )
 
-    row_count_check = BigQueryCheckOperator(
+    insert_items_into_raw = BigQueryInsertJobOperator(
+        task_id="insert_amazon_item_raw",
+        location=location,
+        deferrable=deferrable,
+        configuration={
+            "load": {
+                "sourceUris": [
+                    "{{ ti.xcom_pull(task_ids='upload_amazon_items_to_gcs')['source_uri'] }}"
+                ],
+                "destinationTable": {
+                    "projectId": project,
+                    "datasetId": dataset,
+                    "tableId": "raw_amazon_order_item",
+                },
+                "sourceFormat": "NEWLINE_DELIMITED_JSON",
+                "writeDisposition": "WRITE_APPEND",
+                "createDisposition": "CREATE_NEVER",
+                "schemaUpdateOptions": ["ALLOW_FIELD_ADDITION", "ALLOW_FIELD_RELAXATION"],
+                "ignoreUnknownValues": True,
+                "maxBadRecords": 0,
+            }
+        },
+        gcp_conn_id="google_cloud_default",
+    )
+
+    row_count_check = LabelledBigQueryCheckOperator(
         task_id="amazon_row_count_check",
-        sql=f"SELECT COUNT(1) FROM `{project}.{dataset}.raw_amazon_order` WHERE DATE(ingested_at) = DATE('{{{{ ds }}}}')",
+        # The partition must hold at least the rows this run staged, as recorded in the fetch telemetry.
+        sql=(
+            f"SELECT COUNT(1) > 0 AND COUNT(1) >= {expected_rows_template('fetch_amazon_orders', 'raw_amazon_order')} "
+            f"FROM `{project}.{dataset}.raw_amazon_order` WHERE DATE(ingested_at) = DATE('{{{{ ds }}}}')"
+        ),
         use_legacy_sql=False,
+        labels=bigquery_job_labels(AMAZON_DAG.dag_id, "amazon_row_count_check"),
         location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
         trigger_rule=TriggerRule.NONE_FAILED_MIN_ONE_SUCCESS,
     )
 
-    [ create_table >> fetch_orders ] >> upload_to_gcs >> insert_into_raw >> row_count_check
+    item_row_count_check = LabelledBigQueryCheckOperator(
+        task_id="amazon_item_row_count_check",
+        sql=(
+            f"SELECT COUNT(1) > 0 AND COUNT(1) >= {expected_rows_template('fetch_amazon_orders', 'raw_amazon_order_item')} "
+            f"FROM `{project}.{dataset}.raw_amazon_order_item` WHERE DATE(ingested_at) = DATE('{{{{ ds }}}}')"
+        ),
+        use_legacy_sql=False,
+        labels=bigquery_job_labels(AMAZON_DAG.dag_id, "amazon_item_row_count_check"),
+        location=location,
+        deferrable=deferrable,
+        gcp_conn_id="google_cloud_default",
+        trigger_rule=TriggerRule.NONE_FAILED_MIN_ONE_SUCCESS,
+    )
+
+    record_latency = PythonOperator(
+        task_id="record_amazon_order_latency",
+        python_callable=record_ingestion_latency,
+        op_kwargs={
+            "table_name": "raw_amazon_order",
+            "stage_task_id": "fetch_amazon_orders",
+            "load_task_id": "insert_amazon_raw",
+        },
+    )
+
+    collect_job_stats = PythonOperator(
+        task_id="collect_bigquery_job_stats",
+        python_callable=collect_bigquery_job_stats,
+        trigger_rule=TriggerRule.ALL_DONE,
+    )
+
+    [create_table, create_item_table, wait_for_api] >> fetch_orders >> [upload_to_gcs, upload_items_to_gcs]
+    [upload_to_gcs, upload_items_to_gcs] >> skip_if_coalesced >> [insert_into_raw, insert_items_into_raw]
+    insert_into_raw >> [row_count_check, record_latency]
+    insert_items_into_raw >> item_row_count_check
+    [row_count_check, item_row_count_check, record_latency] >> collect_job_stats
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+DAGS_ROOT = Path(__file__).resolve().parent
+if str(DAGS_ROOT) not in sys.path:
+    sys.path.append(str(DAGS_ROOT))
+
+import logging
+
+import pendulum
+from airflow import DAG
+from airflow.models import Variable
+from airflow.providers.standard.operators.python import PythonOperator
+from airflow.utils.trigger_rule import TriggerRule
+
+from coalesce import COALESCE_TARGETS, coalesce_table_window
+from common import DEFAULT_ARGS
+from job_stats import collect_bigquery_job_stats
+
+LOGGER = logging.getLogger(__name__)
+
+COALESCE_SCHEDULE = Variable.get("coalesce_schedule", default_var="0 */6 * * *")
+
+
+with DAG(
+    dag_id="raw_coalesced_load",
+    default_args=DEFAULT_ARGS,
+    start_date=pendulum.datetime(2025, 1, 1, tz="UTC"),
+    schedule=COALESCE_SCHEDULE,
+    # Missed runs are not lost: each run resumes from the high-water mark in the covered index.
+    catchup=False,
+    max_active_runs=1,
+    tags=["raw", "coalesce"],
+    render_template_as_native_obj=True,
+) as COALESCE_DAG:
+    coalesce_tasks = [
+        PythonOperator(
+            task_id=f"coalesce_{target.table_name}",
+            python_callable=coalesce_table_window,
+            op_kwargs={"table_name": target.table_name},
+            do_xcom_push=True,
+        )
+        for target in COALESCE_TARGETS
+    ]
+
+    collect_job_stats = PythonOperator(
+        task_id="collect_bigquery_job_stats",
+        python_callable=collect_bigquery_job_stats,
+        trigger_rule=TriggerRule.ALL_DONE,
+    )
+
+    coalesce_tasks >> collect_job_stats
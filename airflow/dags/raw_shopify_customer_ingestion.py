@@ -9,32 +9,40 @@ if str(DAGS_ROOT) not in sys.path:
 
 import hashlib
 import logging
-import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict
 
 import pandas as pd
 import pendulum
+import pyarrow as pa
 from airflow import DAG
 from airflow.models import Variable
-from airflow.providers.google.cloud.operators.bigquery import (
-    BigQueryCheckOperator,
-    BigQueryInsertJobOperator,
-)
-from airflow.providers.google.cloud.transfers.local_to_gcs import LocalFilesystemToGCSOperator
+from airflow.providers.google.cloud.operators.bigquery import BigQueryInsertJobOperator
 from airflow.providers.standard.operators.bash import BashOperator
-from airflow.providers.standard.operators.python import PythonOperator
+from airflow.providers.standard.operators.python import PythonOperator, ShortCircuitOperator
 from airflow.utils.trigger_rule import TriggerRule
 
+from checkpoints import bash_checkpoint_env, bash_restore_checkpoint, bash_save_checkpoint, checkpointed_stage
+from coalesce import should_load_per_run
+from cleaning import bulk_uuid4, clean_string, normalize_verified_email
 from common import (
     DEFAULT_ARGS,
+    LabelledBigQueryCheckOperator,
+    bigquery_job_labels,
     get_bq_dataset,
     get_bq_location,
     get_gcp_project,
     get_raw_bucket,
     ingestion_ts_from_context,
     load_table_ddl,
+    use_deferrable_operators,
+    validate_for_staging,
 )
+from ddl_schema import ISO_TIMESTAMP_FORMAT, csv_column_types, read_typed_csv
+from job_stats import collect_bigquery_job_stats
+from latency import record_ingestion_latency, record_stage_latency
+from manifest import upload_staged_file
+from telemetry import current_telemetry, expected_rows_template, instrumented_task
 
 LOGGER = logging.getLogger(__name__)
 
@@ -79,19 +87,10 @@ def _format_timestamp_parts(context: Dict[str, Any]) -> Dict[str, str]:
     }
 
 
-def _normalize_verified_email(series: pd.Series) -> pd.Series:
-    as_str = series.fillna("").astype(str).str.strip().str.lower()
-    truthy = {"true", "1", "yes", "y", "t"}
-    return as_str.apply(lambda value: bool(value) and (value in truthy or "@" in value))
-
-
-def _clean_string(series: pd.Series) -> pd.Series:
-    cleaned = series.fillna("").astype(str).str.strip()
-    cleaned = cleaned.replace({"": None, "nan": None, "none": None})
-    return cleaned
-
-
+@instrumented_task
+@checkpointed_stage({"local_path": "raw_shopify_customer"})
 def prepare_shopify_customers(**context: Dict[str, Any]) -> Dict[str, str]:
+    telemetry = current_telemetry()
     ti = context["ti"]
     generated_path = Path(ti.xcom_pull(task_ids="generate_shopify_customers"))
     if not generated_path.exists():
@@ -110,12 +109,18 @@ def prepare_shopify_customers(**context: Dict[str, Any]) -> Dict[str, str]:
         "ingestion_uuid",
     }
 
-    df = pd.read_csv(generated_path)
+    # The generator writes free text into verified_email; it is normalised to BOOL below.
+    df = read_typed_csv(
+        generated_path,
+        csv_column_types("raw_shopify_customer", overrides={"verified_email": pa.string()}),
+    )
     missing = expected_columns.difference(df.columns)
     if missing:
         raise ValueError(f"Shopify customer CSV missing required columns: {sorted(missing)}")
     if df.empty:
         raise ValueError("Shopify customer generator returned no rows")
+    telemetry.record_input(len(df))
+    telemetry.lap("read")
 
     timestamp_parts = _format_timestamp_parts(context)
     gcs_object = SHOPIFY_CUSTOMER_GCS_TEMPLATE.format(**timestamp_parts)
@@ -127,23 +132,23 @@ def prepare_shopify_customers(**context: Dict[str, Any]) -> Dict[str, str]:
     load_at_iso = load_at_dt.isoformat()
     load_id = hashlib.sha256(gcs_object.encode("utf-8")).hexdigest()
 
-    verified_series = _normalize_verified_email(df["verified_email"])
-    source_ts_series = pd.to_datetime(df["source_ts"], errors="coerce", utc=True)
+    verified_series = normalize_verified_email(df["verified_email"])
+    source_ts_series = pd.to_datetime(df["source_ts"], format=ISO_TIMESTAMP_FORMAT, errors="coerce", utc=True)
     source_ts_series = source_ts_series.fillna(pd.Timestamp(load_at_dt))
 
     processed = pd.DataFrame(
         {
             "ingested_at": ingested_at_iso,
-            "id": _clean_string(df["id"]),
-            "email": _clean_string(df["email"]),
+            "id": clean_string(df["id"]),
+            "email": clean_string(df["email"]),
             "verified_email": verified_series,
-            "addresses_json": _clean_string(df["addresses_json"]),
+            "addresses_json": clean_string(df["addresses_json"]),
             "load_at": load_at_iso,
             "load_id": load_id,
-            "session_id": _clean_string(df["session_id"]),
+            "session_id": clean_string(df["session_id"]),
             "source_file": source_uri,
             "source_ts": source_ts_series.astype(str),
-            "ingestion_uuid": [str(uuid.uuid4()) for _ in range(len(df))],
+            "ingestion_uuid": bulk_uuid4(len(df)),
         }
     )
 
@@ -163,8 +168,13 @@ def prepare_shopify_customers(**context: Dict[str, Any]) -> Dict[str, str]:
     processed = processed[column_order]
 
     processed_path = SHOPIFY_OUTPUT_DIR / f"shopify_customers_{timestamp_parts['timestamp']}.csv"
+    processed = validate_for_staging(processed, "raw_shopify_customer", processed_path)
+    telemetry.lap("transform")
     processed_path.parent.mkdir(parents=True, exist_ok=True)
     processed.to_csv(processed_path, index=False)
+    telemetry.lap("write")
+    telemetry.record_output("raw_shopify_customer", len(processed), processed_path)
+    record_stage_latency("raw_shopify_customer", processed["source_ts"], "source_ts")
 
     LOGGER.info(
         "Prepared %s Shopify customer records at %s (original: %s)",
@@ -194,7 +204,7 @@ with DAG(
     project = get_gcp_project()
     dataset = get_bq_dataset()
     location = get_bq_location()
-    bucket = get_raw_bucket()
+    deferrable = use_deferrable_operators()
 
     create_table = BigQueryInsertJobOperator(
         task_id="create_shopify_customer_table",
@@ -205,6 +215,7 @@ with DAG(
             }
         },
         location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
     )
 
@@ -213,7 +224,8 @@ with DAG(
         do_xcom_push=True,
         bash_command=(
             "set -euo pipefail\n"
-            "OUTPUT_DIR=\"{{ params.output_dir }}\"\n"
+            + bash_restore_checkpoint("{{ params.python_bin }}")
+            + "OUTPUT_DIR=\"{{ params.output_dir }}\"\n"
             "mkdir -p \"$OUTPUT_DIR\"\n"
             "{{ params.python_bin }} {{ params.script_path }} "
             "--seeds-dir {{ params.seed_dir }} "
@@ -224,8 +236,11 @@ with DAG(
             "  echo \"No Shopify customer CSV produced\" >&2\n"
             "  exit 1\n"
             "fi\n"
-            "echo \"$GENERATED_FILE\"\n"
+            + bash_save_checkpoint("{{ params.python_bin }}", "\"$GENERATED_FILE\"")
+            + "echo \"$GENERATED_FILE\"\n"
         ),
+        env=bash_checkpoint_env(),
+        append_env=True,
         params={
             "script_path": str(SHOPIFY_CUSTOMER_SCRIPT),
             "seed_dir": str(SHOPIFY_SEED_DIR),
@@ -240,22 +255,30 @@ with DAG(
         python_callable=prepare_shopify_customers,
     )
 
-    upload_to_gcs = LocalFilesystemToGCSOperator(
+    upload_to_gcs = PythonOperator(
         task_id="upload_shopify_customers_to_gcs",
-        gcp_conn_id="google_cloud_default",
-        src="{{ ti.xcom_pull(task_ids='prepare_shopify_customers')['local_path'] }}",
-        dst="{{ ti.xcom_pull(task_ids='prepare_shopify_customers')['gcs_object'] }}",
-        bucket=bucket,
-        mime_type="text/csv",
+        python_callable=upload_staged_file,
+        op_kwargs={
+            "table_name": "raw_shopify_customer",
+            "stage_task_id": "prepare_shopify_customers",
+            "mime_type": "text/csv",
+        },
+    )
+
+    skip_if_coalesced = ShortCircuitOperator(
+        task_id="skip_shopify_customer_load_if_coalesced",
+        python_callable=should_load_per_run,
+        ignore_downstream_trigger_rules=False,
     )
 
     insert_into_raw = BigQueryInsertJobOperator(
         task_id="load_shopify_customer_raw",
         location=location,
+        deferrable=deferrable,
         configuration={
             "load": {
                 "sourceUris": [
-                    f"gs://{bucket}/{{{{ ti.xcom_pull(task_ids='prepare_shopify_customers')['gcs_object'] }}}}"
+                    "{{ ti.xcom_pull(task_ids='upload_shopify_customers_to_gcs')['source_uri'] }}"
                 ],
                 "destinationTable": {
                     "projectId": project,
@@ -278,16 +301,38 @@ with DAG(
         gcp_conn_id="google_cloud_default",
     )
 
-    row_count_check = BigQueryCheckOperator(
+    row_count_check = LabelledBigQueryCheckOperator(
         task_id="shopify_customer_row_count_check",
         sql=(
-            f"SELECT COUNT(1) FROM `{project}.{dataset}.raw_shopify_customer` "
+            f"SELECT COUNT(1) > 0 AND COUNT(1) >= "
+            f"{expected_rows_template('prepare_shopify_customers', 'raw_shopify_customer')} "
+            f"FROM `{project}.{dataset}.raw_shopify_customer` "
             "WHERE DATE(ingested_at) = DATE('{{ ds }}')"
         ),
         use_legacy_sql=False,
+        labels=bigquery_job_labels(SHOPIFY_CUSTOMER_DAG.dag_id, "shopify_customer_row_count_check"),
         location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
         trigger_rule=TriggerRule.NONE_FAILED_MIN_ONE_SUCCESS,
     )
 
-    [create_table >> generate_customers] >> prepare_customers >> upload_to_gcs >> insert_into_raw >> row_count_check
+    record_latency = PythonOperator(
+        task_id="record_shopify_customer_latency",
+        python_callable=record_ingestion_latency,
+        op_kwargs={
+            "table_name": "raw_shopify_customer",
+            "stage_task_id": "prepare_shopify_customers",
+            "load_task_id": "load_shopify_customer_raw",
+        },
+    )
+
+    collect_job_stats = PythonOperator(
+        task_id="collect_bigquery_job_stats",
+        python_callable=collect_bigquery_job_stats,
+        trigger_rule=TriggerRule.ALL_DONE,
+    )
+
+    [create_table >> generate_customers] >> prepare_customers >> upload_to_gcs >> skip_if_coalesced >> insert_into_raw >> row_count_check
+    insert_into_raw >> record_latency
+    [row_count_check, record_latency] >> collect_job_stats
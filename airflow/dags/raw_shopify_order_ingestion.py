@@ -9,38 +9,56 @@ if str(DAGS_ROOT) not in sys.path:
 
 import hashlib
 import logging
-import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import pandas as pd
 import pendulum
+import pyarrow as pa
 from airflow import DAG
 from airflow.models import Variable
-from airflow.providers.google.cloud.operators.bigquery import (
-    BigQueryCheckOperator,
-    BigQueryInsertJobOperator,
-)
-from airflow.providers.google.cloud.transfers.local_to_gcs import LocalFilesystemToGCSOperator
+from airflow.providers.google.cloud.operators.bigquery import BigQueryInsertJobOperator
 from airflow.providers.standard.operators.bash import BashOperator
-from airflow.providers.standard.operators.python import PythonOperator
+from airflow.providers.standard.operators.python import PythonOperator, ShortCircuitOperator
 from airflow.utils.trigger_rule import TriggerRule
 
+from checkpoints import bash_checkpoint_env, bash_restore_checkpoint, bash_save_checkpoint, checkpointed_stage
+from cleaning import bulk_uuid4
+from coalesce import should_load_per_run
 from common import (
     DEFAULT_ARGS,
+    LabelledBigQueryCheckOperator,
+    bigquery_job_labels,
+    get_bool_variable,
     get_bq_dataset,
     get_bq_location,
     get_gcp_project,
     get_raw_bucket,
     ingestion_ts_from_context,
     load_table_ddl,
+    use_deferrable_operators,
+    validate_for_staging,
+)
+from ddl_schema import (
+    ISO_TIMESTAMP_FORMAT,
+    csv_column_types,
+    iter_typed_csv,
+    read_csv_header,
+    read_typed_csv,
 )
+from job_stats import collect_bigquery_job_stats
+from latency import record_ingestion_latency, record_stage_latency
+from manifest import upload_staged_file
+from telemetry import current_telemetry, expected_rows_template, instrumented_task
 
 LOGGER = logging.getLogger(__name__)
 
 SHOPIFY_GCS_TEMPLATE = (
     "datasets/source/shopify_orders/dt={date}/hr={hour}/shopify_orders_{timestamp}.csv"
 )
+SHOPIFY_LINE_GCS_TEMPLATE = (
+    "datasets/source/shopify_order_lines/dt={date}/hr={hour}/shopify_order_lines_{timestamp}.csv"
+)
 SHOPIFY_MOCK_SCRIPT = DAGS_ROOT.parent / "Dataset_Generation" / "CSV" / "shopify_order.py"
 SHOPIFY_SEED_DIR = Path(
     Variable.get(
@@ -76,32 +94,56 @@ def _format_timestamp_parts(context: Dict[str, Any]) -> Dict[str, str]:
     }
 
 
-def prepare_shopify_orders(**context: Dict[str, Any]) -> Dict[str, str]:
-    ti = context["ti"]
-    generated_path = Path(ti.xcom_pull(task_ids="generate_shopify_orders"))
-    if not generated_path.exists():
-        raise FileNotFoundError(f"Generated Shopify CSV not found at {generated_path}")
-
-    required_columns = {
-        "order_id",
-        "created_at",
-        "processed_at",
-        "quantity",
-        "currency",
-        "total_price",
-        "customer_id",
-        "is_b2b",
+def _generator_column_types() -> Dict[str, pa.DataType]:
+    """Map the generator's line-level CSV columns onto the order/order-line DDL types."""
+    return {
+        **csv_column_types(
+            "raw_shopify_order",
+            {
+                "created_at": "created_at",
+                "processed_at": "processed_at",
+                "currency": "currency",
+                "total_price": "total_price",
+                "customer_id": "customer_id",
+            },
+        ),
+        **csv_column_types(
+            "raw_shopify_order_line",
+            {
+                "order_id": "order_id",
+                "order_item_id": "id",
+                "product_id": "product_id",
+                "SKU": "sku",
+                "quantity": "quantity",
+                "price": "price",
+            },
+        ),
+        # is_b2b only drives grouping and has no DDL column of its own.
+        "is_b2b": pa.bool_(),
     }
 
-    df = pd.read_csv(generated_path)
-    missing = required_columns.difference(df.columns)
-    if missing:
-        raise ValueError(f"Shopify CSV missing required columns: {sorted(missing)}")
-    if df.empty:
-        raise ValueError("Shopify generator returned no rows")
 
-    order_df = (
-        df.groupby(["order_id","created_at","processed_at","currency","customer_id","is_b2b"], as_index=False)
+ORDER_GROUP_KEYS = ["order_id", "created_at", "processed_at", "currency", "customer_id", "is_b2b"]
+
+REQUIRED_COLUMNS = {
+    "order_id",
+    "created_at",
+    "processed_at",
+    "order_item_id",
+    "product_id",
+    "SKU",
+    "quantity",
+    "price",
+    "currency",
+    "total_price",
+    "customer_id",
+    "is_b2b",
+}
+
+
+def _aggregate_orders(df: pd.DataFrame) -> pd.DataFrame:
+    return (
+        df.groupby(ORDER_GROUP_KEYS, as_index=False)
         .agg(
             product_count=("product_id", "nunique"),
             total_quantity=("quantity", "sum"),
@@ -109,27 +151,91 @@ def prepare_shopify_orders(**context: Dict[str, Any]) -> Dict[str, str]:
         )
     )
 
-    timestamp_parts = _format_timestamp_parts(context)
-    gcs_object = SHOPIFY_GCS_TEMPLATE.format(**timestamp_parts)
-    bucket = get_raw_bucket()
-    source_uri = f"gs://{bucket}/{gcs_object}"
 
-    ingested_at_iso = ingestion_ts_from_context(context)
-    load_at_iso = datetime.now(timezone.utc).isoformat()
-    load_id = hashlib.sha256(gcs_object.encode("utf-8")).hexdigest()
+_KEY_HASH = "_key_hash"
+_SUM_COLUMNS = ["total_quantity", "total_price"]
+
+
+class OrderKeyCollisionError(ValueError):
+    """Raised when two different order group keys hash to the same 64-bit value."""
+
+
+def _reduce_partials(frame: pd.DataFrame) -> pd.DataFrame:
+    """Sum rows sharing a key hash, checking that each row carries the keys of its group."""
+    grouped = frame.groupby(_KEY_HASH, sort=False)
+    reduced = grouped[ORDER_GROUP_KEYS].first().join(grouped[_SUM_COLUMNS].sum())
+    expected = reduced[ORDER_GROUP_KEYS].reindex(frame[_KEY_HASH].to_numpy()).to_numpy()
+    collided = (expected != frame[ORDER_GROUP_KEYS].to_numpy()).any(axis=1)
+    if collided.any():
+        raise OrderKeyCollisionError(
+            f"Order key hash collision between {frame.loc[collided, ORDER_GROUP_KEYS].iloc[0].tolist()} "
+            f"and {expected[collided][0].tolist()}"
+        )
+    return reduced.reset_index()
+
+
+class _ChunkedOrderAggregator:
+    """Merge per-chunk order aggregates keyed on a 64-bit hash of the group keys.
+
+    Only the sums feed the staged header, so per-chunk partials reduce to one row per
+    order and memory scales with the number of orders rather than the number of lines.
+    Partials are buffered and folded into the accumulator only once the buffer outgrows
+    it, so each order is re-grouped a bounded number of times rather than once per chunk.
+    The group keys travel with the hash and are compared on every merge.
+    """
+
+    def __init__(self) -> None:
+        self.merged = pd.DataFrame(columns=[_KEY_HASH, *ORDER_GROUP_KEYS, *_SUM_COLUMNS])
+        self.pending: List[pd.DataFrame] = []
+        self.pending_rows = 0
 
-    processed = pd.DataFrame(
+    def add(self, chunk: pd.DataFrame) -> None:
+        chunk = chunk.dropna(subset=ORDER_GROUP_KEYS)
+        if chunk.empty:
+            return
+        partial = chunk[ORDER_GROUP_KEYS + ["quantity", "total_price"]].rename(columns={"quantity": "total_quantity"})
+        partial.insert(0, _KEY_HASH, pd.util.hash_pandas_object(chunk[ORDER_GROUP_KEYS], index=False).to_numpy())
+        partial = _reduce_partials(partial)
+        self.pending.append(partial)
+        self.pending_rows += len(partial)
+        if self.pending_rows >= len(self.merged):
+            self._compact()
+
+    def _compact(self) -> None:
+        if not self.pending:
+            return
+        frames = [self.merged, *self.pending] if not self.merged.empty else self.pending
+        self.merged = _reduce_partials(pd.concat(frames, ignore_index=True))
+        self.pending, self.pending_rows = [], 0
+
+    def result(self) -> pd.DataFrame:
+        self._compact()
+        if self.merged.empty:
+            return pd.DataFrame(columns=ORDER_GROUP_KEYS + _SUM_COLUMNS)
+        # Sorting on the group keys reproduces the row order of the in-memory groupby.
+        return (
+            self.merged.drop(columns=_KEY_HASH)
+            .sort_values(ORDER_GROUP_KEYS, kind="mergesort")
+            .reset_index(drop=True)
+        )
+
+
+def _build_order_headers(
+    order_df: pd.DataFrame, ingested_at_iso: str, load_at_iso: str, load_id: str, source_uri: str
+) -> pd.DataFrame:
+    return pd.DataFrame(
         {
             "ingested_at": ingested_at_iso,
-            "id": order_df["order_id"].astype(str).str.strip(),
-            "created_at": pd.to_datetime(order_df["created_at"], errors="raise"),
-            "processed_at": pd.to_datetime(order_df["processed_at"], errors="raise"),
+            "id": order_df["order_id"].str.strip(),
+            "created_at": pd.to_datetime(order_df["created_at"], format=ISO_TIMESTAMP_FORMAT, errors="raise"),
+            "processed_at": pd.to_datetime(order_df["processed_at"], format=ISO_TIMESTAMP_FORMAT, errors="raise"),
             "financial_status" : "PAID",
             "fulfillment_status" : "Fulfilled",
-            "currency": order_df["currency"].astype(str).str.strip(),
-            "total_items": pd.to_numeric(order_df["total_quantity"], errors="raise"),
-            "total_price": pd.to_numeric(order_df["total_price"], errors="raise").round(2),
-            "customer_id": order_df["customer_id"].astype(str).str.strip(), 
+            "currency": order_df["currency"].str.strip(),
+            "total_items": order_df["total_quantity"],
+            # numpy rounding keeps the CSV repr identical to the pre-Arrow path
+            "total_price": order_df["total_price"].astype("float64").round(2),
+            "customer_id": order_df["customer_id"].str.strip(),
             "source_name": "Shopify",
             "utm_source" : "na",
             "utm_medium" : "na",
@@ -138,18 +244,133 @@ def prepare_shopify_orders(**context: Dict[str, Any]) -> Dict[str, str]:
             "load_id": load_id,
             "source_file": source_uri,
             "source_ts": load_at_iso,
-            "ingestion_uuid": [str(uuid.uuid4()) for _ in range(len(order_df))],
+            "ingestion_uuid": bulk_uuid4(len(order_df)),
         }
     )
 
+
+def _build_order_lines(
+    df: pd.DataFrame, ingested_at_iso: str, load_at_iso: str, load_id: str, source_uri: str
+) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ingested_at": ingested_at_iso,
+            "id": df["order_item_id"].str.strip(),
+            "order_id": df["order_id"].str.strip(),
+            "product_id": df["product_id"].str.strip(),
+            "variant_id": None,
+            "sku": df["SKU"].str.strip(),
+            "quantity": df["quantity"],
+            "price": df["price"].astype("float64").round(2),
+            "load_at": load_at_iso,
+            "load_id": load_id,
+            "source_file": source_uri,
+            "source_ts": load_at_iso,
+            "ingestion_uuid": bulk_uuid4(len(df)),
+        }
+    )
+
+
+@instrumented_task
+@checkpointed_stage({"local_path": "raw_shopify_order", "lines_local_path": "raw_shopify_order_line"})
+def prepare_shopify_orders(**context: Dict[str, Any]) -> Dict[str, str]:
+    """Read the generated line-level CSV once and emit order headers and order lines.
+
+    With the ``shopify_order_chunked_prepare`` Variable enabled the CSV is streamed in
+    ``shopify_order_chunk_bytes`` blocks: one pass aggregates the headers incrementally
+    and a second pass writes the lines of the orders that passed validation.
+    """
+    telemetry = current_telemetry()
+    ti = context["ti"]
+    generated_path = Path(ti.xcom_pull(task_ids="generate_shopify_orders"))
+    if not generated_path.exists():
+        raise FileNotFoundError(f"Generated Shopify CSV not found at {generated_path}")
+
+    missing = REQUIRED_COLUMNS.difference(read_csv_header(generated_path))
+    if missing:
+        raise ValueError(f"Shopify CSV missing required columns: {sorted(missing)}")
+
+    timestamp_parts = _format_timestamp_parts(context)
+    gcs_object = SHOPIFY_GCS_TEMPLATE.format(**timestamp_parts)
+    lines_gcs_object = SHOPIFY_LINE_GCS_TEMPLATE.format(**timestamp_parts)
+    bucket = get_raw_bucket()
+    source_uri = f"gs://{bucket}/{gcs_object}"
+    lines_source_uri = f"gs://{bucket}/{lines_gcs_object}"
+
+    ingested_at_iso = ingestion_ts_from_context(context)
+    load_at_iso = datetime.now(timezone.utc).isoformat()
+    load_id = hashlib.sha256(gcs_object.encode("utf-8")).hexdigest()
+    lines_load_id = hashlib.sha256(lines_gcs_object.encode("utf-8")).hexdigest()
+
     processed_path = SHOPIFY_OUTPUT_DIR / f"shopify_orders_{timestamp_parts['timestamp']}.csv"
+    lines_path = SHOPIFY_OUTPUT_DIR / f"shopify_order_lines_{timestamp_parts['timestamp']}.csv"
     processed_path.parent.mkdir(parents=True, exist_ok=True)
+
+    chunked = get_bool_variable("shopify_order_chunked_prepare", default=False)
+    if chunked:
+        chunk_bytes = int(Variable.get("shopify_order_chunk_bytes", default_var=str(64 << 20)))
+        aggregator = _ChunkedOrderAggregator()
+        for chunk in iter_typed_csv(generated_path, _generator_column_types(), block_size=chunk_bytes):
+            telemetry.lap("read")
+            telemetry.record_input(len(chunk))
+            aggregator.add(chunk)
+            telemetry.lap("transform")
+        order_df = aggregator.result()
+        if order_df.empty:
+            raise ValueError("Shopify generator returned no rows")
+    else:
+        df = read_typed_csv(generated_path, _generator_column_types())
+        if df.empty:
+            raise ValueError("Shopify generator returned no rows")
+        telemetry.record_input(len(df))
+        telemetry.lap("read")
+        order_df = _aggregate_orders(df)
+
+    # Headers are validated first so lines of quarantined orders are never staged.
+    processed = _build_order_headers(order_df, ingested_at_iso, load_at_iso, load_id, source_uri)
+    processed = validate_for_staging(processed, "raw_shopify_order", processed_path)
+    telemetry.lap("transform")
     processed.to_csv(processed_path, index=False)
+    telemetry.lap("write")
+    order_ids = processed["id"]
+
+    def staged_lines(frame: pd.DataFrame, append: bool) -> pd.DataFrame:
+        lines = _build_order_lines(frame, ingested_at_iso, load_at_iso, lines_load_id, lines_source_uri)
+        orphaned = ~lines["order_id"].isin(order_ids)
+        if orphaned.any():
+            LOGGER.warning("Dropping %s lines of quarantined orders", int(orphaned.sum()))
+            lines = lines[~orphaned]
+        return validate_for_staging(lines, "raw_shopify_order_line", lines_path, append=append)
+
+    if chunked:
+        # Second pass over the CSV: lines are filtered and appended one chunk at a time.
+        line_count = 0
+        for chunk_index, chunk in enumerate(
+            iter_typed_csv(generated_path, _generator_column_types(), block_size=chunk_bytes)
+        ):
+            telemetry.lap("read")
+            lines = staged_lines(chunk, append=chunk_index > 0)
+            telemetry.lap("transform")
+            lines.to_csv(lines_path, index=False, mode="a" if chunk_index else "w", header=chunk_index == 0)
+            line_count += len(lines)
+            telemetry.lap("write")
+    else:
+        lines = staged_lines(df, append=False)
+        telemetry.lap("transform")
+        lines.to_csv(lines_path, index=False)
+        line_count = len(lines)
+        telemetry.lap("write")
+
+    telemetry.record_output("raw_shopify_order", len(processed), processed_path)
+    record_stage_latency("raw_shopify_order", processed["processed_at"], "processed_at")
+    telemetry.record_output("raw_shopify_order_line", line_count, lines_path)
 
     LOGGER.info(
-        "Prepared %s Shopify order records at %s (original: %s)",
+        "Prepared %s Shopify order records at %s and %s order lines at %s (original: %s)",
         len(processed),
         processed_path,
+        line_count,
+        lines_path,
         generated_path,
     )
 
@@ -157,6 +378,9 @@ def prepare_shopify_orders(**context: Dict[str, Any]) -> Dict[str, str]:
         "local_path": str(processed_path),
         "gcs_object": gcs_object,
         "load_id": load_id,
+        "lines_local_path": str(lines_path),
+        "lines_gcs_object": lines_gcs_object,
+        "lines_load_id": lines_load_id,
         "ingested_at": ingested_at_iso,
     }
 
@@ -174,7 +398,7 @@ with DAG(
     project = get_gcp_project()
     dataset = get_bq_dataset()
     location = get_bq_location()
-    bucket = get_raw_bucket()
+    deferrable = use_deferrable_operators()
 
     create_table = BigQueryInsertJobOperator(
         task_id="create_shopify_order_table",
@@ -185,6 +409,20 @@ with DAG(
             }
         },
         location=location,
+        deferrable=deferrable,
+        gcp_conn_id="google_cloud_default",
+    )
+
+    create_line_table = BigQueryInsertJobOperator(
+        task_id="create_shopify_order_line_table",
+        configuration={
+            "query": {
+                "query": load_table_ddl("raw_shopify_order_line", project, dataset),
+                "useLegacySql": False,
+            }
+        },
+        location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
     )
 
@@ -193,20 +431,26 @@ with DAG(
         do_xcom_push=True,
         bash_command=(
             "set -euo pipefail\n"
-            "OUTPUT_DIR=\"{{ params.output_dir }}\"\n"
+            + bash_restore_checkpoint("{{ params.python_bin }}")
+            + "OUTPUT_DIR=\"{{ params.output_dir }}\"\n"
             "mkdir -p \"$OUTPUT_DIR\"\n"
             "{{ params.python_bin }} {{ params.script_path }} "
             "--seed-dir {{ params.seed_dir }} "
             "--output-dir \"$OUTPUT_DIR\" "
             "--orders {{ params.orders }} "
             "--seed {{ (data_interval_start or logical_date).strftime('%Y%m%d%H') }}\n"
-            "GENERATED_FILE=$(ls -t \"$OUTPUT_DIR\"/shopify_order_*.csv | head -n1)\n"
+            # Matches only the generator's shopify_order_<YYYYMMDD>_<HH>.csv, not the staged
+            # shopify_order_lines_*.csv written to the same directory.
+            "GENERATED_FILE=$(ls -t \"$OUTPUT_DIR\"/shopify_order_[0-9]*_[0-9][0-9].csv | head -n1)\n"
             "if [ -z \"$GENERATED_FILE\" ]; then\n"
             "  echo \"No Shopify CSV produced\" >&2\n"
             "  exit 1\n"
             "fi\n"
-            "echo \"$GENERATED_FILE\"\n"
+            + bash_save_checkpoint("{{ params.python_bin }}", "\"$GENERATED_FILE\"")
+            + "echo \"$GENERATED_FILE\"\n"
         ),
+        env=bash_checkpoint_env(),
+        append_env=True,
         params={
             "script_path": str(SHOPIFY_MOCK_SCRIPT),
             "seed_dir": str(SHOPIFY_SEED_DIR),
@@ -221,22 +465,42 @@ with DAG(
         python_callable=prepare_shopify_orders,
     )
 
-    upload_to_gcs = LocalFilesystemToGCSOperator(
+    upload_to_gcs = PythonOperator(
         task_id="upload_shopify_to_gcs",
-        gcp_conn_id="google_cloud_default",
-        src="{{ ti.xcom_pull(task_ids='prepare_shopify_orders')['local_path'] }}",
-        dst="{{ ti.xcom_pull(task_ids='prepare_shopify_orders')['gcs_object'] }}",
-        bucket=bucket,
-        mime_type="text/csv",
+        python_callable=upload_staged_file,
+        op_kwargs={
+            "table_name": "raw_shopify_order",
+            "stage_task_id": "prepare_shopify_orders",
+            "mime_type": "text/csv",
+        },
+    )
+
+    upload_lines_to_gcs = PythonOperator(
+        task_id="upload_shopify_lines_to_gcs",
+        python_callable=upload_staged_file,
+        op_kwargs={
+            "table_name": "raw_shopify_order_line",
+            "stage_task_id": "prepare_shopify_orders",
+            "mime_type": "text/csv",
+            "path_key": "lines_local_path",
+            "object_key": "lines_gcs_object",
+        },
+    )
+
+    skip_if_coalesced = ShortCircuitOperator(
+        task_id="skip_shopify_order_load_if_coalesced",
+        python_callable=should_load_per_run,
+        ignore_downstream_trigger_rules=False,
     )
 
     insert_into_raw = BigQueryInsertJobOperator(
         task_id="load_shopify_order_raw",
         location=location,
+        deferrable=deferrable,
         configuration={
             "load": {
                 "sourceUris": [
-                    f"gs://{bucket}/{{{{ ti.xcom_pull(task_ids='prepare_shopify_orders')['gcs_object'] }}}}"
+                    "{{ ti.xcom_pull(task_ids='upload_shopify_to_gcs')['source_uri'] }}"
                 ],
                 "destinationTable": {
                     "projectId": project,
@@ -259,16 +523,85 @@ with DAG(
         gcp_conn_id="google_cloud_default",
     )
 
-    row_count_check = BigQueryCheckOperator(
+    insert_lines_into_raw = BigQueryInsertJobOperator(
+        task_id="load_shopify_order_line_raw",
+        location=location,
+        deferrable=deferrable,
+        configuration={
+            "load": {
+                "sourceUris": [
+                    "{{ ti.xcom_pull(task_ids='upload_shopify_lines_to_gcs')['source_uri'] }}"
+                ],
+                "destinationTable": {
+                    "projectId": project,
+                    "datasetId": dataset,
+                    "tableId": "raw_shopify_order_line",
+                },
+                "sourceFormat": "CSV",
+                "skipLeadingRows": 1,
+                "writeDisposition": "WRITE_APPEND",
+                "createDisposition": "CREATE_NEVER",
+                "schemaUpdateOptions": [
+                    "ALLOW_FIELD_ADDITION",
+                    "ALLOW_FIELD_RELAXATION",
+                ],
+                "fieldDelimiter": ",",
+                "allowQuotedNewlines": True,
+                "ignoreUnknownValues": True,
+            }
+        },
+        gcp_conn_id="google_cloud_default",
+    )
+
+    row_count_check = LabelledBigQueryCheckOperator(
         task_id="shopify_order_row_count_check",
         sql=(
-            f"SELECT COUNT(1) FROM `{project}.{dataset}.raw_shopify_order` "
+            f"SELECT COUNT(1) > 0 AND COUNT(1) >= {expected_rows_template('prepare_shopify_orders', 'raw_shopify_order')} "
+            f"FROM `{project}.{dataset}.raw_shopify_order` "
+            "WHERE DATE(ingested_at) = DATE('{{ ds }}')"
+        ),
+        use_legacy_sql=False,
+        labels=bigquery_job_labels(SHOPIFY_DAG.dag_id, "shopify_order_row_count_check"),
+        location=location,
+        deferrable=deferrable,
+        gcp_conn_id="google_cloud_default",
+        trigger_rule=TriggerRule.NONE_FAILED_MIN_ONE_SUCCESS,
+    )
+
+    line_row_count_check = LabelledBigQueryCheckOperator(
+        task_id="shopify_order_line_row_count_check",
+        sql=(
+            f"SELECT COUNT(1) > 0 AND COUNT(1) >= "
+            f"{expected_rows_template('prepare_shopify_orders', 'raw_shopify_order_line')} "
+            f"FROM `{project}.{dataset}.raw_shopify_order_line` "
             "WHERE DATE(ingested_at) = DATE('{{ ds }}')"
         ),
         use_legacy_sql=False,
+        labels=bigquery_job_labels(SHOPIFY_DAG.dag_id, "shopify_order_line_row_count_check"),
         location=location,
+        deferrable=deferrable,
         gcp_conn_id="google_cloud_default",
         trigger_rule=TriggerRule.NONE_FAILED_MIN_ONE_SUCCESS,
     )
 
-    [create_table >> generate_orders] >> prepare_orders >> upload_to_gcs >> insert_into_raw >> row_count_check
+    record_latency = PythonOperator(
+        task_id="record_shopify_order_latency",
+        python_callable=record_ingestion_latency,
+        op_kwargs={
+            "table_name": "raw_shopify_order",
+            "stage_task_id": "prepare_shopify_orders",
+            "load_task_id": "load_shopify_order_raw",
+        },
+    )
+
+    collect_job_stats = PythonOperator(
+        task_id="collect_bigquery_job_stats",
+        python_callable=collect_bigquery_job_stats,
+        trigger_rule=TriggerRule.ALL_DONE,
+    )
+
+    [create_table, create_line_table] >> generate_orders >> prepare_orders >> [upload_to_gcs, upload_lines_to_gcs]
+    [upload_to_gcs, upload_lines_to_gcs] >> skip_if_coalesced >> [insert_into_raw, insert_lines_into_raw]
+    insert_into_raw >> [row_count_check, record_latency]
+    insert_lines_into_raw >> line_row_count_check
+    [row_count_check, line_row_count_check, record_latency] >> collect_job_stats
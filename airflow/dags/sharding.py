@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import gzip
+import logging
+import shutil
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, List, Optional
+
+from airflow.models import Variable
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SHARD_MAX_BYTES = 256 * 1024 * 1024
+COPY_BUFFER_BYTES = 1024 * 1024
+# GzipFile defaults to level 9, which costs several times the CPU of 6 for a few percent smaller shards.
+GZIP_LEVEL = 6
+
+
+def shard_max_bytes() -> int:
+    return int(Variable.get("staging_shard_max_bytes", default_var=str(DEFAULT_SHARD_MAX_BYTES)))
+
+
+def shard_object_names(gcs_object: str, count: int, compressed: bool) -> List[str]:
+    """``dir/name.csv`` -> ``dir/name.csv`` for one shard, ``dir/name-00000-of-00004.csv`` for several."""
+    gz = ".gz" if compressed else ""
+    if count == 1:
+        return [f"{gcs_object}{gz}"]
+    path = PurePosixPath(gcs_object)
+    stem = path.with_suffix("").as_posix()
+    return [f"{stem}-{index:05d}-of-{count:05d}{path.suffix}{gz}" for index in range(count)]
+
+
+def shard_source_uri(bucket: str, gcs_object: str, count: int, compressed: bool) -> str:
+    """Load URI covering exactly the shards of one upload; a single ``*`` keeps BigQuery's wildcard rules."""
+    if count == 1:
+        return f"gs://{bucket}/{shard_object_names(gcs_object, 1, compressed)[0]}"
+    path = PurePosixPath(gcs_object)
+    gz = ".gz" if compressed else ""
+    return f"gs://{bucket}/{path.with_suffix('').as_posix()}-*-of-{count:05d}{path.suffix}{gz}"
+
+
+def stale_shard_prefix(gcs_object: str) -> str:
+    """Prefix shared by every shard layout of ``gcs_object``, used to find leftovers of earlier attempts."""
+    return PurePosixPath(gcs_object).with_suffix("").as_posix()
+
+
+def _records(handle: BinaryIO, csv_quoting: bool) -> Iterator[bytes]:
+    """Yield whole records; for CSV a record continues while a quoted field spans lines."""
+    pending: List[bytes] = []
+    quotes = 0
+    for line in handle:
+        if not csv_quoting:
+            yield line
+            continue
+        pending.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            yield b"".join(pending)
+            pending, quotes = [], 0
+    if pending:
+        yield b"".join(pending)
+
+
+def split_staged_file(path: Path, shard_dir: Path, max_bytes: int, has_header: bool) -> List[Path]:
+    """Split a staged NDJSON/CSV file at record boundaries into files of at most ``max_bytes``.
+
+    CSV shards each repeat the header so every shard loads with ``skipLeadingRows=1``.
+    A single record larger than ``max_bytes`` gets a shard of its own. A file that
+    already fits is returned as is, without copying.
+    """
+    if path.stat().st_size <= max_bytes:
+        return [path]
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    shard_dir.mkdir(parents=True)
+    shards: List[Path] = []
+    current: Optional[BinaryIO] = None
+    written = rows = 0
+    with path.open("rb") as source:
+        header = source.readline() if has_header else b""
+        try:
+            for record in _records(source, csv_quoting=has_header):
+                if current is None or (rows and written + len(record) > max_bytes):
+                    if current is not None:
+                        current.close()
+                    shards.append(shard_dir / f"{path.stem}-{len(shards):05d}{path.suffix}")
+                    current = shards[-1].open("wb")
+                    current.write(header)
+                    written, rows = len(header), 0
+                current.write(record)
+                written += len(record)
+                rows += 1
+        finally:
+            if current is not None:
+                current.close()
+    LOGGER.info("Split %s into %s shards of at most %s bytes", path, len(shards), max_bytes)
+    return shards or [path]
+
+
+def gzip_file(path: Path, target: Path) -> Path:
+    """Deterministic gzip (no name or mtime in the header) so identical input gives identical CRC32C."""
+    with path.open("rb") as source, target.open("wb") as raw:
+        with gzip.GzipFile(filename="", mode="wb", compresslevel=GZIP_LEVEL, fileobj=raw, mtime=0) as compressed:
+            shutil.copyfileobj(source, compressed, COPY_BUFFER_BYTES)
+    return target
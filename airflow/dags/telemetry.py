@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import functools
+import logging
+import resource
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from airflow.stats import Stats
+
+from profiling import profiling_session
+
+LOGGER = logging.getLogger(__name__)
+
+TELEMETRY_XCOM_KEY = "telemetry"
+METRIC_PREFIX = "ingestion"
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+_CURRENT: ContextVar[Optional["TaskTelemetry"]] = ContextVar("task_telemetry", default=None)
+
+T = TypeVar("T")
+
+
+def _status_kb(field_name: str) -> Optional[int]:
+    try:
+        for line in _PROC_STATUS.read_text().splitlines():
+            if line.startswith(f"{field_name}:"):
+                return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS so the peak covers only this task (Linux only)."""
+    try:
+        _PROC_CLEAR_REFS.write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss is the lifetime peak of the process; VmHWM honours the reset above.
+    return _status_kb("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@dataclass
+class OutputMetrics:
+    rows: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class TaskTelemetry:
+    dag_id: str
+    task_id: str
+    run_id: str
+    stages: Dict[str, float] = field(default_factory=dict)
+    rows_in: int = 0
+    outputs: Dict[str, OutputMetrics] = field(default_factory=dict)
+    # table -> source-to-stage lag summary, filled in by latency.record_stage_latency
+    latency: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    peak_rss_kb: int = 0
+    rss_growth_kb: int = 0
+    _lap_started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def rows_out(self) -> Dict[str, int]:
+        return {name: output.rows for name, output in self.outputs.items()}
+
+    @property
+    def bytes_written(self) -> int:
+        return sum(output.bytes for output in self.outputs.values())
+
+    def lap(self, name: str) -> None:
+        """Charge the time since the previous lap (or the task start) to stage ``name``."""
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + now - self._lap_started
+        self._lap_started = now
+
+    def record_input(self, rows: int) -> None:
+        self.rows_in += int(rows)
+
+    def record_output(self, name: str, rows: int, path: Optional[Path] = None) -> None:
+        """Register rows written for an output table; file size is read from ``path``."""
+        output = self.outputs.setdefault(name, OutputMetrics())
+        output.rows = int(rows)
+        if path is not None and Path(path).exists():
+            output.bytes = Path(path).stat().st_size
+
+    def restore(self, payload: Dict[str, Any]) -> None:
+        """Take over rows, outputs and latency from an earlier ``to_dict()``, e.g. a reused checkpoint."""
+        self.rows_in = int(payload.get("rows_in", 0))
+        self.outputs = {name: OutputMetrics(**metrics) for name, metrics in (payload.get("outputs") or {}).items()}
+        self.latency = dict(payload.get("latency") or {})
+
+    def to_dict(self) -> Dict[str, Any]:
+        payload = asdict(self)
+        payload.pop("_lap_started")
+        payload["stages"] = {name: round(seconds, 4) for name, seconds in self.stages.items()}
+        payload["wall_seconds"] = round(self.wall_seconds, 4)
+        payload["rows_out"] = self.rows_out
+        payload["bytes_written"] = self.bytes_written
+        return payload
+
+    def emit(self) -> None:
+        """Send the measurements through Airflow's Stats facade (StatsD or OpenTelemetry per ``[metrics]``)."""
+        prefix = f"{METRIC_PREFIX}.{self.dag_id}.{self.task_id}"
+        tags = {"dag_id": self.dag_id, "task_id": self.task_id}
+        Stats.timing(f"{prefix}.duration", self.wall_seconds * 1000, tags=tags)
+        for name, seconds in self.stages.items():
+            Stats.timing(f"{prefix}.stage.{name}", seconds * 1000, tags={**tags, "stage": name})
+        Stats.gauge(f"{prefix}.rows_in", self.rows_in, tags=tags)
+        for name, output in self.outputs.items():
+            Stats.gauge(f"{prefix}.{name}.rows_out", output.rows, tags={**tags, "output": name})
+            Stats.gauge(f"{prefix}.{name}.bytes", output.bytes, tags={**tags, "output": name})
+        Stats.gauge(f"{prefix}.peak_rss_kb", self.peak_rss_kb, tags=tags)
+
+
+def current_telemetry() -> TaskTelemetry:
+    """Telemetry of the running ``instrumented_task``; a throwaway recorder outside one."""
+    telemetry = _CURRENT.get()
+    return telemetry if telemetry is not None else TaskTelemetry("", "", "")
+
+
+def instrumented_task(func: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a PythonOperator callable with timing, row, byte and peak-RSS telemetry.
+
+    The callable records stage laps and outputs through ``current_telemetry()``. The
+    summary is logged, emitted as metrics and pushed to XCom under ``telemetry``.
+    When requested, the call also runs under the profilers from ``profiling``.
+    """
+
+    @functools.wraps(func)
+    def wrapper(**context: Any) -> T:
+        ti = context.get("ti")
+        telemetry = TaskTelemetry(
+            dag_id=getattr(ti, "dag_id", "") or "",
+            task_id=getattr(ti, "task_id", func.__name__) or func.__name__,
+            run_id=getattr(ti, "run_id", "") or str(context.get("run_id", "")),
+        )
+        token = _CURRENT.set(telemetry)
+        rss_before = _status_kb("VmRSS") or 0
+        peak_reset = _reset_peak_rss()
+        started = time.perf_counter()
+        try:
+            with profiling_session(context, telemetry.task_id):
+                result = func(**context)
+        finally:
+            _CURRENT.reset(token)
+        telemetry.wall_seconds = time.perf_counter() - started
+        telemetry.peak_rss_kb = _peak_rss_kb()
+        telemetry.rss_growth_kb = max(0, telemetry.peak_rss_kb - rss_before) if peak_reset else 0
+
+        LOGGER.info(
+            "Telemetry for %s: %.3fs wall, stages %s, %s rows in, rows out %s, %s bytes written, peak RSS %s kB",
+            telemetry.task_id,
+            telemetry.wall_seconds,
+            {name: round(seconds, 3) for name, seconds in telemetry.stages.items()},
+            telemetry.rows_in,
+            telemetry.rows_out,
+            telemetry.bytes_written,
+            telemetry.peak_rss_kb,
+        )
+        telemetry.emit()
+        if ti is not None:
+            ti.xcom_push(key=TELEMETRY_XCOM_KEY, value=telemetry.to_dict())
+        return result
+
+    return wrapper
+
+
+def expected_rows_template(task_id: str, output: str) -> str:
+    """Jinja expression for the rows ``task_id`` staged for ``output``, for templated check SQL."""
+    return f"{{{{ ti.xcom_pull(task_ids='{task_id}', key='{TELEMETRY_XCOM_KEY}')['rows_out']['{output}'] }}}}"
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ddl_schema import DEFAULT_DDL_PATH, ColumnSpec, load_table_schema
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_SAMPLE_ROWS = 5
+BOOL_TOKENS = {"true", "false", "1", "0", "t", "f", "yes", "no", "y", "n"}
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a prepared frame violates the DDL and quarantining is disabled."""
+
+    def __init__(self, report: "ValidationReport") -> None:
+        super().__init__(f"{report.table} failed pre-load validation: {report.summary()}")
+        self.report = report
+
+
+@dataclass
+class ValidationReport:
+    table: str
+    row_count: int
+    invalid_rows: int = 0
+    # column -> check -> {"count": n, "sample_rows": [...]}
+    violations: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+    missing_columns: List[str] = field(default_factory=list)
+    unknown_columns: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.invalid_rows == 0
+
+    def summary(self) -> str:
+        parts = [
+            f"{column}.{check}={detail['count']}"
+            for column, checks in self.violations.items()
+            for check, detail in checks.items()
+        ]
+        return f"{self.invalid_rows}/{self.row_count} invalid rows ({', '.join(parts) or 'none'})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _blank(series: pd.Series) -> np.ndarray:
+    missing = series.isna().to_numpy(dtype=bool)
+    if pd.api.types.is_string_dtype(series.dtype) or series.dtype == object:
+        as_text = series.astype("string")
+        missing = missing | (as_text.str.strip() == "").fillna(False).to_numpy(dtype=bool)
+    return missing
+
+
+def _type_violations(series: pd.Series, spec: ColumnSpec, present: np.ndarray) -> np.ndarray:
+    """Return a mask of non-null values that cannot be loaded as ``spec.data_type``."""
+    data_type = spec.data_type
+    dtype = series.dtype
+    if data_type in {"STRING", "JSON"}:
+        return np.zeros(len(series), dtype=bool)
+    if data_type in {"INT64", "INTEGER"}:
+        if pd.api.types.is_integer_dtype(dtype):
+            return np.zeros(len(series), dtype=bool)
+        numeric = pd.to_numeric(series, errors="coerce").astype("float64").to_numpy()
+        bad = np.isnan(numeric) | (np.floor(numeric) != numeric)
+        return present & bad
+    if data_type in {"NUMERIC", "BIGNUMERIC", "FLOAT64", "FLOAT"}:
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            return np.zeros(len(series), dtype=bool)
+        numeric = pd.to_numeric(series, errors="coerce").astype("float64").to_numpy()
+        return present & np.isnan(numeric)
+    if data_type in {"BOOL", "BOOLEAN"}:
+        if pd.api.types.is_bool_dtype(dtype):
+            return np.zeros(len(series), dtype=bool)
+        tokens = series.astype("string").str.strip().str.lower()
+        return present & ~tokens.isin(BOOL_TOKENS).fillna(False).to_numpy(dtype=bool)
+    if data_type in {"TIMESTAMP", "DATETIME"}:
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return np.zeros(len(series), dtype=bool)
+        parsed = pd.to_datetime(series, errors="coerce", utc=True, format="ISO8601")
+        return present & parsed.isna().to_numpy(dtype=bool)
+    if data_type == "DATE":
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return np.zeros(len(series), dtype=bool)
+        parsed = pd.to_datetime(series.astype("string"), errors="coerce", format="%Y-%m-%d")
+        return present & parsed.isna().to_numpy(dtype=bool)
+    return np.zeros(len(series), dtype=bool)
+
+
+def validate_frame(
+    frame: pd.DataFrame,
+    table_name: str,
+    ddl_path: Path = DEFAULT_DDL_PATH,
+    specs: Optional[List[ColumnSpec]] = None,
+) -> Tuple[ValidationReport, np.ndarray]:
+    """Check ``frame`` column-wise against the DDL; return the report and a bad-row mask.
+
+    ``specs`` overrides the columns parsed from ``ddl_path`` for tables defined elsewhere.
+    """
+    specs = specs or load_table_schema(table_name, ddl_path)
+    report = ValidationReport(table=table_name, row_count=len(frame))
+    bad_rows = np.zeros(len(frame), dtype=bool)
+    known = {spec.name for spec in specs}
+    report.unknown_columns = [column for column in frame.columns if column not in known]
+
+    def record(column: str, check: str, mask: np.ndarray) -> None:
+        count = int(mask.sum())
+        if not count:
+            return
+        report.violations.setdefault(column, {})[check] = {
+            "count": count,
+            "sample_rows": [int(i) for i in np.flatnonzero(mask)[:MAX_SAMPLE_ROWS]],
+        }
+        np.logical_or(bad_rows, mask, out=bad_rows)
+
+    for spec in specs:
+        if spec.name not in frame.columns:
+            if spec.required:
+                report.missing_columns.append(spec.name)
+                record(spec.name, "missing_required_column", np.ones(len(frame), dtype=bool))
+            continue
+        series = frame[spec.name]
+        blank = _blank(series)
+        if spec.required:
+            record(spec.name, "not_null", blank)
+        record(spec.name, f"type_{spec.data_type.lower()}", _type_violations(series, spec, ~blank))
+
+    report.invalid_rows = int(bad_rows.sum())
+    return report, bad_rows
+
+
+def enforce_schema(
+    frame: pd.DataFrame,
+    table_name: str,
+    quarantine_path: Optional[Path] = None,
+    quarantine_mode: str = "w",
+    ddl_path: Path = DEFAULT_DDL_PATH,
+) -> Tuple[pd.DataFrame, ValidationReport]:
+    """Validate ``frame`` and either raise or move bad rows to a sidecar CSV.
+
+    Without ``quarantine_path`` any violation raises ``SchemaValidationError``.
+    With it, bad rows are written to the sidecar (plus a ``.report.json``) and the
+    remaining rows are returned for staging.
+    """
+    report, bad_rows = validate_frame(frame, table_name, ddl_path)
+    if report.unknown_columns:
+        LOGGER.debug("%s has columns outside the DDL: %s", table_name, report.unknown_columns)
+    if report.ok:
+        return frame, report
+    if quarantine_path is None:
+        raise SchemaValidationError(report)
+
+    quarantine_path.parent.mkdir(parents=True, exist_ok=True)
+    rejected = frame[bad_rows]
+    append = quarantine_mode == "a" and quarantine_path.exists()
+    rejected.to_csv(quarantine_path, index=False, mode="a" if append else "w", header=not append)
+    report_path = quarantine_path.with_suffix(".report.json")
+    with report_path.open("a" if append else "w", encoding="utf-8") as handle:
+        handle.write(json.dumps(report.to_dict()))
+        handle.write("\n")
+    LOGGER.warning(
+        "Quarantined %s rows for %s to %s: %s",
+        report.invalid_rows,
+        table_name,
+        quarantine_path,
+        report.summary(),
+    )
+    return frame[~bad_rows], report